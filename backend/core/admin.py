@@ -1,5 +1,38 @@
 from django.contrib import admin
-from .models import SiteSettings, Sponsor, SocialLink, Class, Resource
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from .changelist import FastChangeListMixin
+from .enrollment import sync_enrolled_count, unenroll
+from .exports import export_response
+from .profiling import hot_frames
+from .uploads import get_backend as get_upload_backend
+from .models import (
+    SiteSettings, Sponsor, SocialLink, Class, Enrollment, Resource, Job, ChunkedUpload, ClassReminder,
+    RequestProfile, SlowQuerySample, SlowQueryStat,
+)
+
+
+class ExportActionsMixin:
+    """Admin actions that stream the selected rows as CSV or JSONL"""
+    export_fields = None
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        for fmt in ('csv', 'jsonl'):
+            name = f'export_{fmt}'
+            actions[name] = (
+                self._export_action(fmt), name,
+                f'Export selected %(verbose_name_plural)s as {fmt.upper()}',
+            )
+        return actions
+
+    def _export_action(self, fmt):
+        def export(modeladmin, request, queryset):
+            return export_response(queryset.order_by('pk'), modeladmin.export_fields, fmt, request=request)
+        return export
 
 
 @admin.register(SiteSettings)
@@ -26,7 +59,7 @@ class SiteSettingsAdmin(admin.ModelAdmin):
 
 
 @admin.register(Sponsor)
-class SponsorAdmin(admin.ModelAdmin):
+class SponsorAdmin(ExportActionsMixin, admin.ModelAdmin):
     list_display = ['name', 'collaboration_date', 'is_active', 'order']
     list_filter = ['is_active', 'collaboration_date']
     search_fields = ['name', 'collaboration_agenda']
@@ -64,8 +97,11 @@ class SocialLinkAdmin(admin.ModelAdmin):
 
 
 @admin.register(Class)
-class ClassAdmin(admin.ModelAdmin):
-    list_display = ['title', 'instructor', 'difficulty', 'status', 'start_date', 'enrolled_count', 'max_participants', 'is_active']
+class ClassAdmin(ExportActionsMixin, FastChangeListMixin, admin.ModelAdmin):
+    list_display = [
+        'title', 'instructor', 'difficulty', 'status', 'start_date', 'enrolled_count', 'max_participants',
+        'is_active',
+    ]
     list_filter = ['difficulty', 'status', 'is_active', 'start_date']
     search_fields = ['title', 'instructor', 'description']
     list_editable = ['is_active', 'status']
@@ -80,7 +116,7 @@ class ClassAdmin(admin.ModelAdmin):
             'fields': ('difficulty', 'status', 'duration', 'start_date', 'end_date')
         }),
         ('Enrollment', {
-            'fields': ('max_participants', 'enrolled_count')
+            'fields': ('max_participants', 'enrolled_count', 'waitlist_enabled')
         }),
         ('Location & Links', {
             'fields': ('location', 'meeting_link', 'syllabus')
@@ -90,11 +126,58 @@ class ClassAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'enrolled_count']
+    actions = ['recount_enrollments', 'export_rosters']
+
+    @admin.action(description='Recount enrolled members')
+    def recount_enrollments(self, request, queryset):
+        for klass in queryset:
+            sync_enrolled_count(klass)
+        self.message_user(request, f'Recounted {queryset.count()} class(es).')
+
+    @admin.action(description='Export rosters of selected classes as CSV')
+    def export_rosters(self, request, queryset):
+        roster = Enrollment.objects.filter(klass__in=queryset).order_by('klass_id', 'status', 'created_at')
+        return export_response(roster, EnrollmentAdmin.export_fields, 'csv', name='roster', request=request)
+
+
+@admin.register(Enrollment)
+class EnrollmentAdmin(ExportActionsMixin, admin.ModelAdmin):
+    list_display = ['user', 'klass', 'status', 'created_at']
+    list_filter = ['status']
+    search_fields = ['user__username', 'user__email', 'klass__title']
+    list_select_related = ['user', 'klass']
+    raw_id_fields = ['user', 'klass']
+    export_fields = [
+        'klass_id', 'klass__title', 'user__username', 'user__email',
+        'user__first_name', 'user__last_name', 'status', 'created_at',
+    ]
+    actions = ['unenroll_selected']
+
+    # Seats are counted on Class.enrolled_count, so changes go through core.enrollment
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def has_unenroll_permission(self, request):
+        return request.user.has_perm('core.delete_enrollment')
+
+    @admin.action(description='Unenroll selected members', permissions=['unenroll'])
+    def unenroll_selected(self, request, queryset):
+        count = 0
+        for enrollment in queryset.select_related('klass', 'user'):
+            unenroll(enrollment.klass, enrollment.user)
+            count += 1
+        self.message_user(request, f'{count} member(s) unenrolled.')
 
 
 @admin.register(Resource)
-class ResourceAdmin(admin.ModelAdmin):
+class ResourceAdmin(ExportActionsMixin, FastChangeListMixin, admin.ModelAdmin):
     list_display = ['title', 'category', 'author', 'is_featured', 'download_count', 'is_active']
     list_filter = ['category', 'is_featured', 'is_active', 'created_at']
     search_fields = ['title', 'description', 'author', 'tags']
@@ -121,3 +204,153 @@ class ResourceAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['created_at', 'updated_at', 'download_count']
+
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['task', 'status', 'priority', 'run_at', 'attempts', 'max_attempts', 'repeat_seconds', 'locked_by']
+    list_filter = ['status', 'task']
+    search_fields = ['task', 'key']
+    ordering = ['-run_at']
+    actions = ['retry_now']
+
+    readonly_fields = ['attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'updated_at']
+
+    @admin.action(description='Retry selected jobs now')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='running').update(
+            status='queued', run_at=timezone.now(), attempts=0, locked_by='', locked_at=None
+        )
+        self.message_user(request, f'{updated} job(s) queued.')
+
+
+@admin.register(ClassReminder)
+class ClassReminderAdmin(admin.ModelAdmin):
+    list_display = ['user', 'klass', 'kind', 'sent_at']
+    list_filter = ['kind']
+    search_fields = ['user__username', 'user__email', 'klass__title']
+    list_select_related = ['user', 'klass']
+    readonly_fields = ['klass', 'user', 'kind', 'sent_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ChunkedUpload)
+class ChunkedUploadAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'target', 'object_id', 'user', 'status', 'offset', 'size', 'updated_at']
+    list_filter = ['status', 'target']
+    search_fields = ['filename', 'user__username']
+    readonly_fields = [
+        'id', 'user', 'target', 'object_id', 'filename', 'size', 'checksum', 'offset',
+        'status', 'error', 'expires_at', 'created_at', 'updated_at',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def delete_model(self, request, obj):
+        get_upload_backend().delete(obj)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for upload in queryset:
+            get_upload_backend().delete(upload)
+        super().delete_queryset(request, queryset)
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['path', 'method', 'status_code', 'duration_ms', 'samples', 'user', 'created_at', 'download']
+    list_filter = ['method', 'status_code']
+    search_fields = ['path', 'user__username']
+    list_select_related = ['user']
+    exclude = ['stacks']
+    readonly_fields = [
+        'user', 'method', 'path', 'status_code', 'duration_ms', 'interval_ms', 'samples',
+        'created_at', 'download', 'hot_frames',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/download/', self.admin_site.admin_view(self.download_view),
+                name='core_requestprofile_download',
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(profile.stacks, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.pk}.folded"'
+        return response
+
+    @admin.display(description='Collapsed stacks')
+    def download(self, obj):
+        url = reverse('admin:core_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">Download</a>', url)
+
+    @admin.display(description='Hot frames (self / total samples)')
+    def hot_frames(self, obj):
+        rows = ''.join(
+            f'{own:6} {total:6}  {frame}\n' for frame, own, total in hot_frames(obj.stacks)
+        )
+        return format_html('<pre style="white-space: pre-wrap">{}</pre>', rows)
+
+
+@admin.register(SlowQueryStat)
+class SlowQueryStatAdmin(admin.ModelAdmin):
+    list_display = ['fingerprint', 'statement', 'count', 'total_ms', 'avg', 'max_ms', 'last_seen', 'sample_link']
+    list_filter = ['last_seen']
+    search_fields = ['fingerprint', 'sql']
+    # Most total time first: that is where an index or rewrite pays off most
+    ordering = ['-total_ms']
+    readonly_fields = [
+        'fingerprint', 'sql', 'count', 'total_ms', 'avg', 'max_ms', 'first_seen', 'last_seen', 'sample_link',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='Statement')
+    def statement(self, obj):
+        return obj.sql[:120]
+
+    @admin.display(description='Avg ms')
+    def avg(self, obj):
+        return round(obj.avg_ms, 1)
+
+    @admin.display(description='Samples')
+    def sample_link(self, obj):
+        url = reverse('admin:core_slowquerysample_changelist')
+        return format_html('<a href="{}?stat__fingerprint__exact={}">View</a>', url, obj.pk)
+
+
+@admin.register(SlowQuerySample)
+class SlowQuerySampleAdmin(admin.ModelAdmin):
+    list_display = ['stat', 'duration_ms', 'view', 'location', 'database', 'has_plan', 'created_at']
+    list_filter = ['database', 'view']
+    search_fields = ['stat__fingerprint', 'stat__sql', 'view', 'location']
+    list_select_related = ['stat']
+    date_hierarchy = 'created_at'
+    readonly_fields = [
+        'stat', 'duration_ms', 'database', 'params_fingerprint', 'view', 'location', 'created_at', 'plan',
+    ]
+    exclude = ['explain']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='EXPLAIN', boolean=True)
+    def has_plan(self, obj):
+        return bool(obj.explain)
+
+    @admin.display(description='Plan')
+    def plan(self, obj):
+        return format_html('<pre style="white-space: pre-wrap">{}</pre>', obj.explain or '-')
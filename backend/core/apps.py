@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        # Tasks load when the worker first runs one (core.jobs.get_task);
+        # dbpool and slowqueries load with the URLconf and MIDDLEWARE
+        from . import signals  # noqa: F401
+        from tars import checks
+
+        checks.install()
@@ -0,0 +1,276 @@
+"""
+In-process prefix index for search-box autocomplete.
+
+Suggestions are class and resource titles plus instructor and author names
+(one suggestion per distinct name, scored by everything carrying it). Every
+word start of a suggestion is a key, so "py" finds "Intro to Python". Keys
+live in one sorted list searched with ``bisect``; a parallel list holds each
+key's suggestion as its rank, a tuple that sorts the most popular first.
+Matches for a prefix form one contiguous slice, and its ``limit`` smallest
+ranks are the answer. One and two character prefixes match large slices, so
+their top suggestions are computed when the index is built.
+
+Popularity is all-time downloads plus weighted views for resources and
+enrolled seats for classes, so heavily used items come first.
+
+Each worker holds its own index. Class/Resource signals bump a shared
+version counter in the cache; the worker that made the change patches a copy
+of its index, inserting and removing only the changed suggestions' keys, and
+the others rebuild from the database on their next lookup.
+The version is checked at most every ``AUTOCOMPLETE_VERSION_CHECK`` seconds,
+so most lookups touch neither the cache nor the database.
+"""
+import heapq
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Class, Resource
+
+VERSION_KEY = 'autocomplete:version'
+MAX_LIMIT = 20
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+
+def normalize(text):
+    """Lowercase, accent-free, single-spaced"""
+    text = text or ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.casefold().split())
+
+
+def _word_starts(text):
+    words = text.split(' ')
+    return [' '.join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+def class_documents(queryset=None):
+    """(kind, pk) -> [(type, text, score)] for active classes"""
+    queryset = Class.objects.filter(is_active=True) if queryset is None else queryset
+    docs = {}
+    for pk, title, instructor, enrolled in queryset.values_list('id', 'title', 'instructor', 'enrolled_count'):
+        docs[('class', pk)] = [('class', title, enrolled), ('instructor', instructor, enrolled)]
+    return docs
+
+
+def resource_documents(queryset=None):
+    """(kind, pk) -> [(type, text, score)] for active resources"""
+    queryset = Resource.objects.filter(is_active=True) if queryset is None else queryset
+    view_weight = getattr(settings, 'TRENDING_VIEW_WEIGHT', 0.1)
+    docs = {}
+    for pk, title, author, downloads, views in queryset.values_list(
+        'id', 'title', 'author', 'download_count', 'view_count'
+    ):
+        score = downloads + views * view_weight
+        docs[('resource', pk)] = [('resource', title, score), ('author', author, score)]
+    return docs
+
+
+OBJECT_TYPES = ('class', 'resource')
+
+
+def _rank(entry):
+    """Sort key of a suggestion: most popular first, then shortest"""
+    type_, text, pk, score, key = entry[:5]
+    return (-score, len(text), text, type_, key if pk is None else pk)
+
+
+class PrefixIndex:
+    def __init__(self, docs):
+        self.docs = docs
+        # (type, id or normalized name) -> (type, display text, id or None, score, normalized, documents)
+        self.entries = {}
+        for (kind, pk), fields in docs.items():
+            self._apply(pk, fields, 1)
+        self.by_rank = {_rank(entry): entry for entry in self.entries.values()}
+
+        pairs = sorted(
+            (start, rank)
+            for rank, entry in self.by_rank.items()
+            for start in _word_starts(entry[4])
+        )
+        self.keys = [key for key, _ in pairs]
+        self.ranks = [rank for _, rank in pairs]
+
+        self.top = {}
+        for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+            for prefix in {key[:length] for key in self.keys}:
+                self.top[prefix] = self._best(prefix, MAX_LIMIT)
+
+    def _apply(self, pk, fields, sign, previous=None):
+        """Add (sign 1) or take away (sign -1) one document's suggestions"""
+        for type_, text, score in fields:
+            key = normalize(text)
+            if not key:
+                continue
+            ident = (type_, pk) if type_ in OBJECT_TYPES else (type_, key)
+            entry = self.entries.get(ident)
+            if previous is not None:
+                previous.setdefault(ident, entry)
+            if type_ in OBJECT_TYPES:
+                entry = (type_, text.strip(), pk, score, key, 1) if sign > 0 else None
+            else:
+                # Names are shared by several classes/resources
+                type_, display, _, total, _, count = entry or (type_, text.strip(), None, 0, key, 0)
+                count += sign
+                entry = (type_, display, None, total + sign * score, key, count) if count else None
+            if entry is None:
+                self.entries.pop(ident, None)
+            else:
+                self.entries[ident] = entry
+
+    def _best(self, prefix, limit):
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + '\U0010ffff', lo)
+        return heapq.nsmallest(limit, set(self.ranks[lo:hi]))
+
+    def search(self, query, limit=10):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        ranks = self.top[prefix][:limit] if prefix in self.top else self._best(prefix, limit)
+        results = []
+        for rank in ranks:
+            type_, text, pk = self.by_rank[rank][:3]
+            item = {'type': type_, 'text': text}
+            if pk is not None:
+                item['id'] = pk
+            results.append(item)
+        return results
+
+    def _position(self, start, rank):
+        lo = bisect_left(self.keys, start)
+        hi = bisect_right(self.keys, start, lo)
+        return bisect_left(self.ranks, rank, lo, hi)
+
+    def _remove(self, entry):
+        rank = _rank(entry)
+        del self.by_rank[rank]
+        for start in _word_starts(entry[4]):
+            i = self._position(start, rank)
+            del self.keys[i]
+            del self.ranks[i]
+
+    def _insert(self, entry):
+        rank = _rank(entry)
+        self.by_rank[rank] = entry
+        for start in _word_starts(entry[4]):
+            i = self._position(start, rank)
+            self.keys.insert(i, start)
+            self.ranks.insert(i, rank)
+
+    def patched(self, docs):
+        """
+        New index with some documents replaced (value None removes one). Only
+        the suggestions those documents feed are moved, and only the
+        precomputed prefixes of their keys recomputed.
+        """
+        index = object.__new__(PrefixIndex)
+        index.docs, index.entries, index.by_rank = dict(self.docs), dict(self.entries), dict(self.by_rank)
+        index.keys, index.ranks, index.top = list(self.keys), list(self.ranks), dict(self.top)
+
+        previous = {}
+        for doc_key, fields in docs.items():
+            old_fields = index.docs.pop(doc_key, None)
+            if old_fields is not None:
+                index._apply(doc_key[1], old_fields, -1, previous)
+            if fields is not None:
+                index.docs[doc_key] = fields
+                index._apply(doc_key[1], fields, 1, previous)
+
+        starts = set()
+        for ident, before in previous.items():
+            after = index.entries.get(ident)
+            if before == after:
+                continue
+            for entry, change in ((before, index._remove), (after, index._insert)):
+                if entry is not None:
+                    change(entry)
+                    starts.update(_word_starts(entry[4]))
+
+        for prefix in {start[:length] for start in starts for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1)}:
+            best = index._best(prefix, MAX_LIMIT)
+            if best:
+                index.top[prefix] = best
+            else:
+                index.top.pop(prefix, None)
+        return index
+
+
+_lock = threading.Lock()
+_index = None
+_version = None
+_checked_at = 0.0
+_built_at = 0.0
+_patches = {}  # this worker's own changes, applied on the next lookup
+
+
+def current_version():
+    return cache.get(VERSION_KEY)
+
+
+def _bump_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, None)
+        return current_version()
+
+
+def build_index():
+    docs = class_documents()
+    docs.update(resource_documents())
+    return PrefixIndex(docs)
+
+
+def get_index():
+    """This worker's index, rebuilt when another worker changed the data"""
+    global _index, _version, _checked_at, _built_at
+    if _index is not None and not _patches and time.monotonic() - _checked_at < settings.AUTOCOMPLETE_VERSION_CHECK:
+        return _index
+    with _lock:
+        if time.monotonic() - _checked_at >= settings.AUTOCOMPLETE_VERSION_CHECK or _index is None:
+            version = current_version()
+            # Popularity counters change without signals; refresh them now and then
+            stale = time.monotonic() - _built_at > settings.AUTOCOMPLETE_MAX_AGE
+            if _index is None or version != _version or stale:
+                _index = build_index()
+                _version = version
+                _built_at = time.monotonic()
+                _patches.clear()
+            _checked_at = time.monotonic()
+        if _patches:
+            _index = _index.patched(_patches)
+            _patches.clear()
+    return _index
+
+
+def suggest(query, limit=10):
+    return get_index().search(query, min(max(limit, 1), MAX_LIMIT))
+
+
+def object_changed(kind, pk):
+    """
+    Record a class/resource change: bump the shared version and queue a patch
+    for this worker's index, so a bulk delete costs one rebuild. Call after
+    the transaction commits.
+    """
+    global _version, _checked_at
+    model, documents = (Class, class_documents) if kind == 'class' else (Resource, resource_documents)
+    docs = documents(model.objects.filter(pk=pk, is_active=True))
+    with _lock:
+        version = _bump_version()
+        if _index is None:
+            return
+        if version == (_version or 0) + 1:
+            # Nobody else changed anything since our index was built
+            _patches[(kind, pk)] = docs.get((kind, pk))
+            _version = version
+        else:
+            _checked_at = 0.0
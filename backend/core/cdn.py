@@ -0,0 +1,170 @@
+"""
+CDN caching of public API responses.
+
+Responses are tagged with surrogate keys derived from the model instances in
+them: ``sponsor`` for anything listing sponsors plus ``sponsor:<id>`` per
+instance. Both the Fastly (``Surrogate-Key``, space separated) and Cloudflare
+(``Cache-Tag``, comma separated) headers are sent. ``Cache-Control`` comes
+from the per-endpoint entry in ``CDN_CACHE_POLICIES``.
+
+Saving or deleting a tagged model purges its collection key and its instance
+key through the purger configured in ``CDN_PURGER``. The purge always runs as
+a background job, so a slow CDN API never holds up the save and a failed
+purge is retried.
+"""
+import json
+import threading
+import urllib.request
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .jobs import enqueue
+
+
+def model_key(model):
+    return model._meta.model_name
+
+
+def surrogate_keys(model, ids=()):
+    """Collection key for ``model`` plus one key per instance id"""
+    label = model_key(model)
+    return [label, *(f'{label}:{pk}' for pk in ids if pk is not None)]
+
+
+def ids_in(data):
+    """Instance ids in serialized data: one object, a list or a paginated page"""
+    if data is None:
+        return []
+    if isinstance(data, dict):
+        if 'results' in data:
+            return ids_in(data['results'])
+        return [data.get('id')]
+    return [item.get('id') for item in data]
+
+
+def cache_control(policy):
+    policy = settings.CDN_CACHE_POLICIES[policy]
+    parts = ['public', f"max-age={policy['max_age']}"]
+    if 's_maxage' in policy:
+        parts.append(f"s-maxage={policy['s_maxage']}")
+    if 'stale_while_revalidate' in policy:
+        parts.append(f"stale-while-revalidate={policy['stale_while_revalidate']}")
+    if 'stale_if_error' in policy:
+        parts.append(f"stale-if-error={policy['stale_if_error']}")
+    return ', '.join(parts)
+
+
+def tag_response(response, policy, keys, fresh=True):
+    """
+    Add Cache-Control and surrogate key headers to a successful response.
+    Stale payloads (see core.singleflight) must not be pinned in the CDN for
+    the full s-maxage after the purge that made them stale, so they are
+    only cached briefly.
+    """
+    if response.status_code != 200:
+        return response
+    keys = list(dict.fromkeys(keys))
+    response['Cache-Control'] = cache_control(policy) if fresh else 'public, max-age=0, s-maxage=5'
+    response['Surrogate-Key'] = ' '.join(keys)
+    response['Cache-Tag'] = ','.join(keys)
+    return response
+
+
+class SurrogateKeyMixin:
+    """Tag read-only viewset responses; set ``cdn_policy`` on the viewset"""
+    cdn_policy = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.cdn_policy and request.method in ('GET', 'HEAD'):
+            model = self.get_queryset().model
+            tag_response(response, self.cdn_policy, surrogate_keys(model, ids_in(response.data)))
+        return response
+
+
+class BasePurger:
+    def purge(self, keys):
+        raise NotImplementedError
+
+
+class NullPurger(BasePurger):
+    """No CDN in front of the API"""
+
+    def purge(self, keys):
+        pass
+
+
+class LocalPurger(BasePurger):
+    """Records purge calls instead of sending them; for tests and local runs"""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def purge(self, keys):
+        with self._lock:
+            self.calls.append(list(keys))
+
+    def purged_keys(self):
+        with self._lock:
+            return {key for call in self.calls for key in call}
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+
+
+class HTTPPurger(BasePurger):
+    timeout = 10
+
+    def _post(self, url, headers, body=None):
+        request = urllib.request.Request(url, data=body, headers=headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class FastlyPurger(HTTPPurger):
+    """OPTIONS: SERVICE_ID, API_TOKEN, SOFT (mark stale instead of evicting)"""
+
+    def __init__(self, SERVICE_ID, API_TOKEN, SOFT=True):
+        self.url = f'https://api.fastly.com/service/{SERVICE_ID}/purge'
+        self.headers = {'Fastly-Key': API_TOKEN, 'Accept': 'application/json'}
+        if SOFT:
+            self.headers['Fastly-Soft-Purge'] = '1'
+
+    def purge(self, keys):
+        self._post(self.url, {**self.headers, 'Surrogate-Key': ' '.join(keys)})
+
+
+class CloudflarePurger(HTTPPurger):
+    """OPTIONS: ZONE_ID, API_TOKEN"""
+
+    def __init__(self, ZONE_ID, API_TOKEN):
+        self.url = f'https://api.cloudflare.com/client/v4/zones/{ZONE_ID}/purge_cache'
+        self.headers = {'Authorization': f'Bearer {API_TOKEN}', 'Content-Type': 'application/json'}
+
+    def purge(self, keys):
+        self._post(self.url, self.headers, json.dumps({'tags': list(keys)}).encode())
+
+
+_purger = None
+_purger_lock = threading.Lock()
+
+
+def get_purger():
+    global _purger
+    if _purger is None:
+        with _purger_lock:
+            if _purger is None:
+                config = getattr(settings, 'CDN_PURGER', {})
+                backend = import_string(config.get('BACKEND', 'core.cdn.NullPurger'))
+                _purger = backend(**config.get('OPTIONS', {}))
+    return _purger
+
+
+def purge(keys):
+    """Queue a purge of ``keys``; runs only if the caller's transaction commits"""
+    if isinstance(get_purger(), NullPurger):
+        return
+    enqueue('core.tasks.purge_surrogate_keys', args=[list(keys)])
@@ -0,0 +1,106 @@
+"""
+Database connection reuse metrics.
+
+Two modes are configured in tars/settings.py (``connection_reuse``):
+
+* pooled: a psycopg_pool.ConnectionPool per worker process. Its own counters
+  give utilisation and how long requests waited for a connection;
+* persistent (``CONN_MAX_AGE``): each thread keeps its connection across
+  requests. Here the useful signal is how many requests reused a connection
+  instead of opening a new one, counted in this process.
+
+Counters are per process; ``pool_stats()`` describes the worker that serves
+the request.
+"""
+import threading
+import time
+
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_lock = threading.Lock()
+_requests = 0
+_opened = {}
+_started = time.time()
+
+
+@receiver(request_started)
+def _count_request(sender, **kwargs):
+    global _requests
+    with _lock:
+        _requests += 1
+
+
+@receiver(connection_created)
+def _count_connection(sender, connection, **kwargs):
+    with _lock:
+        _opened[connection.alias] = _opened.get(connection.alias, 0) + 1
+
+
+def _pool(connection):
+    if connection.vendor != 'postgresql':
+        return None
+    return connection.pool
+
+
+def close_pools():
+    """Close every pool in this process, e.g. before a pre-fork server forks"""
+    for connection in connections.all():
+        if _pool(connection) is not None:
+            connection.close_pool()
+
+
+def _pooled_stats(pool):
+    if pool.closed:
+        # Pools open on first use in each process
+        return {'mode': 'pool', 'open': False, 'min_size': pool.min_size, 'max_size': pool.max_size}
+    stats = pool.get_stats()
+    size, available = stats.get('pool_size', 0), stats.get('pool_available', 0)
+    requests = stats.get('requests_num', 0)
+    return {
+        'mode': 'pool',
+        'open': True,
+        'min_size': stats.get('pool_min', pool.min_size),
+        'max_size': stats.get('pool_max', pool.max_size),
+        'size': size,
+        'in_use': size - available,
+        'available': available,
+        'utilisation': round((size - available) / pool.max_size, 3) if pool.max_size else 0,
+        'waiting': stats.get('requests_waiting', 0),
+        'requests': requests,
+        'requests_queued': stats.get('requests_queued', 0),
+        'avg_wait_ms': round(stats.get('requests_wait_ms', 0) / requests, 2) if requests else 0,
+        'timeouts': stats.get('requests_errors', 0),
+        'connections_opened': stats.get('connections_num', 0),
+        'avg_connect_ms': (
+            round(stats.get('connections_ms', 0) / stats['connections_num'], 2)
+            if stats.get('connections_num') else 0
+        ),
+        'connections_lost': stats.get('connections_lost', 0),
+    }
+
+
+def pool_stats():
+    """Connection reuse figures for every configured database alias"""
+    with _lock:
+        requests, opened = _requests, dict(_opened)
+    result = {}
+    for alias in connections:
+        connection = connections[alias]
+        pool = _pool(connection)
+        if pool is not None:
+            result[alias] = _pooled_stats(pool)
+            continue
+        max_age = connection.settings_dict.get('CONN_MAX_AGE') or 0
+        count = opened.get(alias, 0)
+        result[alias] = {
+            'mode': 'persistent' if max_age else 'per-request',
+            'conn_max_age': max_age,
+            'health_checks': connection.settings_dict.get('CONN_HEALTH_CHECKS', False),
+            'requests': requests,
+            'connections_opened': count,
+            'reuse_ratio': round(1 - count / requests, 3) if requests and count <= requests else None,
+        }
+    return {'pid_uptime_seconds': round(time.time() - _started), 'databases': result}
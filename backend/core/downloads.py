@@ -0,0 +1,182 @@
+"""
+Streaming file responses with HTTP Range support.
+
+Files are sent in fixed-size chunks so a worker never holds a whole file in
+memory. Local storages are read straight from disk; remote storages
+(Cloudinary) are proxied from the storage URL with the client's Range header
+forwarded upstream. When RESOURCE_FILE_SENDFILE is configured the transfer is
+handed off to the reverse proxy instead. Pass the request so ASGI gets an
+async body instead of buffering the file (core.streaming).
+"""
+import mimetypes
+import os
+import re
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+
+from .media import media_url
+from .streaming import streaming_content
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _chunk_size():
+    return getattr(settings, 'RESOURCE_FILE_CHUNK_SIZE', 64 * 1024)
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range`` header against a file of ``size`` bytes.
+
+    Returns ``None`` when the whole file should be sent (no header, a
+    malformed header, a multi-range request or an empty file), ``(start,
+    end)`` inclusive for a satisfiable range, and raises ValueError when the
+    range is unsatisfiable.
+    """
+    if not header or size == 0:
+        # An empty file has no byte range to send
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def is_initial_request(header):
+    """True unless the Range header asks for a resume past the first byte"""
+    match = RANGE_RE.match((header or '').strip())
+    return not match or match.group(1) == '0'
+
+
+def counts_as_download(header, response):
+    """A full response, or a partial one from byte 0, to a request that isn't a resume"""
+    if not is_initial_request(header):
+        return False
+    if response.status_code == 200:
+        return True
+    return response.status_code == 206 and response.get('Content-Range', '').startswith('bytes 0-')
+
+
+def claim_download(user_id, resource_id):
+    """
+    True the first time a user fetches a resource within
+    RESOURCE_DOWNLOAD_COUNT_WINDOW seconds, so players and download managers
+    that re-request ``bytes=0-`` are counted once
+    """
+    window = getattr(settings, 'RESOURCE_DOWNLOAD_COUNT_WINDOW', 30 * 60)
+    return cache.add(f'download:{resource_id}:{user_id}', 1, window)
+
+
+def _attachment(response, filename, content_type):
+    response['Content-Type'] = content_type
+    response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _read_chunks(handle, remaining, chunk_size):
+    try:
+        while remaining is None or remaining > 0:
+            chunk = handle.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
+
+
+def _sendfile_response(field_file, filename, content_type):
+    mode = getattr(settings, 'RESOURCE_FILE_SENDFILE', '')
+    response = _attachment(HttpResponse(), filename, content_type)
+    if mode == 'nginx':
+        prefix = getattr(settings, 'RESOURCE_FILE_ACCEL_PREFIX', '/protected/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(field_file.name)
+        return response
+    if mode == 'apache':
+        try:
+            response['X-Sendfile'] = field_file.storage.path(field_file.name)
+        except NotImplementedError:
+            return None
+        return response
+    return None
+
+
+def _local_response(path, range_header, filename, content_type, request):
+    size = os.path.getsize(path)
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    handle = open(path, 'rb')
+    if byte_range is None:
+        response = StreamingHttpResponse(streaming_content(_read_chunks(handle, size, _chunk_size()), request))
+        response['Content-Length'] = str(size)
+    else:
+        start, end = byte_range
+        handle.seek(start)
+        chunks = _read_chunks(handle, end - start + 1, _chunk_size())
+        response = StreamingHttpResponse(streaming_content(chunks, request), status=206)
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return _attachment(response, filename, content_type)
+
+
+def _remote_response(url, range_header, filename, content_type, request):
+    headers = {'Range': range_header} if range_header else {}
+    try:
+        upstream = urlopen(Request(url, headers=headers), timeout=30)
+    except HTTPError as e:
+        response = HttpResponse(status=416 if e.code == 416 else 502)
+        if e.headers.get('Content-Range'):
+            response['Content-Range'] = e.headers['Content-Range']
+        return response
+    except URLError:
+        return HttpResponse(status=502)
+
+    chunks = _read_chunks(upstream, None, _chunk_size())
+    response = StreamingHttpResponse(streaming_content(chunks, request), status=upstream.status)
+    for header in ('Content-Length', 'Content-Range'):
+        if upstream.headers.get(header):
+            response[header] = upstream.headers[header]
+    return _attachment(response, filename, upstream.headers.get('Content-Type') or content_type)
+
+
+def file_response(field_file, range_header=None, request=None):
+    """Build a streaming (or proxy hand-off) response for a FieldFile"""
+    filename = os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    response = _sendfile_response(field_file, filename, content_type)
+    if response is not None:
+        return response
+
+    try:
+        path = field_file.storage.path(field_file.name)
+    except NotImplementedError:
+        return _remote_response(media_url(field_file), range_header, filename, content_type, request)
+    return _local_response(path, range_header, filename, content_type, request)
@@ -0,0 +1,150 @@
+"""
+Class enrollment with contention-safe seat reservation.
+
+A seat is taken by one conditional UPDATE
+(``enrolled_count < max_participants``), so the database row lock serializes
+concurrent requests and a class can never be overbooked, without holding
+SELECT ... FOR UPDATE locks while the rest of the request runs. When an
+enrolled member leaves, the seat is handed to the oldest waitlisted member
+(compare-and-set on the waitlist row) instead of being released and re-raced.
+Seats added by raising ``max_participants`` go to the waitlist the same way
+(``promote_waitlist``, called when a class is saved).
+
+Every change to ``enrolled_count`` publishes a ``class.seats`` event and
+expires the cached member portal payload, which carries the seat counts.
+"""
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import events
+from .models import Class, Enrollment
+from .singleflight import invalidate
+
+
+class ClassFullError(Exception):
+    """Raised when a class has no free seat and no waitlist"""
+
+
+def _publish_seats(class_id):
+    seats = Class.objects.filter(pk=class_id).values('enrolled_count', 'max_participants').first()
+    if seats is not None:
+        events.publish('class.seats', {
+            'id': class_id,
+            'enrolled_count': seats['enrolled_count'],
+            'max_participants': seats['max_participants'],
+            'is_full': seats['enrolled_count'] >= seats['max_participants'],
+        })
+
+
+def _seats_changed(class_id, using=None):
+    transaction.on_commit(lambda: _publish_seats(class_id), using=using)
+    transaction.on_commit(lambda: invalidate('member_portal'), using=using)
+
+
+def _reserve_seat(class_id):
+    return Class.objects.filter(
+        pk=class_id, enrolled_count__lt=F('max_participants')
+    ).update(enrolled_count=F('enrolled_count') + 1) == 1
+
+
+def _release_seat(class_id):
+    Class.objects.filter(pk=class_id, enrolled_count__gt=0).update(
+        enrolled_count=F('enrolled_count') - 1
+    )
+
+
+def enroll(klass, user):
+    """
+    Enroll ``user`` in ``klass`` and return the Enrollment.
+
+    Returns the existing enrollment if the user already holds a seat or a
+    waitlist place. Raises ClassFullError when no seat is free and the
+    class has no waitlist.
+    """
+    existing = Enrollment.objects.filter(klass=klass, user=user).first()
+    if existing is not None:
+        return existing
+
+    db = router.db_for_write(Enrollment)
+    try:
+        with transaction.atomic(using=db):
+            if _reserve_seat(klass.pk):
+                _seats_changed(klass.pk, db)
+                return Enrollment.objects.create(klass=klass, user=user, status='enrolled')
+            if not klass.waitlist_enabled:
+                raise ClassFullError(klass.pk)
+            return Enrollment.objects.create(klass=klass, user=user, status='waitlisted')
+    except IntegrityError:
+        # A concurrent request from the same user won; its seat is the one kept
+        return Enrollment.objects.get(klass=klass, user=user)
+
+
+def unenroll(klass, user):
+    """
+    Remove ``user`` from ``klass``. Returns the waitlisted Enrollment that was
+    promoted into the freed seat, if any.
+    """
+    db = router.db_for_write(Enrollment)
+    with transaction.atomic(using=db):
+        # Delete first: the row lock taken by the DELETE serializes a member's
+        # concurrent unenroll requests, and only one of them sees a deleted seat
+        seated, _ = Enrollment.objects.filter(klass=klass, user=user, status='enrolled').delete()
+        if not seated:
+            Enrollment.objects.filter(klass=klass, user=user, status='waitlisted').delete()
+            return None
+        promoted = _promote_next(klass.pk)
+        if promoted is None:
+            _release_seat(klass.pk)
+            _seats_changed(klass.pk, db)
+        return promoted
+
+
+def promote_waitlist(klass):
+    """
+    Fill every free seat of ``klass`` from its waitlist, oldest first (after
+    ``max_participants`` was raised). Returns the promoted Enrollments.
+    """
+    if not Enrollment.objects.filter(klass_id=klass.pk, status='waitlisted').exists():
+        return []
+    db = router.db_for_write(Enrollment)
+    promoted = []
+    with transaction.atomic(using=db):
+        # Each seat is reserved before it is handed out, so concurrent
+        # enrollments can't take it in between
+        while _reserve_seat(klass.pk):
+            enrollment = _promote_next(klass.pk)
+            if enrollment is None:
+                _release_seat(klass.pk)
+                break
+            promoted.append(enrollment)
+        if promoted:
+            _seats_changed(klass.pk, db)
+    return promoted
+
+
+def _promote_next(class_id):
+    """Hand the seat being freed to the oldest waitlisted member, if any"""
+    waiting = (
+        Enrollment.objects.filter(klass_id=class_id, status='waitlisted')
+        .order_by('created_at', 'id')
+        .values_list('id', flat=True)
+    )
+    while True:
+        enrollment_id = waiting.first()
+        if enrollment_id is None:
+            return None
+        # Every failed compare-and-set means that row left the waitlist, so this terminates
+        promoted = Enrollment.objects.filter(id=enrollment_id, status='waitlisted').update(
+            status='enrolled', updated_at=timezone.now()
+        )
+        if promoted:
+            return Enrollment.objects.get(id=enrollment_id)
+
+
+def sync_enrolled_count(klass):
+    """Recompute enrolled_count from enrollment rows (admin repair tool)"""
+    count = Enrollment.objects.filter(klass=klass, status='enrolled').count()
+    Class.objects.filter(pk=klass.pk).update(enrolled_count=count)
+    _seats_changed(klass.pk)
+    return count
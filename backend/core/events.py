@@ -0,0 +1,261 @@
+"""
+Live events for the member portal, delivered over Server-Sent Events.
+
+``publish()`` can be called from any thread (signal handlers, the enrollment
+service, admin saves); events are serialized once and handed to every
+subscriber's asyncio queue on its own event loop. Subscribers are async SSE
+responses served through ``tars.asgi``, so thousands of idle connections
+cost a queue each rather than a worker thread.
+
+The fan-out backend is pluggable through EVENTS_BACKEND:
+
+* InProcessBackend only reaches subscribers in the same process, so it is
+  only correct with a single web worker (and no separate job worker
+  publishing events);
+* PostgresNotifyBackend, the default on PostgreSQL, sends each event with
+  NOTIFY. Every web process that has subscribers LISTENs on a dedicated
+  connection and ``deliver()``s what arrives to its own clients, so events
+  published by any worker or by run_worker reach everyone.
+
+Class status transitions (upcoming -> ongoing -> completed, joinable) are
+not stored anywhere, they follow from start_date/end_date. ClassScheduleWatcher
+sleeps until the next boundary and publishes the classes whose computed
+status changed.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_event_ids = itertools.count(1)
+
+
+class Subscription:
+    """One connected client: a bounded queue on the client's event loop"""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            pass  # loop already closed; the subscriber is going away
+
+    def _put(self, message):
+        if self.queue.full():
+            # Slow client: drop the oldest event rather than block publishers
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def next(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBackend:
+    """Fan-out to subscribers living in this process"""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscribers.add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, message):
+        self.deliver(message)
+
+    def deliver(self, message):
+        """Hand a message to the subscribers in this process"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+
+class PostgresNotifyBackend(InProcessBackend):
+    """
+    Fan-out across processes through PostgreSQL LISTEN/NOTIFY.
+
+    LISTEN needs a session of its own, so the listener connects directly with
+    the default database's parameters, outside any pool. Behind pgbouncer in
+    transaction mode, point the default database at PostgreSQL itself or use
+    a single worker with InProcessBackend.
+    """
+
+    channel = 'tars_events'
+    reconnect_delay = 5
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def subscribe(self, subscription):
+        super().subscribe(subscription)
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='events-listener', daemon=True)
+                self._listener.start()
+
+    def publish(self, message):
+        try:
+            with connections['default'].cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, message])
+        except DatabaseError:
+            logger.exception('Could not publish a live event')
+
+    def _listen(self):
+        import psycopg
+
+        params = connections['default'].get_connection_params()
+        while True:
+            try:
+                with psycopg.connect(**params, autocommit=True) as conn:
+                    conn.execute(f'LISTEN {self.channel}')
+                    for notify in conn.notifies():
+                        self.deliver(notify.payload)
+            except psycopg.Error:
+                logger.warning('Live events listener lost its connection, reconnecting', exc_info=True)
+            time.sleep(self.reconnect_delay)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(settings, 'EVENTS_BACKEND', 'core.events.InProcessBackend')
+                _backend = import_string(path)()
+    return _backend
+
+
+def encode(event, data, event_id=None):
+    """SSE wire format for one event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def publish(event, data):
+    """Send an event to every connected client; safe to call from any thread"""
+    get_backend().publish(encode(event, data, next(_event_ids)))
+
+
+def class_state(klass):
+    return {
+        'id': klass.pk,
+        'status': klass.computed_status,
+        'status_display': klass.computed_status_display,
+        'is_joinable': klass.is_joinable,
+    }
+
+
+class ClassScheduleWatcher:
+    """Publishes class.status events when a class crosses start_date or end_date"""
+
+    max_sleep = 60
+
+    def __init__(self):
+        self._loop = None
+        self._wake = None
+        self._task = None
+        self._states = None
+
+    def ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._states = None
+            self._task = loop.create_task(self._run())
+
+    def wake(self):
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass
+
+    def _snapshot(self):
+        from .models import Class
+
+        now = timezone.now()
+        states, next_boundary = {}, None
+        for klass in Class.objects.filter(is_active=True).only(
+            'id', 'status', 'is_active', 'start_date', 'end_date'
+        ):
+            states[klass.pk] = class_state(klass)
+            for boundary in (klass.start_date, klass.end_date):
+                if boundary and boundary > now and (next_boundary is None or boundary < next_boundary):
+                    next_boundary = boundary
+        return states, next_boundary
+
+    async def _run(self):
+        while get_backend().subscriber_count():
+            states, next_boundary = await sync_to_async(self._snapshot)()
+            if self._states is not None:
+                for pk, state in states.items():
+                    if self._states.get(pk) != state:
+                        # Every process runs its own watcher, so local delivery only
+                        get_backend().deliver(encode('class.status', state, next(_event_ids)))
+            self._states = states
+
+            sleep = self.max_sleep
+            if next_boundary is not None:
+                # Wake just after the boundary so computed_status has flipped
+                sleep = min(sleep, max((next_boundary - timezone.now()).total_seconds() + 0.5, 0.5))
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), sleep)
+            except asyncio.TimeoutError:
+                pass
+
+
+watcher = ClassScheduleWatcher()
+
+
+async def stream(heartbeat=None):
+    """Async iterator of SSE chunks for one client"""
+    heartbeat = heartbeat or getattr(settings, 'EVENTS_HEARTBEAT_SECONDS', 15)
+    backend = get_backend()
+    subscription = Subscription(asyncio.get_running_loop(), getattr(settings, 'EVENTS_QUEUE_SIZE', 100))
+    backend.subscribe(subscription)
+    watcher.ensure_running()
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            message = await subscription.next(heartbeat)
+            # A comment line keeps proxies from closing idle connections
+            yield message if message is not None else ': keep-alive\n\n'
+    finally:
+        backend.unsubscribe(subscription)
@@ -0,0 +1,182 @@
+"""
+iCalendar (RFC 5545) feeds of classes.
+
+Each class renders to a VEVENT once; the text is cached under a key that
+includes the class's ``updated_at``, so edits produce a new entry and stale
+ones simply age out. Whole feeds are cached against a calendar version that
+the Class signals in core.signals bump, and the same version backs the feed
+ETag so polling calendar apps usually get a 304 without any rendering.
+
+Subscription tokens carry the user id and a digest of the user's password
+hash, so changing the password revokes every URL handed out before; they
+also expire after ``ICAL_TOKEN_MAX_AGE`` seconds and stop working when the
+account is deactivated.
+"""
+import hashlib
+import time
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import Class
+
+VERSION_KEY = 'ical:version'
+EVENT_TIMEOUT = 7 * 24 * 3600
+FEED_TIMEOUT = 24 * 3600
+TOKEN_SALT = 'core.ical.feed'
+
+
+def calendar_version():
+    """Opaque stamp that changes whenever any class changes"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = str(time.time_ns())
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_calendar_version():
+    cache.set(VERSION_KEY, str(time.time_ns()), None)
+
+
+def _user_key(user):
+    return salted_hmac(TOKEN_SALT, f'{user.pk}:{user.password}').hexdigest()[:16]
+
+
+def feed_token(user):
+    """Signed token identifying ``user`` in subscription URLs"""
+    return signing.dumps([user.pk, _user_key(user)], salt=TOKEN_SALT)
+
+
+def user_id_from_token(token):
+    """User id of a valid token, or None if it is forged, expired or revoked"""
+    try:
+        user_id, key = signing.loads(token, salt=TOKEN_SALT, max_age=settings.ICAL_TOKEN_MAX_AGE)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+    if user is None or not constant_time_compare(key, _user_key(user)):
+        return None
+    return user.pk
+
+
+def _escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;')
+        .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Fold a content line to 75 octets as required by RFC 5545"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts, limit = [], 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte UTF-8 sequence
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # continuation lines start with a space
+    return '\r\n '.join(parts)
+
+
+def _stamp(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def render_event(klass):
+    """VEVENT text for one class, without caching"""
+    description = [klass.description, f'Instructor: {klass.instructor}']
+    if klass.meeting_link:
+        description.append(f'Join: {klass.meeting_link}')
+
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:class-{klass.pk}@tars',
+        f'DTSTAMP:{_stamp(klass.updated_at)}',
+        f'SEQUENCE:{int(klass.updated_at.timestamp())}',
+        f'DTSTART:{_stamp(klass.start_date)}',
+    ]
+    if klass.end_date:
+        lines.append(f'DTEND:{_stamp(klass.end_date)}')
+    lines += [
+        f'SUMMARY:{_escape(klass.title)}',
+        f'DESCRIPTION:{_escape(chr(10).join(description))}',
+    ]
+    if klass.location or klass.meeting_link:
+        lines.append(f'LOCATION:{_escape(klass.location or klass.meeting_link)}')
+    if klass.meeting_link:
+        lines.append(f'URL:{klass.meeting_link}')
+    lines += [
+        f"STATUS:{'CANCELLED' if klass.status == 'archived' else 'CONFIRMED'}",
+        'END:VEVENT',
+    ]
+    return '\r\n'.join(_fold(line) for line in lines)
+
+
+def _event_key(klass):
+    return f'ical:event:{klass.pk}:{klass.updated_at.timestamp()}'
+
+
+def cached_events(classes):
+    """VEVENT text for each class, rendering only those not already cached"""
+    classes = list(classes)
+    keys = {_event_key(klass): klass for klass in classes}
+    found = cache.get_many(keys.keys())
+    missing = {key: render_event(klass) for key, klass in keys.items() if key not in found}
+    if missing:
+        cache.set_many(missing, EVENT_TIMEOUT)
+        found.update(missing)
+    return [found[_event_key(klass)] for klass in classes]
+
+
+def _feed_classes():
+    return Class.objects.filter(is_active=True).order_by('start_date')
+
+
+def _member_classes(user_id):
+    return _feed_classes().filter(enrollments__user_id=user_id, enrollments__status='enrolled')
+
+
+def feed_etag(user_id=None):
+    """
+    ETag for a feed. The public feed only depends on the calendar version; a
+    member feed also depends on which classes the member holds seats in.
+    """
+    parts = [calendar_version()]
+    if user_id is not None:
+        ids = _member_classes(user_id).values_list('id', flat=True)
+        parts.append(','.join(str(pk) for pk in ids))
+    return hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+
+def build_feed(user_id=None, etag=None):
+    """Full VCALENDAR text, cached per ETag"""
+    etag = etag or feed_etag(user_id)
+    key = f'ical:feed:{user_id or "all"}:{etag}'
+    body = cache.get(key)
+    if body is None:
+        classes = _member_classes(user_id) if user_id is not None else _feed_classes()
+        name = 'My TARS Classes' if user_id is not None else 'TARS Classes'
+        body = '\r\n'.join([
+            'BEGIN:VCALENDAR',
+            'VERSION:2.0',
+            'PRODID:-//TARS Club//Classes//EN',
+            'CALSCALE:GREGORIAN',
+            'METHOD:PUBLISH',
+            f'X-WR-CALNAME:{name}',
+            *cached_events(classes),
+            'END:VCALENDAR',
+            '',
+        ])
+        cache.set(key, body, FEED_TIMEOUT)
+    return body
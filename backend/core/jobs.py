@@ -0,0 +1,217 @@
+"""
+Database-backed background jobs.
+
+Tasks are plain functions registered with ``@task``. ``enqueue()`` stores a
+``Job`` row (inside the caller's transaction, so a job never runs for a write
+that was rolled back) and ``manage.py run_worker`` claims and runs due jobs.
+Jobs name their task by dotted path and the worker imports the task's module
+the first time it runs one, so web processes never load the task modules.
+
+Claiming uses ``SELECT ... FOR UPDATE SKIP LOCKED`` where the backend supports
+it (PostgreSQL) so concurrent workers never wait on each other's rows. Other
+backends (SQLite) fall back to a conditional UPDATE on the job status; a worker
+that loses the race updates zero rows and moves on to the next candidate.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(func=None, *, name=None):
+    """
+    Register a function as a background task.
+
+    The task name defaults to the function's dotted path and is what gets
+    stored on the job row, so renaming a task orphans queued jobs. A custom
+    ``name`` must still start with the module path for get_task() to find it.
+    """
+    def register(f):
+        task_name = name or f'{f.__module__}.{f.__name__}'
+        _registry[task_name] = f
+        f.task_name = task_name
+        return f
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+def get_task(name):
+    """The task registered as ``name``, importing the module its path names if needed"""
+    module = name.rpartition('.')[0]
+    if name not in _registry and module:
+        try:
+            import_module(module)
+        except ImportError:
+            pass
+    return _registry.get(name)
+
+
+def _task_name(task_or_name):
+    return getattr(task_or_name, 'task_name', task_or_name)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(task_or_name, args=(), kwargs=None, *, run_at=None, delay=None,
+            priority=0, max_attempts=None):
+    """Queue a task for the worker; returns the created Job"""
+    if run_at is None:
+        run_at = timezone.now()
+        if delay:
+            run_at += delay if isinstance(delay, timedelta) else timedelta(seconds=delay)
+
+    return Job.objects.create(
+        task=_task_name(task_or_name),
+        args=list(args),
+        kwargs=kwargs or {},
+        run_at=run_at,
+        priority=priority,
+        max_attempts=max_attempts or _setting('JOB_MAX_ATTEMPTS', 5),
+    )
+
+
+def schedule_recurring(task_or_name, every, args=(), kwargs=None, *, key=None, priority=0):
+    """
+    Ensure a single recurring job exists for ``key`` (defaults to the task name).
+
+    The job is re-queued ``every`` seconds after each run. Calling this again
+    with a different interval updates the existing job in place.
+    """
+    seconds = int(every.total_seconds()) if isinstance(every, timedelta) else int(every)
+    task_name = _task_name(task_or_name)
+    job, created = Job.objects.get_or_create(
+        key=key or task_name,
+        defaults={
+            'task': task_name,
+            'args': list(args),
+            'kwargs': kwargs or {},
+            'run_at': timezone.now(),
+            'repeat_seconds': seconds,
+            'priority': priority,
+            'max_attempts': _setting('JOB_MAX_ATTEMPTS', 5),
+        },
+    )
+    if not created and job.repeat_seconds != seconds:
+        Job.objects.filter(pk=job.pk).update(repeat_seconds=seconds)
+    return job
+
+
+def sync_schedule():
+    """Create or update the recurring jobs declared in ``settings.JOB_SCHEDULE``"""
+    for key, entry in _setting('JOB_SCHEDULE', {}).items():
+        schedule_recurring(
+            entry['task'], entry['every'],
+            args=entry.get('args', ()), kwargs=entry.get('kwargs'),
+            key=key, priority=entry.get('priority', 0),
+        )
+
+
+def claim_jobs(worker_id, limit=1):
+    """Atomically mark up to ``limit`` due jobs as running for ``worker_id``"""
+    now = timezone.now()
+    db = router.db_for_write(Job)
+    due = (
+        Job.objects.using(db)
+        .filter(status='queued', run_at__lte=now)
+        .order_by('priority', 'run_at')
+    )
+    claim = {
+        'status': 'running',
+        'locked_by': worker_id,
+        'locked_at': now,
+        'attempts': F('attempts') + 1,
+        'updated_at': now,
+    }
+
+    if connections[db].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=db):
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            Job.objects.using(db).filter(id__in=ids).update(**claim)
+    else:
+        ids = []
+        for job_id in due.values_list('id', flat=True)[:limit * 4]:
+            if Job.objects.using(db).filter(id=job_id, status='queued').update(**claim):
+                ids.append(job_id)
+                if len(ids) == limit:
+                    break
+
+    return list(Job.objects.using(db).filter(id__in=ids).order_by('priority', 'run_at'))
+
+
+def retry_delay(attempts):
+    """Exponential backoff with full jitter, capped at JOB_RETRY_BACKOFF_MAX"""
+    base = _setting('JOB_RETRY_BACKOFF', 10)
+    cap = _setting('JOB_RETRY_BACKOFF_MAX', 3600)
+    return timedelta(seconds=random.uniform(0, min(cap, base * 2 ** max(attempts - 1, 0))))
+
+
+def run_job(job):
+    """Execute a claimed job and record the outcome; never raises"""
+    ours = Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by)
+    func = get_task(job.task)
+    try:
+        if func is None:
+            raise LookupError(f'Unknown task {job.task!r}')
+        func(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s (%s) failed on attempt %s', job.pk, job.task, job.attempts)
+        now = timezone.now()
+        if func is not None and job.attempts < job.max_attempts:
+            ours.update(status='queued', run_at=now + retry_delay(job.attempts),
+                        locked_by='', locked_at=None, last_error=error, updated_at=now)
+        elif job.repeat_seconds:
+            # Recurring jobs give up on this run but stay on the schedule
+            ours.update(status='queued', run_at=now + timedelta(seconds=job.repeat_seconds),
+                        attempts=0, locked_by='', locked_at=None, last_error=error, updated_at=now)
+        else:
+            ours.update(status='failed', locked_by='', locked_at=None, last_error=error, updated_at=now)
+        return False
+
+    now = timezone.now()
+    if job.repeat_seconds:
+        ours.update(status='queued', run_at=now + timedelta(seconds=job.repeat_seconds),
+                    attempts=0, locked_by='', locked_at=None, last_error='', updated_at=now)
+    else:
+        ours.update(status='done', locked_by='', locked_at=None, last_error='', updated_at=now)
+    return True
+
+
+def requeue_stale_jobs(timeout=None):
+    """
+    Return jobs locked by a worker that died mid-run to the queue. A job
+    that has used up its attempts is failed instead (or, if recurring, put
+    back on its schedule), so a task that kills its worker can't loop forever.
+    """
+    timeout = timeout or _setting('JOB_LOCK_TIMEOUT', 600)
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=timeout))
+    exhausted = stale.filter(attempts__gte=F('max_attempts'))
+    error = f'Worker stopped responding while running the job (locked for over {timeout}s)'
+
+    for job in exhausted.filter(repeat_seconds__gt=0):
+        logger.warning('Recurring job %s (%s) exceeded its attempts in dead workers', job.pk, job.task)
+        exhausted.filter(pk=job.pk).update(
+            status='queued', run_at=now + timedelta(seconds=job.repeat_seconds), attempts=0,
+            locked_by='', locked_at=None, last_error=error, updated_at=now,
+        )
+    failed = exhausted.update(status='failed', locked_by='', locked_at=None, last_error=error, updated_at=now)
+    if failed:
+        logger.warning('Failed %d job(s) that exceeded their attempts in dead workers', failed)
+    return stale.update(status='queued', locked_by='', locked_at=None, updated_at=now)
@@ -0,0 +1,71 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from core.autocomplete import build_index
+from core.models import Class, Resource
+
+
+def _icontains(prefix, limit):
+    """What the search box did before: one query per model and keystroke"""
+    classes = list(
+        Class.objects.filter(Q(title__icontains=prefix) | Q(instructor__icontains=prefix), is_active=True)
+        .order_by('-enrolled_count').values_list('title', 'instructor')[:limit]
+    )
+    resources = list(
+        Resource.objects.filter(Q(title__icontains=prefix) | Q(author__icontains=prefix), is_active=True)
+        .order_by('-download_count').values_list('title', 'author')[:limit]
+    )
+    return classes + resources
+
+
+class Command(BaseCommand):
+    help = 'Time autocomplete lookups on the in-memory prefix index against icontains queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=500, help='Typed words to replay')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        index = build_index()
+        build_ms = (time.perf_counter() - start) * 1000
+        if not index.entries:
+            raise CommandError('No active classes or resources to index')
+        self.stdout.write(
+            f'Index: {len(index.entries)} suggestions, {len(index.keys)} keys, built in {build_ms:.1f} ms'
+        )
+
+        # What a save costs the worker that made it: one retitled document
+        rng = random.Random(options['seed'])
+        doc_key = rng.choice(list(index.docs))
+        edited = [(type_, f'{text} revised', score) for type_, text, score in index.docs[doc_key]]
+        start = time.perf_counter()
+        index.patched({doc_key: edited})
+        self.stdout.write(f'Patched one document in {(time.perf_counter() - start) * 1000:.2f} ms')
+
+        # Replay typing: every prefix of a word taken from a suggestion
+        words = [word for entry in index.entries.values() for word in entry[4].split(' ') if word]
+        prefixes = []
+        for word in rng.choices(words, k=options['queries']):
+            prefixes.extend(word[:n] for n in range(1, len(word) + 1))
+
+        self.stdout.write(f"{len(prefixes)} keystrokes, limit {options['limit']} (µs/lookup)")
+        self.stdout.write(f"  {'':12} {'p50':>10} {'p99':>10} {'max':>10}")
+        for label, lookup, sample in [
+            ('prefix index', lambda p: index.search(p, options['limit']), prefixes),
+            ('icontains', lambda p: _icontains(p, options['limit']), prefixes[:200]),
+        ]:
+            timings = []
+            for prefix in sample:
+                start = time.perf_counter()
+                lookup(prefix)
+                timings.append((time.perf_counter() - start) * 1e6)
+            p99 = statistics.quantiles(timings, n=100)[98] if len(timings) > 1 else timings[0]
+            self.stdout.write(
+                f'  {label:12} {statistics.median(timings):10.1f} {p99:10.1f} {max(timings):10.1f}'
+            )
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import time
+
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.core.management.commands.createcachetable import Command as CreateCacheTable
+from django.db import connection
+
+from tars.sqlite_cache import SQLiteCache
+
+BENCH_TABLE = 'bench_cache_table'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the shared SQLite cache against LocMemCache and DatabaseCache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=2000, help='Operations per measurement')
+        parser.add_argument('--keys', type=int, default=500, help='Distinct keys written')
+        parser.add_argument('--no-db', action='store_true', help='Skip DatabaseCache')
+
+    def handle(self, *args, **options):
+        ops, keys = options['ops'], options['keys']
+        params = {'TIMEOUT': 300, 'OPTIONS': {'MAX_ENTRIES': keys * 2}}
+        payload = {'title': 'Resource', 'tags': ['python', 'django'] * 10, 'count': 42}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            backends = {
+                'locmem': LocMemCache('bench', params),
+                'sqlite': SQLiteCache(os.path.join(tmp, 'cache.sqlite3'), params),
+            }
+            if not options['no_db']:
+                create = CreateCacheTable()
+                create.verbosity = 0
+                create.create_table(connection.alias, BENCH_TABLE, False)
+                backends['database'] = DatabaseCache(BENCH_TABLE, params)
+
+            try:
+                self.stdout.write(f'{ops} ops per row, {keys} keys (µs/op)')
+                self.stdout.write(f"  {'':10}" + ''.join(f'{name:>12}' for name in backends))
+                for label, run in [
+                    ('set', lambda c, i: c.set(f'k{i % keys}', payload)),
+                    ('get hit', lambda c, i: c.get(f'k{i % keys}')),
+                    ('get miss', lambda c, i: c.get(f'missing{i}')),
+                    ('get_many', lambda c, i: c.get_many([f'k{(i + j) % keys}' for j in range(10)])),
+                    ('incr', lambda c, i: c.incr('counter')),
+                    ('add', lambda c, i: c.add(f'lock{i}', 1, 30)),
+                ]:
+                    row = []
+                    for backend in backends.values():
+                        backend.set('counter', 0)
+                        row.append(self._time(backend, run, ops))
+                    self.stdout.write(f'  {label:10}' + ''.join(f'{us:12.1f}' for us in row))
+            finally:
+                if 'database' in backends:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'DROP TABLE {connection.ops.quote_name(BENCH_TABLE)}')
+
+    def _time(self, backend, run, ops):
+        start = time.perf_counter()
+        for i in range(ops):
+            run(backend, i)
+        return (time.perf_counter() - start) / ops * 1e6
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+
+from core.media import clear_media_url_cache, media_url_cache_info
+from core.models import Resource
+from core.serializers import ResourceSerializer
+
+
+class UncachedResourceSerializer(ResourceSerializer):
+    """ResourceSerializer with DRF's stock file fields, for comparison"""
+    serializer_field_mapping = serializers.ModelSerializer.serializer_field_mapping
+
+
+class Command(BaseCommand):
+    help = 'Benchmark resource list serialization with and without the media URL cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Resources per list')
+        parser.add_argument('--repeat', type=int, default=20, help='List serializations per path')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+
+        # Unsaved instances: only URL building and serialization are measured
+        resources = [
+            Resource(
+                id=i, title=f'Resource {i}', description='Benchmark', category='article',
+                thumbnail=f'resources/thumb_{i}.png', file=f'resource_files/file_{i}.pdf',
+            )
+            for i in range(rows)
+        ]
+
+        clear_media_url_cache()
+        uncached = self._time(UncachedResourceSerializer, resources, repeat)
+        cached = self._time(ResourceSerializer, resources, repeat)
+
+        self.stdout.write(f'{rows} rows x {repeat} lists')
+        self.stdout.write(f'  storage url per field: {uncached * 1000:.2f} ms/list')
+        self.stdout.write(f'  cached media urls:     {cached * 1000:.2f} ms/list')
+        self.stdout.write(f'  speedup:               {uncached / cached:.2f}x')
+        self.stdout.write(f'  cache: {media_url_cache_info()}')
+
+    def _time(self, serializer_class, resources, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            serializer_class(resources, many=True).data
+        return (time.perf_counter() - start) / repeat
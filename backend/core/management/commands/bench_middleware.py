@@ -0,0 +1,72 @@
+import time
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    help = (
+        'Time home_page_data through the middleware stack with and without the lean /api/ chain. '
+        'Requests go straight to the handler, so only middleware and view time is measured.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per round')
+        parser.add_argument('--rounds', type=int, default=5, help='Rounds per arrangement (best is kept)')
+        parser.add_argument('--host', help='Host header (default: the first ALLOWED_HOSTS entry)')
+
+    def handle(self, *args, **options):
+        host = options['host'] or next(
+            (h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost'
+        )
+        factory = RequestFactory(HTTP_HOST=host)
+        url = reverse('home_page_data')
+
+        handlers = {}
+        for label, overrides in [
+            ('no middleware', {'MIDDLEWARE': []}),
+            ('full chain', {'LEAN_MIDDLEWARE_PREFIXES': []}),
+            ('lean /api/', {}),
+        ]:
+            with override_settings(**overrides):
+                handler = BaseHandler()
+                handler.load_middleware()
+            handlers[label] = handler
+
+        # Warm the payload cache and check every arrangement serves the page
+        for label, handler in handlers.items():
+            response = handler.get_response(factory.get(url))
+            if response.status_code != 200:
+                raise CommandError(f'{label}: {url} returned {response.status_code}')
+        full = handlers['full chain'].get_response(factory.get(url))
+        lean = handlers['lean /api/'].get_response(factory.get(url))
+        if 'X-Frame-Options' not in full or 'X-Frame-Options' in lean:
+            raise CommandError('The browser middleware did not run where expected')
+
+        best = dict.fromkeys(handlers, float('inf'))
+        for _ in range(options['rounds']):
+            # Interleaved, so drift affects every arrangement alike
+            for label, handler in handlers.items():
+                best[label] = min(best[label], self._time(handler, factory, url, options['requests']))
+
+        base = best['no middleware']
+        self.stdout.write(f"GET {url}, best of {options['rounds']} x {options['requests']} requests")
+        for label, us in best.items():
+            overhead = f'  (+{us - base:.1f} µs middleware)' if label != 'no middleware' else ''
+            self.stdout.write(f'  {label:14} {us:8.1f} µs/request{overhead}')
+        saved = best['full chain'] - best['lean /api/']
+        self.stdout.write(
+            f'  saved by the lean chain: {saved:.1f} µs/request '
+            f"({saved / (best['full chain'] - base) * 100:.0f}% of the middleware overhead)"
+        )
+
+    def _time(self, handler, factory, url, count):
+        requests = [factory.get(url) for _ in range(count)]
+        start = time.perf_counter()
+        for request in requests:
+            handler.get_response(request)
+        return (time.perf_counter() - start) / count * 1e6
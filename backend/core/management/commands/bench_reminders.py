@@ -0,0 +1,61 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Class, ClassReminder, Enrollment
+from core.reminders import send_class_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        'Time a class reminder fan-out to many members and check a second run sends nothing. '
+        'Creates throwaway users and a class, and deletes them afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=5000)
+        parser.add_argument(
+            '--backend', default='django.core.mail.backends.locmem.EmailBackend',
+            help='Email backend to send through (default keeps messages in memory)',
+        )
+
+    def handle(self, *args, **options):
+        count = options['recipients']
+        prefix = f'remind-{int(time.time())}-'
+        User.objects.bulk_create(
+            [User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com') for i in range(count)]
+        )
+        users = User.objects.filter(username__startswith=prefix)
+        # Inactive so the real scheduler never picks it up
+        klass = Class.objects.create(
+            title=f'{prefix}class', description='Reminder benchmark', instructor='bench',
+            start_date=timezone.now() + timedelta(minutes=30), duration='1 hour',
+            max_participants=count, enrolled_count=count, is_active=False,
+        )
+        Enrollment.objects.bulk_create([Enrollment(klass=klass, user=user) for user in users])
+        mail.outbox = []
+
+        try:
+            began = time.perf_counter()
+            with get_connection(options['backend']) as connection:
+                sent = send_class_reminders(klass, 'hour', connection)
+            elapsed = time.perf_counter() - began
+            with get_connection(options['backend']) as connection:
+                resent = send_class_reminders(klass, 'hour', connection)
+
+            recorded = ClassReminder.objects.filter(klass=klass, kind='hour').count()
+            self.stdout.write(
+                f'{sent} reminders in {elapsed:.2f}s ({sent / elapsed:.0f}/s), '
+                f'{recorded} recorded, {resent} sent on the second run'
+            )
+            if sent != count or recorded != count or resent:
+                raise CommandError('Reminders were skipped or duplicated')
+            self.stdout.write(self.style.SUCCESS('OK: every member reminded exactly once'))
+        finally:
+            klass.delete()
+            users.delete()
@@ -0,0 +1,160 @@
+import http.client
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+VARIANTS = {
+    'runserver': lambda port: ([sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}'], {}),
+    'gunicorn': lambda port: ([sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'], {}),
+    'gunicorn-asgi': lambda port: (
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'], {'GUNICORN_ASGI': '1'},
+    ),
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _process_tree(pid):
+    """``pid`` and all of its descendants, from /proc"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+
+def _memory_mb(pid):
+    """(RSS, PSS) summed over the process tree; PSS splits copy-on-write pages fairly"""
+    rss = pss = 0
+    for member in _process_tree(pid):
+        try:
+            with open(f'/proc/{member}/smaps_rollup') as f:
+                for line in f:
+                    if line.startswith('Rss:'):
+                        rss += int(line.split()[1])
+                    elif line.startswith('Pss:'):
+                        pss += int(line.split()[1])
+        except OSError:
+            continue
+    return rss / 1024, pss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput and memory of runserver, gunicorn (gthread) and gunicorn with uvicorn workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/health/')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--workers', type=int, help='Override the auto-sized worker count')
+        parser.add_argument('--variants', nargs='+', choices=sorted(VARIANTS), default=list(VARIANTS))
+
+    def handle(self, *args, **options):
+        if not os.path.isdir('/proc'):
+            raise CommandError('bench_server reads process memory from /proc (Linux only)')
+
+        self.stdout.write(
+            f"{options['requests']} x GET {options['path']}, concurrency {options['concurrency']}"
+        )
+        self.stdout.write(f"  {'variant':14} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} "
+                          f"{'procs':>6} {'RSS MB':>8} {'PSS MB':>8}")
+        for name in options['variants']:
+            row = self._bench(name, options)
+            self.stdout.write(
+                f"  {name:14} {row['rps']:8.0f} {row['p50']:8.1f} {row['p99']:8.1f} {row['errors']:7} "
+                f"{row['procs']:6} {row['rss']:8.0f} {row['pss']:8.0f}"
+            )
+
+    def _bench(self, name, options):
+        port = _free_port()
+        command, extra_env = VARIANTS[name](port)
+        env = dict(os.environ, GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_ACCESS_LOG=os.devnull, **extra_env)
+        if options['workers']:
+            env['WEB_CONCURRENCY'] = str(options['workers'])
+        server = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            self._wait_ready(port, options['path'], server)
+            latencies, errors, elapsed = self._load(port, options)
+            rss, pss = _memory_mb(server.pid)
+            return {
+                'rps': len(latencies) / elapsed,
+                'p50': statistics.median(latencies) * 1000 if latencies else 0,
+                'p99': statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else 0,
+                'errors': errors,
+                'procs': len(_process_tree(server.pid)),
+                'rss': rss,
+                'pss': pss,
+            }
+        finally:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    def _wait_ready(self, port, path, server, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Server exited with status {server.returncode}')
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+                conn.request('GET', path)
+                conn.getresponse().read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError('Server did not start in time')
+
+    def _load(self, port, options):
+        per_client = options['requests'] // options['concurrency']
+
+        def client(_):
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            latencies, errors = [], 0
+            for _ in range(per_client):
+                start = time.perf_counter()
+                try:
+                    conn.request('GET', options['path'])
+                    response = conn.getresponse()
+                    response.read()
+                    if response.status >= 500:
+                        errors += 1
+                    latencies.append(time.perf_counter() - start)
+                except (OSError, http.client.HTTPException):
+                    errors += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.close()
+            return latencies, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            results = list(pool.map(client, range(options['concurrency'])))
+        elapsed = time.perf_counter() - start
+        return [lat for lats, _ in results for lat in lats], sum(e for _, e in results), elapsed
@@ -0,0 +1,46 @@
+import sys
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import FORMATS, default_fields, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream any core model as CSV or JSONL, e.g. `export_data Resource --filter is_active=True`'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='Model name in the core app, e.g. Resource or Enrollment')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument(
+            '--fields', help='Comma-separated fields; lookups like user__email are allowed',
+        )
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='LOOKUP=VALUE',
+            help='Queryset filter, may be repeated',
+        )
+        parser.add_argument('--output', help='Write to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model('core', options['model'])
+        except LookupError:
+            raise CommandError(f"Unknown model {options['model']!r}")
+
+        filters = {}
+        for item in options['filter']:
+            lookup, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Filters look like lookup=value, got {item!r}')
+            filters[lookup] = {'True': True, 'False': False, 'None': None}.get(value, value)
+
+        fields = options['fields'].split(',') if options['fields'] else default_fields(model)
+        queryset = model._default_manager.filter(**filters).order_by('pk')
+
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for line in iter_rows(queryset, fields, options['format']):
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
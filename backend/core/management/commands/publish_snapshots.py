@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.snapshots import publish_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Write the static JSON snapshots of public data into STATIC_ROOT/snapshots/'
+
+    def handle(self, *args, **options):
+        pointer = publish_snapshots()
+        for name, url in pointer['files'].items():
+            self.stdout.write(f'{name}: {url}')
+        self.stdout.write(self.style.SUCCESS(f"Published snapshot version {pointer['version']}"))
@@ -0,0 +1,81 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core.jobs import claim_jobs, requeue_stale_jobs, run_job, sync_schedule
+from core.slowqueries import flush_pending
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=getattr(settings, 'JOB_WORKER_CONCURRENCY', 2),
+            help='Number of jobs run in parallel (threads)',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=getattr(settings, 'JOB_POLL_INTERVAL', 2.0),
+            help='Seconds to sleep when the queue is empty',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Run every job that is currently due, then exit',
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        poll_interval = options['poll_interval']
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            self.stdout.write('Shutting down after running jobs finish...')
+            stop.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        sync_schedule()
+        self.stdout.write(f'Worker {worker_id} started with concurrency {concurrency}')
+
+        running = set()
+        last_stale_check = 0
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job') as pool:
+            while not stop.is_set():
+                if time.monotonic() - last_stale_check > 60:
+                    requeue_stale_jobs()
+                    last_stale_check = time.monotonic()
+
+                free = concurrency - len(running)
+                jobs = claim_jobs(worker_id, free) if free else []
+                for job in jobs:
+                    running.add(pool.submit(self._run, job))
+
+                if running and (not free or not jobs):
+                    done, running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                elif not jobs:
+                    if options['once']:
+                        break
+                    stop.wait(poll_interval)
+
+            wait(running)
+        connections.close_all()
+
+    def _run(self, job):
+        close_old_connections()
+        try:
+            ok = run_job(job)
+            self.stdout.write(f"{'done' if ok else 'failed'}: #{job.pk} {job.task}")
+            flush_pending()
+        finally:
+            connections.close_all()
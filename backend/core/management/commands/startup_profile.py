@@ -0,0 +1,72 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = (
+        'Profile a cold start in a fresh interpreter: import time aggregated per '
+        'package (python -X importtime) plus per-app import, models and ready() cost'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Rows per table')
+        parser.add_argument(
+            '--group', choices=['package', 'module'], default='package',
+            help='Aggregate import self-time by top-level package or list single modules',
+        )
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE))
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'core.startup_probe'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode:
+            raise CommandError(f'Startup probe failed:\n{proc.stderr[-4000:]}')
+        report = json.loads(proc.stdout)
+        top = options['top']
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Startup phases'))
+        for name, seconds in report['phases'].items():
+            self.stdout.write(f'  {name:32} {seconds * 1000:9.1f} ms')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Apps (ms)'))
+        self.stdout.write(f"  {'app':24} {'import':>9} {'models':>9} {'ready':>9}")
+        apps = sorted(report['apps'].items(), key=lambda item: -sum(item[1].values()))
+        for label, timing in apps[:top]:
+            self.stdout.write(
+                f"  {label:24} {timing['import'] * 1000:9.1f} "
+                f"{timing['models'] * 1000:9.1f} {timing['ready'] * 1000:9.1f}"
+            )
+
+        self_us, cumulative_us, count = defaultdict(int), {}, defaultdict(int)
+        for line in proc.stderr.splitlines():
+            match = IMPORTTIME_RE.match(line)
+            if not match:
+                continue
+            own, cumulative, indent, module = match.groups()
+            key = module.split('.')[0] if options['group'] == 'package' else module
+            self_us[key] += int(own)
+            count[key] += 1
+            if len(indent) <= 1:
+                cumulative_us[module] = int(cumulative)
+        total = sum(self_us.values()) or 1
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Import self-time by {options['group']} ({total / 1000:.1f} ms total)"))
+        for key, us in sorted(self_us.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {key:40} {us / 1000:9.1f} ms {us / total:6.1%} {count[key]:5} modules')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Slowest top-level imports (cumulative)'))
+        for module, us in sorted(cumulative_us.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {module:40} {us / 1000:9.1f} ms')
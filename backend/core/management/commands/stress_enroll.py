@@ -0,0 +1,92 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from core.enrollment import ClassFullError, enroll, unenroll
+from core.models import Class, Enrollment
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer one class with concurrent enroll/unenroll calls and verify it is never overbooked. '
+        'Creates throwaway users and a class, and deletes them afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=300, help='Members racing for seats')
+        parser.add_argument('--seats', type=int, default=30, help='max_participants of the class')
+        parser.add_argument('--threads', type=int, default=32, help='Concurrent request threads')
+        parser.add_argument('--waitlist', action='store_true', help='Enable the waitlist')
+        parser.add_argument('--churn', type=int, default=0, help='Unenroll this many seated members concurrently')
+
+    def handle(self, *args, **options):
+        members, seats = options['members'], options['seats']
+        prefix = f'stress-{int(time.time())}-'
+        users = User.objects.bulk_create(
+            [User(username=f'{prefix}{i}') for i in range(members)]
+        )
+        users = list(User.objects.filter(username__startswith=prefix))
+        klass = Class.objects.create(
+            title=f'{prefix}class', description='Enrollment stress test', instructor='stress',
+            start_date=timezone.now(), duration='1 hour', max_participants=seats,
+            waitlist_enabled=options['waitlist'], is_active=False,
+        )
+
+        start = threading.Event()
+        full = []
+
+        def attempt(user):
+            start.wait()
+            try:
+                enroll(klass, user)
+            except ClassFullError:
+                full.append(user.pk)
+            finally:
+                connections.close_all()
+
+        def leave(user):
+            try:
+                unenroll(klass, user)
+            finally:
+                connections.close_all()
+
+        try:
+            began = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                futures = [pool.submit(attempt, user) for user in users]
+                start.set()
+                for future in futures:
+                    future.result()
+            elapsed = time.perf_counter() - began
+
+            if options['churn']:
+                seated = [e.user for e in klass.enrollments.filter(status='enrolled').select_related('user')]
+                with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                    list(pool.map(leave, seated[:options['churn']]))
+
+            klass.refresh_from_db()
+            enrolled = Enrollment.objects.filter(klass=klass, status='enrolled').count()
+            waitlisted = Enrollment.objects.filter(klass=klass, status='waitlisted').count()
+
+            self.stdout.write(
+                f'{members} members, {seats} seats, {options["threads"]} threads: {elapsed:.2f}s '
+                f'({members / elapsed:.0f} enrollments/s)'
+            )
+            self.stdout.write(
+                f'  enrolled_count={klass.enrolled_count} enrolled rows={enrolled} '
+                f'waitlisted={waitlisted} rejected={len(full)}'
+            )
+
+            if klass.enrolled_count > seats or enrolled > seats:
+                raise CommandError('Class was overbooked')
+            if klass.enrolled_count != enrolled:
+                raise CommandError('enrolled_count does not match enrollment rows')
+            self.stdout.write(self.style.SUCCESS('OK: no overbooking'))
+        finally:
+            klass.delete()
+            User.objects.filter(username__startswith=prefix).delete()
@@ -0,0 +1,53 @@
+"""
+Cached URL resolution for uploaded media files.
+
+Building a URL through the configured storage (Cloudinary formats every URL
+from its config) is repeated for each file field of each row on every list
+request. Media names are unique per upload, so a resolved URL never changes
+for a given (storage, name) pair and can be held in a bounded LRU.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+
+@lru_cache(maxsize=getattr(settings, 'MEDIA_URL_CACHE_SIZE', 4096))
+def _resolve_url(storage, name):
+    return storage.url(name)
+
+
+def media_url(file):
+    """Return the storage URL for a FieldFile, memoized per storage and name"""
+    return _resolve_url(file.storage, file.name)
+
+
+def clear_media_url_cache():
+    _resolve_url.cache_clear()
+
+
+def media_url_cache_info():
+    return _resolve_url.cache_info()
+
+
+class CachedFileField(serializers.FileField):
+    """FileField that resolves URLs through the media URL cache"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+
+        use_url = getattr(self, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+        if not use_url:
+            return value.name
+
+        url = media_url(value)
+        request = self.context.get('request', None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class CachedImageField(CachedFileField, serializers.ImageField):
+    """ImageField that resolves URLs through the media URL cache"""
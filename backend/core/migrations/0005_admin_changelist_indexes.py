@@ -0,0 +1,72 @@
+# Generated by Django 5.2 on 2026-10-19 14:37
+
+import sys
+
+from django.db import DatabaseError, migrations, models, transaction
+
+
+# Trigram GIN indexes over UPPER(col::text) match the expression Django emits
+# for icontains on PostgreSQL, so admin search_fields become index scans.
+# Creating pg_trgm needs a privileged role on most hosted databases; without it
+# the indexes are skipped and search falls back to sequential scans (see
+# DEPLOYMENT.md for creating them by hand).
+TRIGRAM_INDEXES = [
+    ('core_class', 'title'),
+    ('core_class', 'instructor'),
+    ('core_class', 'description'),
+    ('core_resource', 'title'),
+    ('core_resource', 'description'),
+    ('core_resource', 'author'),
+    ('core_resource', 'tags'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        # Savepoint so a refused CREATE EXTENSION doesn't abort the migration
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError as e:
+        sys.stderr.write(f'  Skipping trigram indexes, pg_trgm is not available: {e}\n')
+        return
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm_idx '
+            f'ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='class',
+            index=models.Index(fields=['order', '-start_date'], name='core_class_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='class',
+            index=models.Index(fields=['start_date'], name='core_class_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['order', '-created_at'], name='core_resource_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['created_at'], name='core_resource_created_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-19 14:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_admin_changelist_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='class',
+            name='waitlist_enabled',
+            field=models.BooleanField(default=False, help_text='Queue members on a waitlist when full; the first in line gets the next free seat'),
+        ),
+        migrations.AlterField(
+            model_name='class',
+            name='enrolled_count',
+            field=models.IntegerField(default=0, help_text='Maintained by enrollments'),
+        ),
+        migrations.CreateModel(
+            name='Enrollment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('enrolled', 'Enrolled'), ('waitlisted', 'Waitlisted')], default='enrolled', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('klass', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='core.class', verbose_name='class')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Enrollment',
+                'verbose_name_plural': 'Enrollments',
+                'ordering': ['klass', 'created_at'],
+                'indexes': [models.Index(fields=['klass', 'status', 'created_at'], name='core_enrollment_queue_idx')],
+                'constraints': [models.UniqueConstraint(fields=('klass', 'user'), name='core_enrollment_unique_member')],
+            },
+        ),
+    ]
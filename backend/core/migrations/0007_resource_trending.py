@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-19 14:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_enrollment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingResource',
+            fields=[
+                ('resource', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='core.resource')),
+                ('score', models.FloatField(db_index=True)),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Trending Resource',
+                'verbose_name_plural': 'Trending Resources',
+                'ordering': ['-score'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResourceDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('downloads', models.PositiveIntegerField(default=0)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.resource')),
+            ],
+            options={
+                'verbose_name': 'Resource Daily Stat',
+                'verbose_name_plural': 'Resource Daily Stats',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day'], name='core_dailystat_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('resource', 'day'), name='core_resourcedailystat_unique_day')],
+            },
+        ),
+    ]
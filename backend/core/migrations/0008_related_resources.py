@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-19 14:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_resource_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedResource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.resource')),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='core.resource')),
+            ],
+            options={
+                'verbose_name': 'Related Resource',
+                'verbose_name_plural': 'Related Resources',
+                'ordering': ['resource', 'rank'],
+                'indexes': [models.Index(fields=['resource', 'rank'], name='core_related_lookup_idx')],
+                'constraints': [models.UniqueConstraint(fields=('resource', 'related'), name='core_relatedresource_unique_pair')],
+            },
+        ),
+    ]
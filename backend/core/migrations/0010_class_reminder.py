@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-19 15:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_chunked_upload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(help_text='Reminder window (CLASS_REMINDER_WINDOWS)', max_length=20)),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+                ('klass', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='core.class', verbose_name='class')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_reminders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Class Reminder',
+                'verbose_name_plural': 'Class Reminders',
+                'ordering': ['-sent_at'],
+                'constraints': [models.UniqueConstraint(fields=('klass', 'user', 'kind'), name='core_classreminder_unique_kind')],
+            },
+        ),
+    ]
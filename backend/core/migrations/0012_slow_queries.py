@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-19 15:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_request_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQueryStat',
+            fields=[
+                ('fingerprint', models.CharField(max_length=16, primary_key=True, serialize=False)),
+                ('sql', models.TextField(help_text='Normalized SQL: literals and placeholders replaced by ?')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Slow Query',
+                'verbose_name_plural': 'Slow Queries',
+                'ordering': ['-last_seen'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SlowQuerySample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duration_ms', models.FloatField()),
+                ('database', models.CharField(max_length=50)),
+                ('params_fingerprint', models.CharField(help_text='Hash of the parameters', max_length=16)),
+                ('view', models.CharField(blank=True, help_text='URL name of the view that ran it', max_length=200)),
+                ('location', models.CharField(blank=True, help_text='Innermost project frame', max_length=300)),
+                ('explain', models.TextField(blank=True, help_text='EXPLAIN (ANALYZE, BUFFERS) output')),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('stat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='samples', to='core.slowquerystat')),
+            ],
+            options={
+                'verbose_name': 'Slow Query Sample',
+                'verbose_name_plural': 'Slow Query Samples',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
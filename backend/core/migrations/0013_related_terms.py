@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-19 15:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_slow_queries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedTermFrequency',
+            fields=[
+                ('term', models.CharField(max_length=200, primary_key=True, serialize=False)),
+                ('documents', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Related Term Frequency',
+                'verbose_name_plural': 'Related Term Frequencies',
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=200)),
+                ('count', models.FloatField(help_text='Weighted term frequency')),
+                ('weight', models.FloatField(help_text='Normalized TF-IDF weight when last indexed; 0 for terms too common to use')),
+                ('resource', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.resource')),
+            ],
+            options={
+                'verbose_name': 'Related Term',
+                'verbose_name_plural': 'Related Terms',
+                'indexes': [models.Index(fields=['term', 'weight'], name='core_relatedterm_posting_idx')],
+                'constraints': [models.UniqueConstraint(fields=('resource', 'term'), name='core_relatedterm_unique')],
+            },
+        ),
+    ]
@@ -1,3 +1,6 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 from django.core.validators import URLValidator
 
@@ -116,7 +119,11 @@ class Class(models.Model):
     end_date = models.DateTimeField(blank=True, null=True)
     duration = models.CharField(max_length=100, help_text="e.g., '4 weeks' or '10 hours'")
     max_participants = models.IntegerField(default=30)
-    enrolled_count = models.IntegerField(default=0)
+    enrolled_count = models.IntegerField(default=0, help_text="Maintained by enrollments")
+    waitlist_enabled = models.BooleanField(
+        default=False,
+        help_text="Queue members on a waitlist when full; the first in line gets the next free seat"
+    )
     meeting_link = models.URLField(blank=True, null=True, help_text="Zoom/Meet link for online classes")
     location = models.CharField(max_length=300, blank=True, null=True, help_text="Physical location if applicable")
     syllabus = models.FileField(upload_to='class_syllabus/', blank=True, null=True)
@@ -127,12 +134,26 @@ class Class(models.Model):
     
     class Meta:
         ordering = ['order', '-start_date']
+        indexes = [
+            models.Index(fields=['order', '-start_date'], name='core_class_order_idx'),
+            models.Index(fields=['start_date'], name='core_class_start_date_idx'),
+        ]
         verbose_name = "Class"
         verbose_name_plural = "Classes"
     
     def __str__(self):
         return f"{self.title} - {self.get_status_display()}"
-    
+
+    def save(self, *args, **kwargs):
+        # enrolled_count only changes through conditional UPDATEs in
+        # core.enrollment; saving an instance loaded earlier (the admin form)
+        # must not write its stale count back
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != 'enrolled_count'
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def is_full(self):
         return self.enrolled_count >= self.max_participants
@@ -257,6 +278,53 @@ class Class(models.Model):
         return mode_map.get(self.mode, 'Online')
 
 
+class Enrollment(models.Model):
+    """A member's seat (or waitlist place) in a class, managed by core.enrollment"""
+    STATUS_CHOICES = [
+        ('enrolled', 'Enrolled'),
+        ('waitlisted', 'Waitlisted'),
+    ]
+
+    klass = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='enrollments', verbose_name='class')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='enrollments')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='enrolled')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['klass', 'created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['klass', 'user'], name='core_enrollment_unique_member'),
+        ]
+        indexes = [
+            models.Index(fields=['klass', 'status', 'created_at'], name='core_enrollment_queue_idx'),
+        ]
+        verbose_name = "Enrollment"
+        verbose_name_plural = "Enrollments"
+
+    def __str__(self):
+        return f"{self.user} - {self.klass.title} ({self.get_status_display()})"
+
+
+class ClassReminder(models.Model):
+    """A reminder email a member has been sent for a class (see core.reminders)"""
+    klass = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='reminders', verbose_name='class')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='class_reminders')
+    kind = models.CharField(max_length=20, help_text="Reminder window (CLASS_REMINDER_WINDOWS)")
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-sent_at']
+        constraints = [
+            models.UniqueConstraint(fields=['klass', 'user', 'kind'], name='core_classreminder_unique_kind'),
+        ]
+        verbose_name = "Class Reminder"
+        verbose_name_plural = "Class Reminders"
+
+    def __str__(self):
+        return f"{self.user} - {self.klass_id} ({self.kind})"
+
+
 class Resource(models.Model):
     """Learning resources and materials"""
     CATEGORY_CHOICES = [
@@ -288,6 +356,10 @@ class Resource(models.Model):
     
     class Meta:
         ordering = ['order', '-created_at']
+        indexes = [
+            models.Index(fields=['order', '-created_at'], name='core_resource_order_idx'),
+            models.Index(fields=['created_at'], name='core_resource_created_idx'),
+        ]
         verbose_name = "Resource"
         verbose_name_plural = "Resources"
     
@@ -300,3 +372,246 @@ class Resource(models.Model):
         if self.tags:
             return [tag.strip() for tag in self.tags.split(',')]
         return []
+
+
+class Job(models.Model):
+    """Background job stored in the database and executed by `manage.py run_worker`"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=200, help_text="Registered task name (see core.jobs)")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    key = models.CharField(
+        max_length=200, unique=True, blank=True, null=True,
+        help_text="Optional unique key, used to keep a single instance of recurring jobs"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    priority = models.IntegerField(default=0, help_text="Lower numbers run first")
+    run_at = models.DateTimeField(help_text="Earliest time the job may run")
+    repeat_seconds = models.PositiveIntegerField(
+        blank=True, null=True,
+        help_text="Re-schedule this many seconds after each successful run"
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['priority', 'run_at']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_at'], name='core_job_claim_idx'),
+        ]
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+
+    def __str__(self):
+        return f"{self.task} - {self.get_status_display()}"
+
+
+class ResourceDailyStat(models.Model):
+    """Per-resource, per-day download and view counts (see core.trending)"""
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    downloads = models.PositiveIntegerField(default=0)
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['resource', 'day'], name='core_resourcedailystat_unique_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='core_dailystat_day_idx'),
+        ]
+        verbose_name = "Resource Daily Stat"
+        verbose_name_plural = "Resource Daily Stats"
+
+    def __str__(self):
+        return f"{self.resource_id} - {self.day}"
+
+
+class TrendingResource(models.Model):
+    """Precomputed time-decayed popularity score, refreshed by a background job"""
+    resource = models.OneToOneField(Resource, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    score = models.FloatField(db_index=True)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = "Trending Resource"
+        verbose_name_plural = "Trending Resources"
+
+    def __str__(self):
+        return f"{self.resource_id} - {self.score:.2f}"
+
+
+class RelatedResource(models.Model):
+    """Precomputed nearest neighbours of a resource by tag and text similarity (see core.related)"""
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='neighbours')
+    related = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['resource', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['resource', 'related'], name='core_relatedresource_unique_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['resource', 'rank'], name='core_related_lookup_idx'),
+        ]
+        verbose_name = "Related Resource"
+        verbose_name_plural = "Related Resources"
+
+    def __str__(self):
+        return f"{self.resource_id} -> {self.related_id} ({self.score:.3f})"
+
+
+class RelatedTerm(models.Model):
+    """One term of a resource's vector in the related-resources index (see core.related)"""
+    # No foreign key constraint: the rows of a deleted resource are needed to
+    # update document frequencies and are removed by the queued index update
+    resource = models.ForeignKey(Resource, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    term = models.CharField(max_length=200)
+    count = models.FloatField(help_text="Weighted term frequency")
+    weight = models.FloatField(help_text="Normalized TF-IDF weight when last indexed; 0 for terms too common to use")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['resource', 'term'], name='core_relatedterm_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['term', 'weight'], name='core_relatedterm_posting_idx'),
+        ]
+        verbose_name = "Related Term"
+        verbose_name_plural = "Related Terms"
+
+    def __str__(self):
+        return f"{self.resource_id}: {self.term} ({self.weight:.3f})"
+
+
+class RelatedTermFrequency(models.Model):
+    """Number of active resources containing a term (see core.related)"""
+    term = models.CharField(max_length=200, primary_key=True)
+    documents = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Related Term Frequency"
+        verbose_name_plural = "Related Term Frequencies"
+
+    def __str__(self):
+        return f"{self.term}: {self.documents}"
+
+
+class ChunkedUpload(models.Model):
+    """Resumable upload of a large file into a model field (see core.uploads)"""
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('processing', 'Processing'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    ]
+    TARGET_CHOICES = [
+        ('resource.file', 'Resource file'),
+        ('class.syllabus', 'Class syllabus'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chunked_uploads')
+    target = models.CharField(max_length=30, choices=TARGET_CHOICES)
+    object_id = models.PositiveIntegerField()
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(help_text="Total size in bytes, declared when the upload starts")
+    checksum = models.CharField(max_length=64, help_text="SHA-256 of the whole file (hex)")
+    offset = models.PositiveBigIntegerField(default=0, help_text="Bytes received so far")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    error = models.TextField(blank=True)
+    expires_at = models.DateTimeField(help_text="Unfinished uploads are discarded after this")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='core_upload_expiry_idx'),
+        ]
+        verbose_name = "Chunked Upload"
+        verbose_name_plural = "Chunked Uploads"
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size}) - {self.get_status_display()}"
+
+
+class RequestProfile(models.Model):
+    """Sampled stacks of one staff-requested profile run (see core.profiling)"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='request_profiles'
+    )
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    interval_ms = models.FloatField(help_text="Sampling interval")
+    samples = models.PositiveIntegerField()
+    stacks = models.TextField(help_text="Collapsed stacks: 'frame;frame;frame count' per line")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Request Profile"
+        verbose_name_plural = "Request Profiles"
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+class SlowQueryStat(models.Model):
+    """Slow executions of one normalized statement, aggregated (see core.slowqueries)"""
+    fingerprint = models.CharField(max_length=16, primary_key=True)
+    sql = models.TextField(help_text="Normalized SQL: literals and placeholders replaced by ?")
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-last_seen']
+        verbose_name = "Slow Query"
+        verbose_name_plural = "Slow Queries"
+
+    def __str__(self):
+        return self.sql[:80]
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.count if self.count else 0
+
+
+class SlowQuerySample(models.Model):
+    """One slow execution, with an EXPLAIN plan when it was sampled for one"""
+    stat = models.ForeignKey(SlowQueryStat, on_delete=models.CASCADE, related_name='samples')
+    duration_ms = models.FloatField()
+    database = models.CharField(max_length=50)
+    params_fingerprint = models.CharField(max_length=16, help_text="Hash of the parameters")
+    view = models.CharField(max_length=200, blank=True, help_text="URL name of the view that ran it")
+    location = models.CharField(max_length=300, blank=True, help_text="Innermost project frame")
+    explain = models.TextField(blank=True, help_text="EXPLAIN (ANALYZE, BUFFERS) output")
+    created_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Slow Query Sample"
+        verbose_name_plural = "Slow Query Samples"
+
+    def __str__(self):
+        return f"{self.stat_id} - {self.duration_ms:.0f} ms"
@@ -0,0 +1,176 @@
+"""
+On-demand sampling profiler for single requests.
+
+Staff add an ``X-Profile: 1`` header (or ``?profile=1``) to a request.
+``ProfileRequestMiddleware`` checks that the caller is staff, either with a
+JWT access token or an admin session, and only then starts a sampler
+thread. The thread records the request thread's stack every
+``PROFILER_INTERVAL`` seconds from ``sys._current_frames()``. This is wall
+clock sampling, so time spent waiting on the database or Cloudinary shows
+up as well as CPU time. The samples are stored as a RequestProfile in
+collapsed-stack format (``frame;frame;frame count`` per line, for
+flamegraph.pl / speedscope), and the response's ``X-Profile-Id`` header
+names the row to download from the admin.
+
+Requests without the trigger only pay for a header and query string check
+(well under a microsecond): no authentication, no thread, no tracing hooks.
+"""
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from .models import RequestProfile
+
+_PATH_PREFIXES = sorted(
+    {str(settings.BASE_DIR)} | {p for p in sysconfig.get_paths().values() if p},
+    key=len, reverse=True,
+)
+
+
+def _short_path(filename):
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            return filename[len(prefix):].lstrip(os.sep)
+    return filename
+
+
+_switch_lock = threading.Lock()
+_active = 0
+_switch_interval = None
+
+
+def _shorten_switch_interval(interval):
+    # The sampler needs the GIL to look at the other thread; by default a
+    # busy thread only gives it up every 5 ms, which would halve the rate
+    global _active, _switch_interval
+    with _switch_lock:
+        if _active == 0:
+            _switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(_switch_interval, interval / 5))
+        _active += 1
+
+
+def _restore_switch_interval():
+    global _active
+    with _switch_lock:
+        _active -= 1
+        if _active == 0:
+            sys.setswitchinterval(_switch_interval)
+
+
+class Sampler:
+    """Samples one thread's stack from a background thread"""
+
+    def __init__(self, thread_id, interval, root=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root  # frames above this one are not recorded
+        self.stacks = Counter()
+        self.samples = 0
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f'{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})'
+            self._labels[code] = label
+        return label
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self):
+        _shorten_switch_interval(self.interval)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        _restore_switch_interval()
+
+    def collapsed(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+
+def hot_frames(collapsed, limit=20):
+    """[(frame, self samples, total samples)] for the busiest frames"""
+    own, total = Counter(), Counter()
+    for line in collapsed.splitlines():
+        stack, _, count = line.rpartition(' ')
+        frames = stack.split(';')
+        own[frames[-1]] += int(count)
+        for frame in set(frames):
+            total[frame] += int(count)
+    return [(frame, count, total[frame]) for frame, count in own.most_common(limit)]
+
+
+def _staff_user(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user if user.is_staff else None
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if result is not None and result[0].is_staff:
+        return result[0]
+    return None
+
+
+def _requested(request):
+    return (
+        request.META.get('HTTP_X_PROFILE') == '1'
+        or 'profile=1' in request.META.get('QUERY_STRING', '').split('&')
+    )
+
+
+class ProfileRequestMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _requested(request):
+            return self.get_response(request)
+        user = _staff_user(request)
+        if user is None:
+            return self.get_response(request)
+
+        sampler = Sampler(threading.get_ident(), settings.PROFILER_INTERVAL, root=sys._getframe())
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        duration = time.perf_counter() - started
+
+        profile = RequestProfile.objects.create(
+            user=user,
+            method=request.method,
+            path=request.get_full_path()[:500],
+            status_code=response.status_code,
+            duration_ms=round(duration * 1000, 2),
+            interval_ms=settings.PROFILER_INTERVAL * 1000,
+            samples=sampler.samples,
+            stacks=sampler.collapsed(),
+        )
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
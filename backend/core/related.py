@@ -0,0 +1,276 @@
+"""
+"Related resources" index from tag, category and text similarity.
+
+Resources are turned into sparse TF-IDF vectors (dicts of term -> weight,
+L2-normalised) over title, description, tags and category, with tags and
+category boosted. Cosine similarity between two unit vectors is their dot
+product; it is computed through an inverted index so only resources that
+share at least one term are ever compared (the sparse ``X @ X.T`` product),
+then the top ``RELATED_RESOURCES_K`` per resource are stored in
+RelatedResource.
+
+The vectors are kept in RelatedTerm (one row per resource and term, which
+doubles as the postings list) and document frequencies in
+RelatedTermFrequency. ``rebuild_index()`` recomputes all of it (run nightly
+to absorb IDF drift). ``update_resource()`` handles one created, edited,
+deactivated or deleted resource without loading the corpus: it adjusts the
+document frequencies of the terms that changed, rewrites that resource's
+vector and neighbours, and patches the neighbour lists it enters or leaves.
+A list where the resource dropped or fell is recomputed from the postings,
+so it is refilled right away rather than at the next rebuild.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F
+
+from .models import RelatedResource, RelatedTerm, RelatedTermFrequency, Resource
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from has have how in into is it its of on or '
+    'that the this to was were will with you your we our can using use'.split()
+)
+
+FIELD_WEIGHTS = {'title': 2.0, 'description': 1.0}
+TAG_WEIGHT = 3.0
+CATEGORY_WEIGHT = 2.0
+MAX_DOCUMENT_FREQUENCY = 0.5
+MIN_DOCUMENTS_FOR_MAX_DF = 100
+MAX_TERM_LENGTH = 200
+
+
+def _k():
+    return getattr(settings, 'RELATED_RESOURCES_K', 10)
+
+
+def _tokens(text):
+    return [t for t in TOKEN_RE.findall((text or '').lower()) if len(t) > 1 and t not in STOP_WORDS]
+
+
+def term_counts(title, description, tags, category):
+    """Weighted term frequencies for one resource"""
+    counts = Counter()
+    for field, text in (('title', title), ('description', description)):
+        for token in _tokens(text):
+            counts[token] += FIELD_WEIGHTS[field]
+    for tag in (tags or '').split(','):
+        tag = tag.strip().lower()
+        if tag:
+            counts[f'tag:{tag}'] += TAG_WEIGHT
+            for token in _tokens(tag):
+                counts[token] += 1.0
+    if category:
+        counts[f'category:{category}'] += CATEGORY_WEIGHT
+    if any(len(term) > MAX_TERM_LENGTH for term in counts):
+        truncated = Counter()
+        for term, count in counts.items():
+            truncated[term[:MAX_TERM_LENGTH]] += count
+        counts = truncated
+    return counts
+
+
+def idf_weights(document_frequency, total):
+    """IDF per usable term; terms in too many resources are left out"""
+    # Terms found in most resources barely move the score but dominate
+    # the number of pairs compared, so large corpora drop them
+    max_df = total * MAX_DOCUMENT_FREQUENCY if total >= MIN_DOCUMENTS_FOR_MAX_DF else total
+    return {
+        term: math.log((1 + total) / (1 + df)) + 1.0
+        for term, df in document_frequency.items()
+        if 0 < df <= max_df
+    }
+
+
+def vectorize(terms, idf):
+    """L2-normalised TF-IDF vector of one resource's term counts"""
+    vector = {term: (1.0 + math.log(tf)) * idf[term] for term, tf in terms.items() if term in idf}
+    norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+    return {term: w / norm for term, w in vector.items()}
+
+
+def _ranked(scores, k):
+    return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+class Corpus:
+    """TF-IDF vectors and an inverted index over all active resources"""
+
+    def __init__(self, rows):
+        self.counts = {pk: term_counts(*fields) for pk, *fields in rows}
+        self.document_frequency = Counter()
+        for terms in self.counts.values():
+            self.document_frequency.update(terms.keys())
+        idf = idf_weights(self.document_frequency, len(self.counts))
+
+        self.vectors = {}
+        self.postings = defaultdict(list)
+        for pk, terms in self.counts.items():
+            vector = vectorize(terms, idf)
+            self.vectors[pk] = vector
+            for term, weight in vector.items():
+                self.postings[term].append((pk, weight))
+
+    @classmethod
+    def load(cls):
+        rows = (
+            Resource.objects.filter(is_active=True)
+            .values_list('id', 'title', 'description', 'tags', 'category')
+            .iterator(chunk_size=2000)
+        )
+        return cls(rows)
+
+    def similarities(self, pk):
+        """Cosine similarity of ``pk`` to every resource sharing a term with it"""
+        scores = defaultdict(float)
+        for term, weight in self.vectors.get(pk, {}).items():
+            for other, other_weight in self.postings[term]:
+                if other != pk:
+                    scores[other] += weight * other_weight
+        return scores
+
+    def top_k(self, pk, k):
+        return _ranked(self.similarities(pk), k)
+
+
+def _rows(pk, neighbours):
+    return [
+        RelatedResource(resource_id=pk, related_id=other, score=score, rank=rank)
+        for rank, (other, score) in enumerate(neighbours)
+    ]
+
+
+def rebuild_index():
+    """Recompute the vectors, document frequencies and neighbours of every active resource"""
+    corpus = Corpus.load()
+    k = _k()
+    rows = []
+    for pk in corpus.vectors:
+        rows.extend(_rows(pk, corpus.top_k(pk, k)))
+    terms = [
+        RelatedTerm(resource_id=pk, term=term, count=count, weight=corpus.vectors[pk].get(term, 0.0))
+        for pk, counts in corpus.counts.items()
+        for term, count in counts.items()
+    ]
+
+    with transaction.atomic(using=router.db_for_write(RelatedResource)):
+        RelatedResource.objects.all().delete()
+        RelatedResource.objects.bulk_create(rows, batch_size=1000)
+        RelatedTerm.objects.all().delete()
+        RelatedTerm.objects.bulk_create(terms, batch_size=1000)
+        RelatedTermFrequency.objects.all().delete()
+        RelatedTermFrequency.objects.bulk_create(
+            [RelatedTermFrequency(term=term, documents=df) for term, df in corpus.document_frequency.items()],
+            batch_size=1000,
+        )
+    return len(rows)
+
+
+def _postings_scores(vector, exclude):
+    """Similarity of ``vector`` to every indexed resource sharing a usable term with it"""
+    scores = defaultdict(float)
+    postings = (
+        RelatedTerm.objects.filter(term__in=vector.keys(), weight__gt=0)
+        .exclude(resource_id=exclude)
+        .values_list('resource_id', 'term', 'weight')
+    )
+    for other, term, weight in postings.iterator(chunk_size=2000):
+        scores[other] += vector[term] * weight
+    return scores
+
+
+def _stored_vector(pk):
+    return dict(RelatedTerm.objects.filter(resource_id=pk, weight__gt=0).values_list('term', 'weight'))
+
+
+def _update_document_frequencies(added, removed):
+    RelatedTermFrequency.objects.bulk_create(
+        [RelatedTermFrequency(term=term) for term in added], ignore_conflicts=True, batch_size=1000,
+    )
+    RelatedTermFrequency.objects.filter(term__in=added).update(documents=F('documents') + 1)
+    RelatedTermFrequency.objects.filter(term__in=removed).update(documents=F('documents') - 1)
+    RelatedTermFrequency.objects.filter(term__in=removed, documents__lte=0).delete()
+
+
+def update_resource(pk, listed_by=()):
+    """
+    Refresh the index after resource ``pk`` was created, edited, deactivated
+    or deleted, touching only its own rows and the neighbour lists it appears
+    in or should appear in. ``listed_by`` names resources that listed it
+    before it was deleted (their rows are gone by the time this runs).
+    """
+    if not RelatedTerm.objects.exists():
+        # Nothing indexed yet (first run after deploying): build everything
+        rebuild_index()
+        return 0
+
+    k = _k()
+    fields = (
+        Resource.objects.filter(pk=pk, is_active=True)
+        .values_list('title', 'description', 'tags', 'category')
+        .first()
+    )
+    new_counts = term_counts(*fields) if fields else {}
+
+    with transaction.atomic(using=router.db_for_write(RelatedResource)):
+        old_counts = dict(RelatedTerm.objects.filter(resource_id=pk).values_list('term', 'count'))
+        _update_document_frequencies(new_counts.keys() - old_counts.keys(), old_counts.keys() - new_counts.keys())
+
+        vector = {}
+        if new_counts:
+            total = Resource.objects.filter(is_active=True).count()
+            document_frequency = dict(
+                RelatedTermFrequency.objects.filter(term__in=new_counts.keys()).values_list('term', 'documents')
+            )
+            vector = vectorize(new_counts, idf_weights(document_frequency, total))
+
+        RelatedTerm.objects.filter(resource_id=pk).delete()
+        RelatedTerm.objects.bulk_create(
+            [RelatedTerm(resource_id=pk, term=term, count=count, weight=vector.get(term, 0.0))
+             for term, count in new_counts.items()],
+            batch_size=1000,
+        )
+
+        scores = _postings_scores(vector, pk) if vector else {}
+        replacements = {pk: _ranked(scores, k)} if vector else {}
+
+        # Lists pk was in (including those a delete already cascaded away) and lists it may enter
+        listing = set(RelatedResource.objects.filter(related_id=pk).values_list('resource_id', flat=True))
+        listing.update(listed_by)
+        current = defaultdict(dict)
+        for resource_id, related_id, score in RelatedResource.objects.filter(
+            resource_id__in=set(scores) | listing
+        ).values_list('resource_id', 'related_id', 'score'):
+            current[resource_id][related_id] = score
+        affected = (set(scores) | listing) - {pk}
+
+        for other in affected:
+            neighbours = dict(current[other])
+            previous = neighbours.pop(pk, None)
+            if other in listed_by and previous is None:
+                previous = float('inf')
+            new_score = scores.get(other)
+            if previous is not None and (new_score is None or new_score < previous):
+                # pk dropped or fell, so something outside the list may now
+                # belong in it
+                other_vector = _stored_vector(other)
+                if other_vector:
+                    replacements[other] = _ranked(_postings_scores(other_vector, other), k)
+                continue
+            if new_score is not None:
+                neighbours[pk] = new_score
+            ranked = _ranked(neighbours, k)
+            if ranked != _ranked(current[other], k):
+                replacements[other] = ranked
+
+        RelatedResource.objects.filter(resource_id=pk).delete()
+        RelatedResource.objects.filter(resource_id__in=replacements.keys()).delete()
+        RelatedResource.objects.bulk_create(
+            [row for other, ranked in replacements.items() for row in _rows(other, ranked)],
+            batch_size=1000,
+        )
+    return len(replacements)
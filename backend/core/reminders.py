@@ -0,0 +1,150 @@
+"""
+Class reminder emails.
+
+``send_due_reminders()`` runs as a recurring background job. It finds the
+active classes starting within the largest window of
+``CLASS_REMINDER_WINDOWS`` (or that started within
+``CLASS_REMINDER_START_GRACE`` seconds) with one range query on the
+``start_date`` index. Each class gets the tightest window it is already
+inside, so a class created an hour before it starts sends the "hour"
+reminder instead of a late "day" one.
+
+Every enrolled member with an email address who has no ClassReminder row
+for that class and window gets one plain-text email. Messages go out in
+batches of ``CLASS_REMINDER_BATCH_SIZE`` over one SMTP connection opened for
+the whole run. After each batch the rows for its recipients are inserted, so
+a crash or retry sends nothing twice except possibly the batch that was in
+flight.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.formats import date_format
+
+from .models import Class, ClassReminder
+
+logger = logging.getLogger(__name__)
+
+
+def _windows():
+    """(kind, seconds before start), tightest first"""
+    windows = getattr(settings, 'CLASS_REMINDER_WINDOWS', {'day': 24 * 3600, 'hour': 3600, 'start': 0})
+    return sorted(windows.items(), key=lambda item: item[1])
+
+
+def due_classes(now=None):
+    """(class, kind) for every class inside a reminder window right now"""
+    now = now or timezone.now()
+    windows = _windows()
+    if not windows:
+        return []
+    grace = timedelta(seconds=getattr(settings, 'CLASS_REMINDER_START_GRACE', 15 * 60))
+    classes = (
+        Class.objects
+        .filter(is_active=True, start_date__gt=now - grace, start_date__lte=now + timedelta(seconds=windows[-1][1]))
+        .exclude(status='archived')
+        .order_by('start_date')
+    )
+    due = []
+    for klass in classes:
+        until_start = (klass.start_date - now).total_seconds()
+        kind = next(kind for kind, seconds in windows if until_start <= seconds)
+        due.append((klass, kind))
+    return due
+
+
+def recipients(klass, kind):
+    """Enrolled members with an email who haven't had this reminder"""
+    return (
+        get_user_model().objects
+        .filter(enrollments__klass=klass, enrollments__status='enrolled', is_active=True)
+        .exclude(email='')
+        .exclude(Exists(ClassReminder.objects.filter(klass=klass, kind=kind, user=OuterRef('pk'))))
+        .order_by('pk')
+    )
+
+
+def _starts(klass, now):
+    seconds = (klass.start_date - now).total_seconds()
+    if seconds <= 60:
+        return 'has started - join now' if seconds <= 0 else 'starts in a minute'
+    minutes = round(seconds / 60)
+    if minutes < 90:
+        return f'starts in {minutes} minutes'
+    hours = round(minutes / 60)
+    return f'starts in {hours} hours' if hours < 36 else f'starts in {round(hours / 24)} days'
+
+
+def message_template(klass, now):
+    """(subject, body with a ``{name}`` placeholder), rendered once per class"""
+    starts = _starts(klass, now)
+    lines = [
+        'Hi {name},',
+        '',
+        f'{klass.title} with {klass.instructor} {starts}.',
+        f'When: {date_format(timezone.localtime(klass.start_date), "DATETIME_FORMAT")}',
+    ]
+    if klass.meeting_link:
+        lines.append(f'Join: {klass.meeting_link}')
+    if klass.location:
+        lines.append(f'Where: {klass.location}')
+    lines += ['', "You're receiving this because you're enrolled in this class."]
+    return f'Reminder: {klass.title} {starts}', '\n'.join(lines)
+
+
+def build_message(template, user, connection=None):
+    subject, body = template
+    return EmailMessage(
+        subject=subject,
+        # The greeting comes first, so only it is replaced
+        body=body.replace('{name}', user.first_name or user.username, 1),
+        to=[user.email],
+        connection=connection,
+    )
+
+
+def send_class_reminders(klass, kind, connection, now=None):
+    """Send one class's ``kind`` reminder to everyone still due it; returns the count"""
+    template = message_template(klass, now or timezone.now())
+    batch_size = getattr(settings, 'CLASS_REMINDER_BATCH_SIZE', 200)
+    users = recipients(klass, kind).only('pk', 'email', 'first_name', 'username')
+    sent, batch = 0, []
+    for user in users.iterator(chunk_size=batch_size):
+        batch.append(user)
+        if len(batch) >= batch_size:
+            sent += _send_batch(klass, kind, batch, connection, template)
+            batch = []
+    if batch:
+        sent += _send_batch(klass, kind, batch, connection, template)
+    return sent
+
+
+def _send_batch(klass, kind, users, connection, template):
+    connection.send_messages([build_message(template, user, connection) for user in users])
+    ClassReminder.objects.bulk_create(
+        [ClassReminder(klass=klass, user=user, kind=kind) for user in users],
+        ignore_conflicts=True,
+    )
+    return len(users)
+
+
+def send_due_reminders(now=None):
+    """Send every due reminder over one mail connection; returns {(class id, kind): sent}"""
+    now = now or timezone.now()
+    due = due_classes(now)
+    if not due:
+        return {}
+    results = {}
+    # Opened once and reused by every batch of every class
+    with get_connection() as connection:
+        for klass, kind in due:
+            sent = send_class_reminders(klass, kind, connection, now)
+            if sent:
+                logger.info('Sent %d %s reminder(s) for class %s', sent, kind, klass.pk)
+            results[(klass.pk, kind)] = sent
+    return results
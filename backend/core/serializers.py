@@ -1,14 +1,25 @@
+from django.db import models
 from rest_framework import serializers
+from .media import CachedFileField, CachedImageField
 from .models import SiteSettings, Sponsor, SocialLink, Class, Resource
 
 
-class SiteSettingsSerializer(serializers.ModelSerializer):
+class MediaModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer whose file and image fields use the media URL cache"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.FileField: CachedFileField,
+        models.ImageField: CachedImageField,
+    }
+
+
+class SiteSettingsSerializer(MediaModelSerializer):
     class Meta:
         model = SiteSettings
         fields = ['id', 'club_name', 'club_full_name', 'club_motto', 'club_logo', 'university_logo', 'hero_background', 'updated_at']
 
 
-class SponsorSerializer(serializers.ModelSerializer):
+class SponsorSerializer(MediaModelSerializer):
     collaboration_date_formatted = serializers.SerializerMethodField()
     
     class Meta:
@@ -30,7 +41,7 @@ class SocialLinkSerializer(serializers.ModelSerializer):
         fields = ['id', 'platform', 'platform_display', 'url', 'icon_class', 'is_active', 'order']
 
 
-class ClassSerializer(serializers.ModelSerializer):
+class ClassSerializer(MediaModelSerializer):
     difficulty_display = serializers.CharField(source='get_difficulty_display', read_only=True)
     status_display = serializers.SerializerMethodField()
     mode = serializers.ReadOnlyField()
@@ -44,7 +55,7 @@ class ClassSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'instructor', 'difficulty', 'difficulty_display',
             'status', 'status_display', 'mode', 'mode_display', 'thumbnail', 'start_date', 'start_date_formatted',
-            'end_date', 'duration', 'max_participants', 'enrolled_count', 'is_full', 'is_joinable',
+            'end_date', 'duration', 'max_participants', 'enrolled_count', 'is_full', 'waitlist_enabled', 'is_joinable',
             'meeting_link', 'location', 'syllabus', 'is_active', 'order',
             'created_at', 'updated_at'
         ]
@@ -72,7 +83,7 @@ class ClassSerializer(serializers.ModelSerializer):
         return start_date_ist.strftime('%B %d, %Y at %I:%M %p')
 
 
-class ResourceSerializer(serializers.ModelSerializer):
+class ResourceSerializer(MediaModelSerializer):
     category_display = serializers.CharField(source='get_category_display', read_only=True)
     tag_list = serializers.ReadOnlyField()
     
@@ -0,0 +1,95 @@
+"""Model signal receivers that keep derived data and caches in sync"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import autocomplete, cdn, events
+from .enrollment import promote_waitlist
+from .ical import bump_calendar_version
+from .jobs import enqueue
+from .singleflight import invalidate
+from .models import Class, RelatedResource, Resource, SiteSettings, SocialLink, Sponsor
+
+# Resource fields that feed the related-resources index
+RELATED_INDEX_FIELDS = frozenset(['title', 'description', 'tags', 'category', 'is_active'])
+# Fields that feed the autocomplete index (popularity counters refresh on their own)
+AUTOCOMPLETE_FIELDS = frozenset(['title', 'instructor', 'author', 'is_active'])
+# Popularity counters; saving only these changes nothing members see live
+COUNTER_FIELDS = frozenset(['download_count', 'view_count'])
+# Class fields that can open seats for waitlisted members
+SEAT_FIELDS = frozenset(['max_participants', 'waitlist_enabled'])
+
+
+def _autocomplete_changed(kind, pk, update_fields=None):
+    if update_fields is None or AUTOCOMPLETE_FIELDS.intersection(update_fields):
+        transaction.on_commit(lambda: autocomplete.object_changed(kind, pk))
+
+
+def _publish_change(model, pk):
+    transaction.on_commit(lambda: events.publish('content.changed', {'model': model, 'id': pk}))
+    # Classes and resources both feed the cached member portal payload
+    transaction.on_commit(lambda: invalidate('member_portal'))
+
+
+@receiver([post_save, post_delete], sender=Class)
+def class_changed(sender, instance, update_fields=None, **kwargs):
+    bump_calendar_version()
+    _publish_change('class', instance.pk)
+    _autocomplete_changed('class', instance.pk, update_fields)
+    # Dates or is_active may have moved; recompute the next status transition
+    transaction.on_commit(events.watcher.wake)
+
+
+@receiver(post_save, sender=Class)
+def class_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is None or SEAT_FIELDS.intersection(update_fields):
+        promote_waitlist(instance)
+
+
+@receiver(post_save, sender=Resource)
+def resource_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is None or not COUNTER_FIELDS.issuperset(update_fields):
+        _publish_change('resource', instance.pk)
+    _autocomplete_changed('resource', instance.pk, update_fields)
+    if update_fields is None or RELATED_INDEX_FIELDS.intersection(update_fields):
+        enqueue('core.tasks.update_related_resources', args=[instance.pk])
+
+
+@receiver(pre_delete, sender=Resource)
+def resource_deleting(sender, instance, **kwargs):
+    # The delete cascades to the neighbour rows listing this resource, and
+    # the index update needs to know which lists to refill
+    instance._related_listed_by = list(
+        RelatedResource.objects.filter(related_id=instance.pk).values_list('resource_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Resource)
+def resource_deleted(sender, instance, **kwargs):
+    _publish_change('resource', instance.pk)
+    _autocomplete_changed('resource', instance.pk)
+    enqueue(
+        'core.tasks.update_related_resources', args=[instance.pk],
+        kwargs={'listed_by': getattr(instance, '_related_listed_by', [])},
+    )
+
+
+@receiver([post_save, post_delete], sender=SiteSettings)
+@receiver([post_save, post_delete], sender=Sponsor)
+@receiver([post_save, post_delete], sender=SocialLink)
+def public_content_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(lambda: invalidate('home'))
+    cdn.purge(cdn.surrogate_keys(sender, [instance.pk]))
+    transaction.on_commit(_publish_snapshots, robust=True)
+
+
+def _publish_snapshots():
+    # In this process, so the files land in the STATIC_ROOT that serves them
+    from .snapshots import publish_snapshots
+    publish_snapshots()
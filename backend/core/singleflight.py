@@ -0,0 +1,147 @@
+"""
+Single-flight cache fills for expensive endpoint payloads.
+
+``cached_payload(key, compute)`` returns ``(payload, state)``. Entries are
+stored without a cache timeout as ``{'value', 'expires', 'delta'}`` so the
+last good payload is always at hand:
+
+* fresh entries are served as-is, except that a request may volunteer to
+  refresh early with a probability that rises as expiry approaches
+  (XFetch: ``now - delta * beta * log(random()) >= expires``), which spreads
+  recomputation out instead of letting every worker miss at the same instant;
+* a refresh is guarded by a short ``cache.add`` lock, so across all workers
+  sharing the cache only one request recomputes; the others serve the stale
+  entry (for up to ``ENDPOINT_CACHE_STALE_TIMEOUT`` past expiry) or wait
+  briefly for the winner when there is nothing to serve;
+* with ``ENDPOINT_CACHE_STALE_WHILE_REVALIDATE`` the winner also serves the
+  stale entry and recomputes in a background thread;
+* if computing fails with a database error, the last good payload is served
+  regardless of age and the state is ``FALLBACK``.
+
+``invalidate(key)`` expires an entry without dropping it, so admin saves go
+through the same single-flight path instead of causing a miss stampede.
+"""
+import contextvars
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+HIT = 'HIT'
+MISS = 'MISS'
+STALE = 'STALE'
+FALLBACK = 'FALLBACK'
+
+STATUS_HEADER = 'X-Cache-Status'
+POLL_INTERVAL = 0.05
+
+
+def _entry_key(key):
+    return f'sf:{key}'
+
+
+def _lock_key(key):
+    return f'sf:lock:{key}'
+
+
+def _acquire(key):
+    token = uuid.uuid4().hex
+    if cache.add(_lock_key(key), token, settings.ENDPOINT_CACHE_LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def _release(key, token):
+    if cache.get(_lock_key(key)) == token:
+        cache.delete(_lock_key(key))
+
+
+def _fill(key, compute, timeout):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    cache.set(_entry_key(key), {'value': value, 'expires': time.time() + timeout, 'delta': delta}, None)
+    return value
+
+
+def _refresh_in_background(key, compute, timeout, token):
+    def run():
+        try:
+            _fill(key, compute, timeout)
+        except Exception:
+            logger.exception('Background refresh of %s failed', key)
+        finally:
+            _release(key, token)
+            connections.close_all()
+
+    # Copy the context so replica routing (tars.db_router) carries over
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(run,), daemon=True).start()
+
+
+def _early_refresh(entry, now):
+    beta = settings.ENDPOINT_CACHE_EARLY_REFRESH_BETA
+    return now - entry['delta'] * beta * math.log(1.0 - random.random()) >= entry['expires']
+
+
+def _wait_for_fill(key):
+    deadline = time.monotonic() + settings.ENDPOINT_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(_entry_key(key))
+        if entry is not None and entry['expires'] > time.time():
+            return entry
+        if cache.get(_lock_key(key)) is None:
+            break
+    return None
+
+
+def cached_payload(key, compute, timeout=None):
+    """Return ``(payload, state)`` for ``key``, computing it at most once at a time"""
+    timeout = settings.ENDPOINT_CACHE_TIMEOUT if timeout is None else timeout
+    entry = cache.get(_entry_key(key))
+    now = time.time()
+
+    if entry is not None and entry['expires'] > now and not _early_refresh(entry, now):
+        return entry['value'], HIT
+
+    servable = entry is not None and now < entry['expires'] + settings.ENDPOINT_CACHE_STALE_TIMEOUT
+    token = _acquire(key)
+    if token is None:
+        if servable:
+            return entry['value'], HIT if entry['expires'] > now else STALE
+        filled = _wait_for_fill(key)
+        if filled is not None:
+            return filled['value'], HIT
+        # The lock holder died or is too slow; compute without the lock
+
+    elif servable and settings.ENDPOINT_CACHE_STALE_WHILE_REVALIDATE:
+        _refresh_in_background(key, compute, timeout, token)
+        return entry['value'], HIT if entry['expires'] > now else STALE
+
+    try:
+        return _fill(key, compute, timeout), MISS
+    except DatabaseError:
+        if entry is None:
+            raise
+        logger.warning('Serving last good payload for %s', key, exc_info=True)
+        return entry['value'], FALLBACK
+    finally:
+        if token is not None:
+            _release(key, token)
+
+
+def invalidate(key):
+    """Mark ``key`` expired but keep its value for stale and fallback serving"""
+    entry = cache.get(_entry_key(key))
+    if entry is not None:
+        entry['expires'] = min(entry['expires'], time.time())
+        cache.set(_entry_key(key), entry, None)
@@ -0,0 +1,247 @@
+"""
+Slow-query log.
+
+An ``execute_wrapper`` installed on every database connection times each
+query. A query that takes at least ``SLOW_QUERY_THRESHOLD_MS`` is added to a
+per-process buffer together with:
+
+* its normalized SQL and fingerprint, with literals, placeholders and
+  ``IN`` lists folded to ``?``;
+* a hash of its parameters;
+* the URL name of the view running it, set by ``SlowQueryMiddleware``;
+* the innermost frame of project code that issued it.
+
+The buffer is written after the response has gone out (``request_finished``)
+and after each background job, so the request that hit the slow query
+doesn't also pay for logging it. Rows go into SlowQueryStat (aggregated per
+fingerprint) and SlowQuerySample (one per execution).
+
+On PostgreSQL, SELECTs are sampled for ``EXPLAIN (ANALYZE, BUFFERS)`` at
+flush time: with probability ``SLOW_QUERY_EXPLAIN_SAMPLE_RATE`` and at most
+once per fingerprint every ``SLOW_QUERY_EXPLAIN_INTERVAL`` seconds across
+workers. ANALYZE runs the query again, which is why it is sampled.
+
+Setting ``SLOW_QUERY_THRESHOLD_MS`` to 0 disables everything; no wrapper is
+installed.
+"""
+import contextvars
+import hashlib
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import request_finished
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.dispatch import receiver
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+_view = contextvars.ContextVar('slow_query_view', default='')
+_flushing = contextvars.ContextVar('slow_query_flushing', default=False)
+_lock = threading.Lock()
+_buffer = []
+_PROJECT_DIR = str(settings.BASE_DIR) + os.sep
+_THIS_FILE = __file__
+
+
+def _threshold():
+    return getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 0)
+
+
+def normalize_sql(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _LIST_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def _params_fingerprint(params, many):
+    if many:
+        params = ('many', len(params) if hasattr(params, '__len__') else None)
+    return hashlib.sha1(repr(params).encode()).hexdigest()[:16]
+
+
+def _location():
+    """``path:line in function`` of the innermost project frame outside this module"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_DIR) and filename != _THIS_FILE:
+            return f'{filename[len(_PROJECT_DIR):]}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return ''
+
+
+def _record(connection, sql, params, many, duration_ms):
+    normalized = normalize_sql(sql)
+    entry = {
+        'fingerprint': fingerprint(normalized),
+        'normalized': normalized,
+        'sql': sql,
+        'params': None if many else params,
+        'database': connection.alias,
+        'vendor': connection.vendor,
+        'params_fingerprint': _params_fingerprint(params, many),
+        'duration_ms': round(duration_ms, 2),
+        'view': _view.get(),
+        'location': _location(),
+        'created_at': timezone.now(),
+    }
+    with _lock:
+        if len(_buffer) >= getattr(settings, 'SLOW_QUERY_BUFFER_SIZE', 200):
+            return
+        _buffer.append(entry)
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= _threshold() and not _flushing.get():
+            _record(context['connection'], sql, params, many, duration_ms)
+
+
+@receiver(connection_created)
+def _install(sender, connection, **kwargs):
+    if _threshold() and slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+def _explainable(entry):
+    sql = entry['sql'].lstrip().upper()
+    return (
+        entry['vendor'] == 'postgresql'
+        and entry['params'] is not None
+        and sql.startswith('SELECT')
+        and 'FOR UPDATE' not in sql
+        and random.random() < getattr(settings, 'SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0.1)
+        and cache.add(f"slowq:explain:{entry['fingerprint']}", 1,
+                      getattr(settings, 'SLOW_QUERY_EXPLAIN_INTERVAL', 600))
+    )
+
+
+def _explain(entry):
+    connection = connections[entry['database']]
+    try:
+        # Rolled back in case the statement has side effects after all
+        with transaction.atomic(using=entry['database']), connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + entry['sql'], entry['params'])
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            transaction.set_rollback(True, using=entry['database'])
+        return plan
+    except DatabaseError as e:
+        return f'EXPLAIN failed: {e}'
+
+
+def _add_to_stat(key, stat):
+    from .models import SlowQueryStat
+
+    return SlowQueryStat.objects.filter(pk=key).update(
+        count=F('count') + stat['count'],
+        total_ms=F('total_ms') + stat['total_ms'],
+        max_ms=Greatest(F('max_ms'), stat['max_ms']),
+        last_seen=stat['last_seen'],
+    )
+
+
+def flush():
+    """Write buffered slow queries; returns how many"""
+    from .models import SlowQuerySample, SlowQueryStat
+
+    with _lock:
+        entries = _buffer[:]
+        _buffer.clear()
+    if not entries:
+        return 0
+
+    token = _flushing.set(True)
+    try:
+        stats = {}
+        for entry in entries:
+            stat = stats.setdefault(entry['fingerprint'], {
+                'sql': entry['normalized'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'first_seen': entry['created_at'], 'last_seen': entry['created_at'],
+            })
+            stat['count'] += 1
+            stat['total_ms'] += entry['duration_ms']
+            stat['max_ms'] = max(stat['max_ms'], entry['duration_ms'])
+            stat['last_seen'] = max(stat['last_seen'], entry['created_at'])
+
+        for key, stat in stats.items():
+            if not _add_to_stat(key, stat):
+                _, created = SlowQueryStat.objects.get_or_create(pk=key, defaults=stat)
+                if not created:
+                    # Another worker created it in the meantime
+                    _add_to_stat(key, stat)
+
+        SlowQuerySample.objects.bulk_create([
+            SlowQuerySample(
+                stat_id=entry['fingerprint'],
+                duration_ms=entry['duration_ms'],
+                database=entry['database'],
+                params_fingerprint=entry['params_fingerprint'],
+                view=entry['view'][:200],
+                location=entry['location'][:300],
+                explain=_explain(entry) if _explainable(entry) else '',
+                created_at=entry['created_at'],
+            )
+            for entry in entries
+        ])
+    finally:
+        _flushing.reset(token)
+    return len(entries)
+
+
+@receiver(request_finished)
+def flush_pending(sender=None, **kwargs):
+    """Flush if anything is buffered, logging rather than raising database errors"""
+    if not _buffer:
+        return
+    try:
+        flush()
+    except DatabaseError:
+        logger.exception('Could not write the slow-query log')
+
+
+class SlowQueryMiddleware:
+    """Labels queries with the view that runs them"""
+
+    def __init__(self, get_response):
+        if not _threshold():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _view.set(request.path)
+        try:
+            return self.get_response(request)
+        finally:
+            _view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if match is not None and match.view_name:
+            _view.set(match.view_name)
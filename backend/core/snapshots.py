@@ -0,0 +1,209 @@
+"""
+Publish-time JSON snapshots of public data.
+
+The home payload, sponsors and social links only change through the admin,
+so instead of running a view per request they are rendered to
+``STATIC_ROOT/snapshots/<name>.<hash>.json`` (plus ``.gz``/``.br``) whenever
+one of those models changes. ``snapshots/index.json`` is a small, stable
+pointer document mapping each snapshot name to its current hashed URL:
+
+    {"version": "<hash>", "generated_at": "...", "files": {"home": "/static/snapshots/home.<hash>.json", ...}}
+
+Hashed files never change once written and are served with a far-future
+``Cache-Control``; only the pointer is short-lived.
+
+Publishing happens in the web process that saved the change (after commit),
+because SnapshotWhiteNoiseMiddleware serves from that host's STATIC_ROOT; a
+worker container would write into a directory nobody serves. With several
+web instances, each one only sees its own publishes (and the build-time
+snapshot) unless STATIC_ROOT/snapshots is on a shared volume.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from whitenoise.compress import Compressor
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.responders import MissingFileError
+
+from .models import SiteSettings, Sponsor, SocialLink
+from .serializers import SiteSettingsSerializer, SponsorSerializer, SocialLinkSerializer
+
+SNAPSHOT_DIR = 'snapshots'
+POINTER_NAME = 'index.json'
+HASHED_NAME_RE = re.compile(r'^(?P<name>[a-z_]+)\.(?P<hash>[0-9a-f]{12})\.json(?:\.gz|\.br)?$')
+
+
+def sponsors_payload():
+    return SponsorSerializer(Sponsor.objects.filter(is_active=True), many=True).data
+
+
+def social_links_payload():
+    return SocialLinkSerializer(SocialLink.objects.filter(is_active=True), many=True).data
+
+
+def home_payload():
+    """Same shape as the `home_page_data` endpoint"""
+    site_settings = SiteSettings.objects.first()
+    return {
+        'site_settings': SiteSettingsSerializer(site_settings).data if site_settings else None,
+        'sponsors': sponsors_payload(),
+        'social_links': social_links_payload(),
+    }
+
+
+SNAPSHOTS = {
+    'home': home_payload,
+    'sponsors': sponsors_payload,
+    'social_links': social_links_payload,
+}
+
+
+def snapshot_root():
+    return os.path.join(settings.STATIC_ROOT, SNAPSHOT_DIR)
+
+
+def snapshot_url(filename):
+    return f"{settings.STATIC_URL.rstrip('/')}/{SNAPSHOT_DIR}/{filename}"
+
+
+def _atomic_write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def read_pointer():
+    try:
+        with open(os.path.join(snapshot_root(), POINTER_NAME), 'rb') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_snapshot(root, name, payload, compressor):
+    data = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode()
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    filename = f'{name}.{digest}.json'
+    path = os.path.join(root, filename)
+    # Same content hash means the file (and its compressed variants) is already there
+    if not os.path.exists(path):
+        _atomic_write(path, data)
+        compressor.compress(path)
+    return filename, digest
+
+
+def _prune(root, keep):
+    for filename in os.listdir(root):
+        match = HASHED_NAME_RE.match(filename)
+        if match and f"{match['name']}.{match['hash']}.json" not in keep:
+            try:
+                os.unlink(os.path.join(root, filename))
+            except FileNotFoundError:
+                pass
+
+
+def publish_snapshots():
+    """
+    Render every snapshot, then atomically swap the pointer document.
+
+    Files referenced by the previous pointer are kept so clients that fetched
+    it just before the swap can still resolve their URLs. Returns the new
+    pointer document.
+    """
+    root = snapshot_root()
+    os.makedirs(root, exist_ok=True)
+    compressor = Compressor(quiet=True)
+
+    files = {}
+    digests = []
+    for name, build in SNAPSHOTS.items():
+        filename, digest = _write_snapshot(root, name, build(), compressor)
+        files[name] = filename
+        digests.append(digest)
+
+    previous = read_pointer() or {}
+    pointer = {
+        'version': hashlib.sha256(''.join(digests).encode()).hexdigest()[:12],
+        'generated_at': timezone.now(),
+        'files': {name: snapshot_url(filename) for name, filename in files.items()},
+    }
+    if previous.get('version') != pointer['version']:
+        _atomic_write(
+            os.path.join(root, POINTER_NAME),
+            json.dumps(pointer, cls=DjangoJSONEncoder, separators=(',', ':')).encode(),
+        )
+    else:
+        pointer = previous
+
+    keep = set(files.values())
+    keep.update(url.rsplit('/', 1)[-1] for url in previous.get('files', {}).values())
+    _prune(root, keep)
+    return pointer
+
+
+class SnapshotWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise only indexes STATIC_ROOT at startup, so snapshots published
+    afterwards are looked up on disk on first request. Hashed files are immutable and
+    cached in the file table; the pointer is re-read from disk every time.
+    """
+
+    @property
+    def snapshot_prefix(self):
+        return f'{self.static_prefix}{SNAPSHOT_DIR}/'
+
+    @property
+    def snapshot_pointer_url(self):
+        return self.snapshot_prefix + POINTER_NAME
+
+    def __call__(self, request):
+        url = request.path_info
+        if url.startswith(self.snapshot_prefix):
+            static_file = self.find_snapshot(url)
+            if static_file is None:
+                return self.get_response(request)
+            try:
+                return self.serve(static_file, request)
+            except FileNotFoundError:
+                # Pruned by a later publish
+                self.files.pop(url, None)
+                return self.get_response(request)
+        return super().__call__(request)
+
+    def find_snapshot(self, url):
+        if url == self.snapshot_pointer_url:
+            return self._snapshot_file(POINTER_NAME, url)
+        static_file = self.files.get(url)
+        if static_file is None:
+            filename = url[len(self.snapshot_prefix):]
+            match = HASHED_NAME_RE.match(filename)
+            # Compressed variants are picked via Accept-Encoding, never requested directly
+            if match is None or filename.endswith(('.gz', '.br')):
+                return None
+            static_file = self._snapshot_file(filename, url)
+            if static_file is not None:
+                self.files[url] = static_file
+        return static_file
+
+    def _snapshot_file(self, filename, url):
+        try:
+            return self.get_static_file(os.path.join(snapshot_root(), filename), url)
+        except MissingFileError:
+            return None
+
+    def immutable_file_test(self, path, url):
+        if url.startswith(self.snapshot_prefix):
+            return bool(HASHED_NAME_RE.match(url[len(self.snapshot_prefix):]))
+        return super().immutable_file_test(path, url)
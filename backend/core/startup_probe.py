@@ -0,0 +1,71 @@
+"""
+Run by `manage.py startup_profile` in a fresh interpreter under
+``python -X importtime``. Times each startup phase and, per app, the import
+of its app module, its models module and its ready(); prints JSON on stdout.
+
+Only stdlib imports at module level so the import timings stay Django's.
+"""
+import json
+import sys
+import time
+
+
+def main():
+    started = time.perf_counter()
+    import django
+    from django.apps.config import AppConfig
+
+    apps = {}
+    original_create = AppConfig.create.__func__
+    original_import_models = AppConfig.import_models
+
+    def create(cls, entry):
+        start = time.perf_counter()
+        config = original_create(cls, entry)
+        timing = apps.setdefault(config.label, {'import': 0.0, 'models': 0.0, 'ready': 0.0})
+        timing['import'] = time.perf_counter() - start
+        ready = config.ready
+
+        def timed_ready():
+            start = time.perf_counter()
+            ready()
+            timing['ready'] = time.perf_counter() - start
+
+        config.ready = timed_ready
+        return config
+
+    def import_models(self):
+        start = time.perf_counter()
+        original_import_models(self)
+        apps[self.label]['models'] = time.perf_counter() - start
+
+    AppConfig.create = classmethod(create)
+    AppConfig.import_models = import_models
+
+    phases = {'import django': time.perf_counter() - started}
+    start = time.perf_counter()
+    django.setup()
+    phases['django.setup()'] = time.perf_counter() - start
+
+    from django.conf import settings
+
+    # Load the handler without the warm-up so both are measured separately
+    warmup = settings.WARMUP_ON_START
+    settings.WARMUP_ON_START = False
+    start = time.perf_counter()
+    from django.core.wsgi import get_wsgi_application
+    get_wsgi_application()
+    phases['WSGI handler (middleware)'] = time.perf_counter() - start
+
+    if warmup:
+        from core.warmup import warm_up
+
+        for name, seconds in warm_up().items():
+            phases[f'warm-up: {name}'] = seconds
+
+    phases['total'] = time.perf_counter() - started
+    json.dump({'phases': phases, 'apps': apps}, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
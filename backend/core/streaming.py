@@ -0,0 +1,73 @@
+"""
+Streaming response bodies for both server modes.
+
+A StreamingHttpResponse is iterated synchronously under WSGI. Under ASGI
+Django consumes a synchronous iterator with ``sync_to_async(list)``, i.e. it
+reads the whole body into memory before the first byte goes out.
+``streaming_content()`` keeps the blocking iterator for WSGI and wraps it for
+ASGI in an async iterator that pulls a batch at a time in a worker thread.
+
+The wrapper uses thread-sensitive ``sync_to_async``, the same thread the
+view ran in, so a queryset ``iterator()`` keeps using its connection.
+
+The blocking iterator (typically a generator holding a file or an upstream
+connection) is closed explicitly rather than left to garbage collection:
+by the async generator's ``finally`` when iteration ends, fails or is
+cancelled by a client disconnect, and by ``StreamingHttpResponse.close()``
+when a body is abandoned part way through.
+"""
+import itertools
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+
+def is_asgi(request):
+    # DRF's Request wraps the HttpRequest
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def _take(iterator, count):
+    return list(itertools.islice(iterator, count))
+
+
+def _close(iterator):
+    close = getattr(iterator, 'close', None)
+    if close is not None:
+        close()
+
+
+async def aiterate(iterable, batch=1):
+    """Async iterator over a blocking one, ``batch`` items per thread hop; closes it when done"""
+    iterator = iter(iterable)
+    take = sync_to_async(_take)
+    try:
+        while True:
+            items = await take(iterator, batch)
+            if not items:
+                break
+            for item in items:
+                yield item
+    finally:
+        await sync_to_async(_close)(iterator)
+
+
+class ClosingStream:
+    """``aiterate()`` over ``iterable`` that StreamingHttpResponse can also close"""
+
+    def __init__(self, iterable, batch=1):
+        self.iterator = iter(iterable)
+        self.stream = aiterate(self.iterator, batch)
+
+    def __aiter__(self):
+        return self.stream
+
+    def close(self):
+        _close(self.iterator)
+
+
+def streaming_content(iterable, request=None, batch=1):
+    """``iterable`` as the body of a StreamingHttpResponse answering ``request``"""
+    if request is not None and is_asgi(request):
+        return ClosingStream(iterable, batch)
+    return iterable
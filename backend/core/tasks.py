@@ -0,0 +1,77 @@
+"""Background tasks run by `manage.py run_worker` (see core.jobs)"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .jobs import task
+from . import cdn, related, reminders, trending, uploads
+from .models import ChunkedUpload, Job, SlowQuerySample, SlowQueryStat
+
+
+@task
+def purge_expired_sessions():
+    """Delete expired admin sessions"""
+    from importlib import import_module
+    from django.conf import settings
+
+    engine = import_module(settings.SESSION_ENGINE)
+    engine.SessionStore.clear_expired()
+
+
+@task
+def purge_finished_jobs(days=7):
+    """Delete completed and permanently failed jobs older than `days`"""
+    cutoff = timezone.now() - timedelta(days=days)
+    Job.objects.filter(status__in=['done', 'failed'], updated_at__lt=cutoff).delete()
+
+
+@task
+def refresh_trending():
+    """Recompute time-decayed trending scores from the daily rollups"""
+    trending.refresh_trending()
+
+
+@task
+def update_related_resources(resource_id, listed_by=()):
+    """Refresh the related-resources index around one changed resource"""
+    related.update_resource(resource_id, listed_by)
+
+
+@task
+def rebuild_related_resources():
+    """Rebuild the whole related-resources index"""
+    related.rebuild_index()
+
+
+@task
+def purge_surrogate_keys(keys):
+    """Purge the CDN entries tagged with ``keys`` after a change was saved"""
+    cdn.get_purger().purge(keys)
+
+
+@task
+def finalize_upload(upload_id):
+    """Reassemble a chunked upload, verify its checksum and store the file"""
+    upload = ChunkedUpload.objects.filter(pk=upload_id, status='processing').first()
+    if upload is not None:
+        uploads.finalize(upload)
+
+
+@task
+def purge_expired_uploads():
+    """Discard chunked uploads that were abandoned or finished long ago"""
+    uploads.purge_expired()
+
+
+@task
+def send_class_reminders():
+    """Email enrolled members about classes entering a reminder window"""
+    reminders.send_due_reminders()
+
+
+@task
+def purge_slow_queries(days=14):
+    """Forget slow-query samples, and fingerprints not seen since, older than `days`"""
+    cutoff = timezone.now() - timedelta(days=days)
+    SlowQuerySample.objects.filter(created_at__lt=cutoff).delete()
+    SlowQueryStat.objects.filter(last_seen__lt=cutoff).delete()
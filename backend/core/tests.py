@@ -1,3 +1,1244 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import close_old_connections, connection, connections, transaction
+from django.db.models.signals import post_save
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tars import settings as project_settings
+from tars.db_router import STICKY_COOKIE, ReplicaRoutingMiddleware
+from tars.sqlite_cache import SQLiteCache
+
+from . import cdn, related, slowqueries, trending, uploads
+from .autocomplete import PrefixIndex
+from .changelist import ApproximateCountPaginator
+from .dbpool import pool_stats
+from .downloads import parse_range
+from .enrollment import ClassFullError, enroll, unenroll
+from .exports import export_response
+from .ical import feed_token, user_id_from_token
+from .jobs import claim_jobs, enqueue, requeue_stale_jobs, retry_delay, run_job, schedule_recurring, task
+from .media import clear_media_url_cache
+from .models import (
+    ChunkedUpload, Class, ClassReminder, Enrollment, Job, RelatedResource, RequestProfile, Resource, ResourceDailyStat,
+    SlowQuerySample, SlowQueryStat, Sponsor, TrendingResource,
+)
+from .profiling import Sampler, hot_frames
+from .reminders import due_classes, send_due_reminders
+from .serializers import SponsorSerializer
+from .slowqueries import fingerprint, normalize_sql
+from .snapshots import read_pointer
+from .streaming import aiterate
+from .warmup import warm_up
+
+LOCAL_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class MediaRootMixin:
+    """Stores uploaded files in a throwaway MEDIA_ROOT"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(STORAGES=LOCAL_STORAGES, MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range('bytes=0-1,5-9', 100))
+        self.assertEqual(parse_range('bytes=0-', 100), (0, 99))
+        self.assertEqual(parse_range('bytes=10-19', 100), (10, 19))
+        self.assertEqual(parse_range('bytes=90-200', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=100-', 100)
+
+    def test_empty_file_is_sent_whole(self):
+        self.assertIsNone(parse_range('bytes=0-', 0))
+        self.assertIsNone(parse_range('bytes=-10', 0))
+
+
+class MediaURLCacheTests(MediaRootMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        clear_media_url_cache()
+        self.addCleanup(clear_media_url_cache)
+
+    def _sponsors(self, *names):
+        return [
+            Sponsor(name=name, logo=f'sponsors/{name}.png', collaboration_date=date(2025, 1, 1))
+            for name in names
+        ]
+
+    def test_each_name_resolved_once(self):
+        sponsors = self._sponsors('acme', 'globex', 'acme')
+        resolve = mock.patch.object(
+            FileSystemStorage, 'url', autospec=True, side_effect=lambda storage, name: f'/m/{name}',
+        )
+        with resolve as url:
+            data = SponsorSerializer(sponsors, many=True).data
+            SponsorSerializer(sponsors, many=True).data
+        self.assertEqual(
+            [row['logo'] for row in data], ['/m/sponsors/acme.png', '/m/sponsors/globex.png', '/m/sponsors/acme.png'],
+        )
+        self.assertEqual(url.call_count, 2)
+
+    def test_absolute_url_with_request(self):
+        request = RequestFactory().get('/api/sponsors/')
+        data = SponsorSerializer(self._sponsors('acme'), many=True, context={'request': request}).data
+        self.assertEqual(data[0]['logo'], 'http://testserver/media/sponsors/acme.png')
+        no_logo = Sponsor(name='none', collaboration_date=date(2025, 1, 1))
+        self.assertIsNone(SponsorSerializer(no_logo).data['logo'])
+
+
+class PrefixIndexTests(SimpleTestCase):
+    docs = {
+        ('class', 1): [('class', 'Intro to Python', 5), ('instructor', 'Ada', 5)],
+        ('class', 2): [('class', 'Robot Vision', 9), ('instructor', 'Ada', 9)],
+        ('resource', 1): [('resource', 'Python Cheatsheet', 3), ('author', 'Grace', 3)],
+    }
+
+    def _assert_same(self, index, docs):
+        fresh = PrefixIndex(docs)
+        self.assertEqual((index.keys, index.ranks, index.top), (fresh.keys, fresh.ranks, fresh.top))
+        for query in ['p', 'py', 'ada', 'r', 'vision', 'gr']:
+            self.assertEqual(index.search(query), fresh.search(query))
+
+    def test_patch_matches_rebuild(self):
+        index = PrefixIndex(dict(self.docs))
+        changes = {
+            ('class', 2): None,
+            ('class', 3): [('class', 'Python Robotics', 7), ('instructor', 'Grace', 7)],
+            ('resource', 1): [('resource', 'Arduino Cheatsheet', 4), ('author', 'Grace', 4)],
+        }
+        patched = index.patched(changes)
+        docs = {**self.docs, **changes}
+        del docs[('class', 2)]
+        self._assert_same(patched, docs)
+        self.assertEqual(patched.search('ada'), [{'type': 'instructor', 'text': 'Ada'}])
+        # The original index is untouched
+        self._assert_same(index, self.docs)
+
+
+class BrowserMiddlewareCheckTests(SimpleTestCase):
+    ids = {'admin.E408', 'admin.E409', 'admin.E410', 'security.W002', 'security.W003'}
+
+    def _reported(self):
+        return {message.id for message in run_checks(include_deployment_checks=True)} & self.ids
+
+    def test_browser_chain_satisfies_checks(self):
+        self.assertEqual(self._reported(), set())
+
+    def test_missing_browser_middleware_is_reported(self):
+        browser = [path for path in settings.BROWSER_MIDDLEWARE if not path.endswith('MessageMiddleware')]
+        with override_settings(BROWSER_MIDDLEWARE=browser):
+            self.assertEqual(self._reported(), {'admin.E409'})
+        lean = [path for path in settings.MIDDLEWARE if path != 'tars.middleware.BrowserMiddleware']
+        with override_settings(MIDDLEWARE=lean):
+            self.assertEqual(self._reported(), self.ids)
+
+
+class ColdStartTests(TestCase):
+    probe = """
+import json, sys
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+loaded = [name for name in ('cloudinary', 'cloudinary_storage.storage', 'core.tasks') if name in sys.modules]
+from core.jobs import get_task
+task = get_task('core.tasks.purge_expired_uploads')
+print(json.dumps({'loaded': loaded, 'task': getattr(task, 'task_name', None)}))
+"""
+
+    def test_integrations_and_tasks_load_lazily(self):
+        env = dict(os.environ, WARMUP_ON_START='False')
+        proc = subprocess.run(
+            [sys.executable, '-c', self.probe], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(
+            json.loads(proc.stdout.splitlines()[-1]), {'loaded': [], 'task': 'core.tasks.purge_expired_uploads'},
+        )
+
+    def test_startup_profile_command(self):
+        out = io.StringIO()
+        call_command('startup_profile', '--top', '3', stdout=out)
+        report = out.getvalue()
+        for heading in ['Startup phases', 'Apps (ms)', 'Import self-time by package']:
+            self.assertIn(heading, report)
+        self.assertIn('django.setup()', report)
+
+    def test_warm_up_runs_every_step(self):
+        # The test database connection has to stay open
+        with mock.patch('core.warmup.connections'), mock.patch('core.warmup.close_pools'):
+            with self.assertNoLogs('core.warmup', 'WARNING'):
+                timings = warm_up()
+        self.assertEqual(list(timings), ['urls', 'rest_framework', 'serializers', 'caches', 'autocomplete'])
+
+
+class ConnectionReuseTests(TestCase):
+    postgres = {'ENGINE': 'django.db.backends.postgresql', 'NAME': 'tars'}
+
+    def _configure(self, **constants):
+        with mock.patch.multiple(project_settings, **constants):
+            return project_settings.connection_reuse(dict(self.postgres, OPTIONS={}))
+
+    def test_persistent_connections(self):
+        database = self._configure(DB_POOL_MAX_SIZE=0, DB_CONN_MAX_AGE=60, DB_PGBOUNCER=False)
+        self.assertEqual((database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']), (60, True))
+        self.assertEqual(database['OPTIONS'], {})
+
+    def test_pool(self):
+        database = self._configure(DB_POOL_MAX_SIZE=4, DB_POOL_MIN_SIZE=8, DB_POOL_TIMEOUT=5.0, DB_PGBOUNCER=True)
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['OPTIONS']['pool']['min_size'], 4)
+        self.assertEqual(database['OPTIONS']['pool']['max_size'], 4)
+        self.assertTrue(database['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertNotIn('prepare_threshold', database['OPTIONS'])
+
+    def test_sqlite_untouched(self):
+        database = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'db.sqlite3'}
+        self.assertEqual(project_settings.connection_reuse(dict(database)), database)
+
+    def test_stats_count_requests(self):
+        before = pool_stats()['databases']['default']
+        for _ in range(2):
+            self.client.get('/api/health/live/')
+        after = pool_stats()['databases']['default']
+        self.assertEqual(after['mode'], 'per-request')
+        self.assertEqual(after['requests'] - before['requests'], 2)
+
+
+class SlowQueryNormalizationTests(SimpleTestCase):
+    def test_literals_and_lists_fold(self):
+        sql = """SELECT "t1"."id" FROM "t1"
+                 WHERE name = 'it''s' AND size > 4.5 AND id IN (%s, %s, %s) LIMIT 21"""
+        self.assertEqual(
+            normalize_sql(sql), 'SELECT "t1"."id" FROM "t1" WHERE name = ? AND size > ? AND id IN (...) LIMIT ?',
+        )
+
+    def test_fingerprint_ignores_values_only(self):
+        same = [
+            "SELECT * FROM core_class WHERE id IN (1, 2, 3) AND title = 'a'",
+            "SELECT * FROM core_class WHERE id IN (%s, %s) AND title = %s",
+        ]
+        self.assertEqual(len({fingerprint(normalize_sql(sql)) for sql in same}), 1)
+        other = fingerprint(normalize_sql("SELECT * FROM core_class WHERE slug = 'a'"))
+        self.assertNotEqual(other, fingerprint(normalize_sql(same[0])))
+        self.assertEqual(len(other), 16)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0.001, SLOW_QUERY_EXPLAIN_SAMPLE_RATE=0)
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        slowqueries._buffer.clear()
+        self.addCleanup(slowqueries._buffer.clear)
+        # Exactly one wrapper, whatever the test connection was opened with
+        wrappers = mock.patch.object(connection, 'execute_wrappers', [slowqueries.slow_query_wrapper])
+        wrappers.start()
+        self.addCleanup(wrappers.stop)
+
+    def test_queries_aggregate_by_fingerprint(self):
+        for title in ['a', 'b', 'c']:
+            Resource.objects.filter(title=title).count()
+        self.assertEqual(slowqueries.flush(), 3)
+        # Writing the log isn't logged itself
+        self.assertEqual(slowqueries._buffer, [])
+
+        stat = SlowQueryStat.objects.get()
+        self.assertEqual(stat.count, 3)
+        self.assertIn('WHERE "core_resource"."title" = ?', stat.sql)
+        samples = list(stat.samples.all())
+        self.assertEqual(len({sample.params_fingerprint for sample in samples}), 3)
+        self.assertTrue(all(sample.location.startswith('core/tests.py:') for sample in samples))
+
+    def test_view_labels_and_flush_after_response(self):
+        self.client.get('/api/sponsors/')
+        self.assertEqual(slowqueries._buffer, [])
+        self.assertIn('sponsor-list', set(SlowQuerySample.objects.values_list('view', flat=True)))
+
+
+def _spin(stop):
+    while not stop.is_set():
+        pass
+
+
+class SamplerTests(SimpleTestCase):
+    def test_samples_the_target_thread(self):
+        stop = threading.Event()
+        thread = threading.Thread(target=_spin, args=[stop])
+        thread.start()
+        sampler = Sampler(thread.ident, 0.001)
+        sampler.start()
+        time.sleep(0.05)
+        sampler.stop()
+        stop.set()
+        thread.join()
+        self.assertGreater(sampler.samples, 0)
+        self.assertIn('_spin (core/tests.py:', sampler.collapsed())
+
+    def test_hot_frames(self):
+        collapsed = 'main;view;query 6\nmain;view 3\nmain;render 1'
+        self.assertEqual(hot_frames(collapsed), [('query', 6, 6), ('view', 3, 9), ('render', 1, 1)])
+
+
+class ProfileRequestTests(TestCase):
+    def _get(self, user, **extra):
+        token = AccessToken.for_user(user)
+        return self.client.get('/api/sponsors/', HTTP_AUTHORIZATION=f'Bearer {token}', **extra)
+
+    def test_staff_request_is_profiled(self):
+        staff = User.objects.create_user('staff', is_staff=True)
+        response = self._get(staff, HTTP_X_PROFILE='1')
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual((profile.user, profile.path, profile.status_code), (staff, '/api/sponsors/', 200))
+        self.assertNotIn('X-Profile-Id', self._get(staff))
+
+    def test_others_are_not(self):
+        response = self._get(User.objects.create_user('member'), HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/sponsors/?profile=1'))
+        self.assertFalse(RequestProfile.objects.exists())
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.cache = SQLiteCache(f'{directory}/cache.sqlite3', {
+            'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2, 'CULL_EVERY': 5},
+        })
+
+    def _count(self):
+        return self.cache._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def test_culls_every_n_writes(self):
+        for i in range(14):
+            self.cache.set(f'key{i}', i)
+        self.assertEqual(self._count(), 14)
+        self.cache.set('key14', 14)
+        self.assertEqual(self._count(), 8)
+        # The least recently used half went
+        self.assertIsNone(self.cache.get('key0'))
+        self.assertEqual(self.cache.get('key14'), 14)
+
+    def test_set_many_counts_every_row(self):
+        self.cache.set_many({f'key{i}': i for i in range(15)})
+        self.assertEqual(self._count(), 8)
+
+
+class DownloadResourceFileTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user('member')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _resource(self, content):
+        resource = Resource(title='Notes', description='d', category='article')
+        resource.file.save('notes.pdf', ContentFile(content), save=True)
+        return resource
+
+    def _get(self, resource, range_header=None):
+        extra = {'HTTP_RANGE': range_header} if range_header else {}
+        response = self.client.get(f'/api/resources/{resource.pk}/file/', **extra)
+        return response, b''.join(response.streaming_content)
+
+    def test_range(self):
+        resource = self._resource(bytes(range(100)))
+        response, body = self._get(resource, 'bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(body, bytes(range(10, 20)))
+
+    def test_empty_file(self):
+        response, body = self._get(self._resource(b''), 'bytes=0-')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Range', response)
+        self.assertEqual(body, b'')
+
+    async def test_streamed_asynchronously_under_asgi(self):
+        resource = await sync_to_async(self._resource)(bytes(range(100)) * 1000)
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        response = await AsyncClient().get(
+            f'/api/resources/{resource.pk}/file/', headers={'Authorization': f'Bearer {token}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(body, bytes(range(100)) * 1000)
+
+    @override_settings(RESOURCE_FILE_CHUNK_SIZE=10)
+    async def test_abandoned_asgi_stream_closes_the_file(self):
+        resource = await sync_to_async(self._resource)(b'x' * 1000)
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        handles = []
+
+        def tracking_open(*args, **kwargs):
+            handles.append(open(*args, **kwargs))
+            return handles[-1]
+
+        with mock.patch('core.downloads.open', tracking_open, create=True):
+            response = await AsyncClient().get(
+                f'/api/resources/{resource.pk}/file/', headers={'Authorization': f'Bearer {token}'},
+            )
+        self.assertEqual(await anext(aiter(response)), b'x' * 10)
+        self.assertFalse(handles[0].closed)
+        # The client went away: the server stops iterating and closes the response
+        # (keeping the test database connection open, as the test client does)
+        request_finished.disconnect(close_old_connections)
+        try:
+            await sync_to_async(response.close)()
+        finally:
+            request_finished.connect(close_old_connections)
+        self.assertTrue(handles[0].closed)
+
+    async def test_aiterate_closes_the_iterator(self):
+        closed = []
+
+        def chunks():
+            try:
+                yield from [b'a', b'b', b'c']
+            finally:
+                closed.append(True)
+
+        stream = aiterate(chunks())
+        self.assertEqual(await anext(stream), b'a')
+        await stream.aclose()
+        self.assertEqual(closed, [True])
+
+    def test_counter_saves_leave_the_portal_alone(self):
+        resource = self._resource(b'x')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(f'/api/resources/{resource.pk}/download/')
+        self.assertEqual(callbacks, [])
+        with self.captureOnCommitCallbacks() as callbacks:
+            resource.title = 'Renamed'
+            resource.save()
+        self.assertTrue(callbacks)
+
+    def test_download_counted_once_per_user(self):
+        resource = self._resource(b'x' * 1000)
+        for range_header in ['bytes=0-', 'bytes=0-', None, 'bytes=500-']:
+            self._get(resource, range_header)
+        resource.refresh_from_db()
+        self.assertEqual(resource.download_count, 1)
+
+
+class LiveEventsTests(TestCase):
+    def test_refused_under_wsgi(self):
+        token = AccessToken.for_user(User.objects.create_user('member'))
+        response = self.client.get('/api/events/', {'token': str(token)})
+        self.assertEqual(response.status_code, 503)
+
+    def test_requires_token(self):
+        self.assertEqual(self.client.get('/api/events/').status_code, 401)
+
+    def test_rejects_inactive_and_deleted_users(self):
+        user = User.objects.create_user('member')
+        token = str(AccessToken.for_user(user))
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.client.get('/api/events/', {'token': token}).status_code, 401)
+        user.delete()
+        self.assertEqual(self.client.get('/api/events/', {'token': token}).status_code, 401)
+
+
+class HealthTests(TestCase):
+    def test_readiness_is_status_only(self):
+        response = self.client.get('/api/health/ready/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {'status', 'database', 'timestamp'})
+        self.assertEqual(response.json()['database'], 'ok')
+
+    def test_details_are_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('member'))
+        self.assertEqual(client.get('/api/metrics/db/').status_code, 403)
+        client.force_authenticate(User.objects.create_user('staff', is_staff=True))
+        readiness = client.get('/api/metrics/db/').data['readiness']
+        self.assertEqual(readiness['pending_migrations'], [])
+
+
+def make_class(**kwargs):
+    fields = {
+        'title': 'Intro to Robotics', 'description': 'd', 'instructor': 'Ada',
+        'start_date': timezone.now() + timedelta(days=7), 'duration': '1 hour',
+        'max_participants': 2, **kwargs,
+    }
+    return Class.objects.create(**fields)
+
+
+class EnrollmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(f'member{i}') for i in range(4)]
+
+    def _statuses(self, klass):
+        return dict(klass.enrollments.values_list('user__username', 'status'))
+
+    def test_full_class_without_waitlist(self):
+        klass = make_class(max_participants=1)
+        enroll(klass, self.users[0])
+        with self.assertRaises(ClassFullError):
+            enroll(klass, self.users[1])
+        klass.refresh_from_db()
+        self.assertEqual(klass.enrolled_count, 1)
+
+    def test_enroll_is_idempotent(self):
+        klass = make_class()
+        first = enroll(klass, self.users[0])
+        self.assertEqual(enroll(klass, self.users[0]).pk, first.pk)
+        klass.refresh_from_db()
+        self.assertEqual(klass.enrolled_count, 1)
+
+    def test_unenroll_promotes_oldest_waitlisted(self):
+        klass = make_class(max_participants=1, waitlist_enabled=True)
+        for user in self.users[:3]:
+            enroll(klass, user)
+        self.assertEqual(self._statuses(klass), {
+            'member0': 'enrolled', 'member1': 'waitlisted', 'member2': 'waitlisted',
+        })
+        promoted = unenroll(klass, self.users[0])
+        self.assertEqual(promoted.user, self.users[1])
+        self.assertEqual(self._statuses(klass), {'member1': 'enrolled', 'member2': 'waitlisted'})
+        klass.refresh_from_db()
+        self.assertEqual(klass.enrolled_count, 1)
+
+    def test_unenroll_without_waitlist_frees_the_seat(self):
+        klass = make_class(max_participants=1)
+        enroll(klass, self.users[0])
+        self.assertIsNone(unenroll(klass, self.users[0]))
+        klass.refresh_from_db()
+        self.assertEqual(klass.enrolled_count, 0)
+        enroll(klass, self.users[1])
+
+    def test_raising_capacity_promotes_waitlist(self):
+        klass = make_class(max_participants=1, waitlist_enabled=True)
+        for user in self.users:
+            enroll(klass, user)
+        klass.max_participants = 3
+        klass.save()
+        self.assertEqual(self._statuses(klass), {
+            'member0': 'enrolled', 'member1': 'enrolled', 'member2': 'enrolled', 'member3': 'waitlisted',
+        })
+        klass.refresh_from_db()
+        self.assertEqual(klass.enrolled_count, 3)
+
+    @override_settings(ENDPOINT_CACHE_STALE_WHILE_REVALIDATE=False)
+    def test_portal_shows_new_seat_counts(self):
+        klass = make_class(is_active=True)
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+
+        def seats():
+            response = client.get('/api/portal/')
+            data = next(c for c in response.data['classes'] if c['id'] == klass.pk)
+            return data['enrolled_count'], data['is_full']
+
+        self.assertEqual(seats(), (0, False))
+        with self.captureOnCommitCallbacks(execute=True):
+            enroll(klass, self.users[0])
+            enroll(klass, self.users[1])
+        self.assertEqual(seats(), (2, True))
+        with self.captureOnCommitCallbacks(execute=True):
+            unenroll(klass, self.users[1])
+        self.assertEqual(seats(), (1, False))
+
+    def test_portal_status_follows_the_clock(self):
+        klass = make_class(is_active=True, start_date=timezone.now() + timedelta(hours=1))
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+
+        def state():
+            data = next(c for c in client.get('/api/portal/').data['classes'] if c['id'] == klass.pk)
+            return data['status_display'], data['is_joinable']
+
+        self.assertEqual(state(), ('Upcoming', False))
+        with mock.patch('django.utils.timezone.now', return_value=klass.start_date + timedelta(minutes=5)):
+            self.assertEqual(state(), ('Ongoing', True))
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('member', password='old-password')
+        self.klass = make_class()
+        enroll(self.klass, self.user)
+        self.token = feed_token(self.user)
+
+    def _get(self, token=None, **headers):
+        return self.client.get('/api/classes/my-calendar.ics', {'token': token or self.token}, **headers)
+
+    def test_etag_answers_304_until_a_class_changes(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'UID:class-{self.klass.pk}@tars', response.content.decode())
+        etag = response['ETag']
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.klass.title = 'Advanced Robotics'
+        self.klass.save()
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('SUMMARY:Advanced Robotics', response.content.decode())
+
+    def test_enrolling_changes_the_member_etag(self):
+        etag = self._get()['ETag']
+        enroll(make_class(title='Second'), self.user)
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_password_change_revokes_token(self):
+        self.assertEqual(user_id_from_token(self.token), self.user.pk)
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assertIsNone(user_id_from_token(self.token))
+        self.assertEqual(self._get().status_code, 401)
+        self.assertEqual(user_id_from_token(feed_token(self.user)), self.user.pk)
+
+    def test_inactive_user_and_expired_token_rejected(self):
+        with override_settings(ICAL_TOKEN_MAX_AGE=-1):
+            self.assertIsNone(user_id_from_token(self.token))
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(user_id_from_token(self.token))
+
+
+@override_settings(
+    CLASS_REMINDER_WINDOWS={'day': 24 * 3600, 'hour': 3600, 'start': 0}, CLASS_REMINDER_START_GRACE=15 * 60,
+    CLASS_REMINDER_BATCH_SIZE=2,
+)
+class ClassReminderTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    def _class(self, offset, **kwargs):
+        return make_class(start_date=self.now + offset, max_participants=10, **kwargs)
+
+    def test_tightest_window_wins(self):
+        day = self._class(timedelta(hours=20))
+        hour = self._class(timedelta(minutes=30))
+        started = self._class(timedelta(minutes=-5))
+        self._class(timedelta(hours=30))
+        self._class(timedelta(minutes=-30))
+        self._class(timedelta(minutes=10), status='archived')
+        self._class(timedelta(minutes=10), is_active=False)
+        self.assertEqual(
+            [(klass.pk, kind) for klass, kind in due_classes(self.now)],
+            [(started.pk, 'start'), (hour.pk, 'hour'), (day.pk, 'day')],
+        )
+
+    def test_each_member_reminded_once_per_window(self):
+        klass = self._class(timedelta(minutes=30))
+        for i in range(3):
+            enroll(klass, User.objects.create_user(f'member{i}', f'member{i}@example.com', first_name=f'M{i}'))
+        enroll(klass, User.objects.create_user('no-email'))
+
+        with mock.patch('core.reminders.get_connection', wraps=get_connection) as connect:
+            self.assertEqual(send_due_reminders(self.now), {(klass.pk, 'hour'): 3})
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [f'member{i}@example.com' for i in range(3)])
+        self.assertTrue(mail.outbox[0].body.startswith('Hi M0,'))
+        self.assertEqual(ClassReminder.objects.filter(klass=klass, kind='hour').count(), 3)
+
+        # A later run in the same window sends nothing again
+        self.assertEqual(send_due_reminders(self.now + timedelta(minutes=5)), {(klass.pk, 'hour'): 0})
+        self.assertEqual(len(mail.outbox), 3)
+
+
+class ConcurrentEnrollmentTests(TransactionTestCase):
+    """Real threads and connections; needs a database with concurrent writers"""
+
+    def _race(self, func, users):
+        start = threading.Event()
+
+        def attempt(user):
+            start.wait()
+            try:
+                return func(user)
+            except ClassFullError:
+                return None
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(attempt, user) for user in users]
+            start.set()
+            return [future.result() for future in futures]
+
+    def _check_counts(self, klass, enrolled, waitlisted):
+        klass.refresh_from_db()
+        self.assertEqual(klass.enrolled_count, enrolled)
+        self.assertEqual(Enrollment.objects.filter(klass=klass, status='enrolled').count(), enrolled)
+        self.assertEqual(Enrollment.objects.filter(klass=klass, status='waitlisted').count(), waitlisted)
+
+    def test_never_overbooked(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("SQLite's in-memory test database locks tables under concurrent writers")
+        users = [User.objects.create_user(f'racer{i}') for i in range(40)]
+        klass = make_class(max_participants=5, waitlist_enabled=True)
+        self._race(lambda user: enroll(klass, user), users)
+        self._check_counts(klass, 5, 35)
+
+        seated = [e.user for e in klass.enrollments.filter(status='enrolled').select_related('user')]
+        self._race(lambda user: unenroll(klass, user), seated)
+        self._check_counts(klass, 5, 30)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.resources = [
+            Resource.objects.create(title=title, description='d', category='article', author=author)
+            for title, author in [('Notes, part 1', 'Ada'), ('Slides', '')]
+        ]
+
+    def _body(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_response_streams_rows(self):
+        fields = ['id', 'title', 'author', 'created_at']
+        response = export_response(Resource.objects.order_by('pk'), fields, 'csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="resource-\d{8}-\d{6}\.csv"$')
+        rows = list(csv.reader(io.StringIO(self._body(response))))
+        first = self.resources[0]
+        self.assertEqual(rows[0], fields)
+        self.assertEqual(rows[1], [str(first.pk), 'Notes, part 1', 'Ada', first.created_at.isoformat()])
+        self.assertEqual(len(rows), 3)
+
+    def test_jsonl_response(self):
+        response = export_response(Resource.objects.order_by('pk'), ['id', 'title'], 'jsonl')
+        lines = [json.loads(line) for line in self._body(response).splitlines()]
+        self.assertEqual(lines, [{'id': r.pk, 'title': r.title} for r in self.resources])
+
+    def test_admin_action(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.post('/admin/core/resource/', {
+            'action': 'export_jsonl', '_selected_action': [self.resources[1].pk],
+        })
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in self._body(response).splitlines()]
+        self.assertEqual([line['title'] for line in lines], ['Slides'])
+        self.assertIn('download_count', lines[0])
+
+    def test_export_data_command(self):
+        Resource.objects.filter(pk=self.resources[1].pk).update(is_active=False)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = f'{directory}/resources.csv'
+        call_command(
+            'export_data', 'Resource', '--fields', 'title,author', '--filter', 'is_active=True', '--output', path,
+        )
+        with open(path, newline='', encoding='utf-8') as f:
+            self.assertEqual(list(csv.reader(f)), [['title', 'author'], ['Notes, part 1', 'Ada']])
+
+
+class FastChangeListTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        self.classes = [make_class(title=f'Class {i}') for i in range(3)]
+
+    def test_list_editable_saves_in_one_update(self):
+        data = {'form-TOTAL_FORMS': '3', 'form-INITIAL_FORMS': '3', '_save': 'Save'}
+        for i, klass in enumerate(self.classes):
+            data[f'form-{i}-id'] = str(klass.pk)
+            data[f'form-{i}-status'] = 'upcoming' if i == 2 else 'ongoing'
+            if i != 1:
+                data[f'form-{i}-is_active'] = 'on'
+
+        saved = []
+
+        def receiver(sender, instance, update_fields=None, **kwargs):
+            saved.append((instance.pk, update_fields))
+
+        post_save.connect(receiver, sender=Class)
+        self.addCleanup(post_save.disconnect, receiver, sender=Class)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/admin/core/class/', data)
+
+        self.assertEqual(response.status_code, 302)
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "core_class"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            sorted(saved),
+            sorted((klass.pk, frozenset({'is_active', 'status', 'updated_at'})) for klass in self.classes[:2]),
+        )
+        statuses = dict(Class.objects.values_list('pk', 'status'))
+        self.assertEqual([statuses[klass.pk] for klass in self.classes], ['ongoing', 'ongoing', 'upcoming'])
+        self.assertFalse(Class.objects.get(pk=self.classes[1].pk).is_active)
+
+    def test_paginator_trusts_estimate_above_threshold(self):
+        queryset = Class.objects.order_by('pk')
+        with override_settings(ADMIN_APPROX_COUNT_THRESHOLD=100):
+            with mock.patch('core.changelist.estimate_count', return_value=50000):
+                self.assertEqual(ApproximateCountPaginator(queryset, 10).count, 50000)
+            with mock.patch('core.changelist.estimate_count', return_value=50):
+                self.assertEqual(ApproximateCountPaginator(queryset, 10).count, 3)
+        # No planner estimate outside PostgreSQL
+        self.assertEqual(ApproximateCountPaginator(queryset, 10).count, 3)
+
+
+_task_runs = []
+
+
+@task
+def failing_task():
+    raise RuntimeError('boom')
+
+
+@task
+def counting_task():
+    _task_runs.append(1)
+
+
+@override_settings(JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=60)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        _task_runs.clear()
+        # Full jitter picks anywhere in [0, cap]; take the cap to make delays predictable
+        uniform = mock.patch('core.jobs.random.uniform', side_effect=lambda low, high: high)
+        uniform.start()
+        self.addCleanup(uniform.stop)
+
+    def _run_due(self):
+        return [run_job(job) for job in claim_jobs('test', limit=10)]
+
+    def _make_due(self):
+        Job.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+
+    def test_retry_backoff_then_failure(self):
+        job = enqueue(failing_task, max_attempts=2)
+        self.assertEqual(self._run_due(), [False])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertAlmostEqual((job.run_at - timezone.now()).total_seconds(), 10, delta=2)
+        self.assertIn('RuntimeError: boom', job.last_error)
+        # Not due again until the backoff has passed
+        self.assertEqual(self._run_due(), [])
+
+        self._make_due()
+        self.assertEqual(self._run_due(), [False])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('failed', 2, ''))
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertEqual(
+            [retry_delay(attempts).total_seconds() for attempts in range(1, 6)], [10, 20, 40, 60, 60],
+        )
+
+    def test_recurring_job_is_requeued(self):
+        job = schedule_recurring(counting_task, 300)
+        self.assertEqual(schedule_recurring(counting_task, 600).pk, job.pk)
+        self.assertEqual(self._run_due(), [True])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.repeat_seconds), ('queued', 0, 600))
+        self.assertAlmostEqual((job.run_at - timezone.now()).total_seconds(), 600, delta=2)
+        self._make_due()
+        self._run_due()
+        self.assertEqual(len(_task_runs), 2)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_failing_recurring_job_stays_on_schedule(self):
+        job = schedule_recurring(failing_task, 300)
+        Job.objects.update(max_attempts=1)
+        self.assertEqual(self._run_due(), [False])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 0))
+        self.assertAlmostEqual((job.run_at - timezone.now()).total_seconds(), 300, delta=2)
+
+    def test_stale_jobs(self):
+        retry = enqueue(counting_task)
+        exhausted = enqueue(counting_task, max_attempts=1)
+        claim_jobs('dead-worker', limit=10)
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(timeout=60), 1)
+        retry.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((retry.status, retry.locked_by), ('queued', ''))
+        self.assertEqual(exhausted.status, 'failed')
+
+    def test_enqueue_rolls_back_with_the_transaction(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue(counting_task)
+                raise RuntimeError
+        self.assertFalse(Job.objects.exists())
+
+
+@override_settings(RELATED_RESOURCES_K=2)
+class RelatedIndexTests(TestCase):
+    def setUp(self):
+        topics = [
+            ('Arduino motor control', 'arduino,motors'),
+            ('Arduino servo motor basics', 'arduino,motors'),
+            ('Arduino stepper motor driver', 'arduino,motors'),
+            ('Arduino sensor wiring', 'arduino'),
+            ('Python for computer vision', 'python,vision'),
+            ('OpenCV vision with Python', 'python,vision'),
+        ]
+        self.resources = [
+            Resource.objects.create(title=title, description=title, category='article', tags=tags)
+            for title, tags in topics
+        ]
+        related.rebuild_index()
+
+    def _lists(self):
+        lists = {}
+        for resource_id, related_id in RelatedResource.objects.values_list('resource_id', 'related_id'):
+            lists.setdefault(resource_id, set()).add(related_id)
+        return lists
+
+    def _assert_matches_rebuild(self):
+        incremental = self._lists()
+        related.rebuild_index()
+        self.assertEqual(incremental, self._lists())
+
+    def test_edit_moves_resource_between_lists(self):
+        resource = self.resources[3]
+        resource.title = resource.description = 'Computer vision sensor with Python'
+        resource.tags = 'python,vision'
+        resource.save()
+        related.update_resource(resource.pk)
+        self._assert_matches_rebuild()
+
+    def test_delete_refills_lists(self):
+        resource = self.resources[0]
+        listed_by = list(RelatedResource.objects.filter(related_id=resource.pk).values_list('resource_id', flat=True))
+        self.assertTrue(listed_by)
+        pk = resource.pk
+        resource.delete()
+        related.update_resource(pk, listed_by)
+        lists = self._lists()
+        self.assertNotIn(pk, lists)
+        for other in listed_by:
+            self.assertEqual(len(lists[other]), 2)
+
+    def test_deactivate_removes_resource(self):
+        resource = self.resources[4]
+        resource.is_active = False
+        resource.save()
+        related.update_resource(resource.pk)
+        lists = self._lists()
+        self.assertNotIn(resource.pk, lists)
+        self.assertFalse(any(resource.pk in neighbours for neighbours in lists.values()))
+
+
+class ChunkedUploadTests(MediaRootMixin, TestCase):
+    content = bytes(range(256)) * 40
+
+    def setUp(self):
+        super().setUp()
+        staging = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, staging, ignore_errors=True)
+        settings_override = override_settings(CHUNKED_UPLOADS={
+            'BACKEND': 'core.uploads.LocalStagingBackend', 'OPTIONS': {'location': staging},
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        uploads._backend = None
+        self.addCleanup(setattr, uploads, '_backend', None)
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('staff', is_staff=True))
+        self.resource = Resource.objects.create(title='Notes', description='d', category='article')
+
+    def _start(self, checksum=None):
+        response = self.client.post('/api/uploads/', {
+            'target': 'resource.file', 'object_id': self.resource.pk, 'filename': 'notes.pdf',
+            'size': len(self.content), 'checksum': checksum or hashlib.sha256(self.content).hexdigest(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def _put(self, upload_id, start, end, **headers):
+        return self.client.generic(
+            'PUT', f'/api/uploads/{upload_id}/', self.content[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}', **headers,
+        )
+
+    def _finalize(self, upload_id):
+        response = self.client.post(f'/api/uploads/{upload_id}/finalize/')
+        self.assertEqual(response.status_code, 202)
+        return self._finalize_queued(upload_id)
+
+    def _finalize_queued(self, upload_id):
+        for job in claim_jobs('test', limit=100):
+            run_job(job)
+        return ChunkedUpload.objects.get(pk=upload_id)
+
+    def test_stale_offset_conflicts(self):
+        upload_id = self._start()
+        self.assertEqual(self._put(upload_id, 0, 4095).status_code, 200)
+        response = self._put(upload_id, 0, 4095)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 4096)
+        self.assertEqual(self._put(upload_id, 8192, 10239).status_code, 409)
+
+    def test_chunk_checksum_mismatch(self):
+        upload_id = self._start()
+        response = self._put(upload_id, 0, 4095, HTTP_X_CHUNK_SHA256='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['offset'], 0)
+        digest = hashlib.sha256(self.content[:4096]).hexdigest()
+        self.assertEqual(self._put(upload_id, 0, 4095, HTTP_X_CHUNK_SHA256=digest).data['offset'], 4096)
+
+    def test_finalize_stores_the_file(self):
+        upload_id = self._start()
+        self.assertEqual(self.client.post(f'/api/uploads/{upload_id}/finalize/').status_code, 409)
+        for start in range(0, len(self.content), 4096):
+            self.assertEqual(self._put(upload_id, start, min(start + 4095, len(self.content) - 1)).status_code, 200)
+        upload = self._finalize(upload_id)
+        self.assertEqual(upload.status, 'complete')
+        self.resource.refresh_from_db()
+        with self.resource.file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_finalize_rejects_checksum_mismatch(self):
+        upload_id = self._start(checksum='0' * 64)
+        self._put(upload_id, 0, len(self.content) - 1)
+        upload = self._finalize(upload_id)
+        self.assertEqual((upload.status, upload.error), ('failed', 'Checksum mismatch'))
+        self.resource.refresh_from_db()
+        self.assertFalse(self.resource.file)
+
+    def test_finalize_fails_loudly_without_staged_chunks(self):
+        upload_id = self._start()
+        self._put(upload_id, 0, len(self.content) - 1)
+        # The worker looks in a staging directory the web service never wrote to
+        uploads.get_backend().delete(ChunkedUpload.objects.get(pk=upload_id))
+        with self.assertLogs('core.uploads', 'ERROR') as logs:
+            upload = self._finalize(upload_id)
+        self.assertIn('CHUNKED_UPLOAD_DIR', logs.output[0])
+        self.assertEqual(upload.status, 'failed')
+
+    def test_purge_leaves_processing_uploads(self):
+        upload_id = self._start()
+        self._put(upload_id, 0, len(self.content) - 1)
+        self.assertEqual(self.client.post(f'/api/uploads/{upload_id}/finalize/').status_code, 202)
+        ChunkedUpload.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(uploads.purge_expired(), 0)
+        upload = self._finalize_queued(upload_id)
+        self.assertEqual(upload.status, 'complete')
+
+
+@override_settings(CDN_PURGER={'BACKEND': 'core.cdn.LocalPurger'})
+class CDNTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        cdn._purger = None
+        self.addCleanup(setattr, cdn, '_purger', None)
+        self.sponsor = Sponsor.objects.create(
+            name='Acme', logo='sponsors/acme.png', collaboration_agenda='a', collaboration_date='2025-01-01',
+        )
+
+    def test_cache_headers(self):
+        response = self.client.get('/api/sponsors/')
+        self.assertEqual(response['Cache-Control'], cdn.cache_control('sponsors'))
+        self.assertEqual(response['Surrogate-Key'], f'sponsor sponsor:{self.sponsor.pk}')
+        self.assertEqual(response['Cache-Tag'], f'sponsor,sponsor:{self.sponsor.pk}')
+
+    def test_save_queues_purge(self):
+        Job.objects.all().delete()
+        self.sponsor.name = 'Acme Robotics'
+        self.sponsor.save()
+        self.assertEqual(cdn.get_purger().calls, [])
+        job = Job.objects.get(task='core.tasks.purge_surrogate_keys')
+        self.assertEqual(job.args, [['sponsor', f'sponsor:{self.sponsor.pk}']])
+
+        Job.objects.exclude(pk=job.pk).delete()
+        for job in claim_jobs('test'):
+            run_job(job)
+        self.assertEqual(cdn.get_purger().purged_keys(), {'sponsor', f'sponsor:{self.sponsor.pk}'})
+
+
+class SnapshotTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root, ignore_errors=True)
+        settings_override = override_settings(STATIC_ROOT=static_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_save_publishes_in_this_process(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            sponsor = Sponsor.objects.create(
+                name='Acme', logo='sponsors/acme.png', collaboration_agenda='a', collaboration_date='2025-01-01',
+            )
+        first = read_pointer()
+        self.assertIsNotNone(first)
+        self.assertFalse(Job.objects.filter(task='core.tasks.publish_snapshots').exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sponsor.name = 'Acme Robotics'
+            sponsor.save()
+        self.assertNotEqual(read_pointer()['files']['sponsors'], first['files']['sponsors'])
+
+
+@override_settings(TRENDING_HALF_LIFE_DAYS=7, TRENDING_VIEW_WEIGHT=0.1)
+class TrendingTests(TestCase):
+    def setUp(self):
+        trending._pending.clear()
+        self.addCleanup(trending._pending.clear)
+        self.resources = [
+            Resource.objects.create(title=f'Resource {i}', description='d', category='article') for i in range(3)
+        ]
+
+    def test_flush_adds_to_the_daily_rollup(self):
+        first, second = self.resources[:2]
+        trending.record_download(first.pk)
+        trending.record_download(first.pk)
+        trending.record_view(second.pk)
+        self.assertEqual(trending.flush_events(), 2)
+        trending.record_download(first.pk)
+        trending.record_view(first.pk)
+        trending.flush_events()
+
+        today = timezone.localdate()
+        stats = {
+            stat.resource_id: (stat.downloads, stat.views)
+            for stat in ResourceDailyStat.objects.filter(day=today)
+        }
+        self.assertEqual(stats, {first.pk: (3, 1), second.pk: (0, 1)})
+
+    def test_flush_drops_deleted_resources(self):
+        resource = self.resources[0]
+        trending.record_download(resource.pk)
+        resource.delete()
+        self.assertEqual(trending.flush_events(), 0)
+
+    @override_settings(TRENDING_FLUSH_INTERVAL=0)
+    def test_flushed_after_the_response(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('member'))
+        client.post(f'/api/resources/{self.resources[0].pk}/download/')
+        self.assertFalse(trending._pending)
+        self.assertEqual(ResourceDailyStat.objects.get(resource=self.resources[0]).downloads, 1)
+
+    def test_scores_decay_with_age(self):
+        today = timezone.localdate()
+        fresh, week_old, viewed = self.resources
+        ResourceDailyStat.objects.create(resource=fresh, day=today, downloads=10)
+        ResourceDailyStat.objects.create(resource=week_old, day=today - timedelta(days=7), downloads=10)
+        ResourceDailyStat.objects.create(resource=viewed, day=today, views=30)
+        scores = trending.decayed_scores(today)
+        self.assertAlmostEqual(scores[fresh.pk], 10)
+        self.assertAlmostEqual(scores[week_old.pk], 5)
+        self.assertAlmostEqual(scores[viewed.pk], 3)
+
+    def test_endpoint_ranks_active_resources(self):
+        today = timezone.localdate()
+        for downloads, resource in zip([1, 5, 3], self.resources):
+            ResourceDailyStat.objects.create(resource=resource, day=today, downloads=downloads)
+        Resource.objects.filter(pk=self.resources[2].pk).update(is_active=False)
+        self.assertEqual(trending.refresh_trending(), 2)
+        self.assertEqual(TrendingResource.objects.count(), 2)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('member'))
+        data = client.get('/api/resources/trending/').data['resources']
+        self.assertEqual(
+            [(item['id'], item['trending_score']) for item in data],
+            [(self.resources[1].pk, 5.0), (self.resources[0].pk, 1.0)],
+        )
+
+
+@override_settings(
+    DATABASE_ROUTERS=['tars.db_router.PrimaryReplicaRouter'], REPLICA_STICKY_SECONDS=10,
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Routing decisions only: ``QuerySet.db`` names the alias without querying,
+    so the replica alias needs no database of its own here
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('member')
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')  # overriding DATABASES warns
+            with self.settings(DATABASES={**settings.DATABASES, 'replica': settings.DATABASES['default']}):
+                self.middleware = ReplicaRoutingMiddleware(self._view)
+        self.factory = RequestFactory()
+
+    def _view(self, request):
+        self.reads = [Resource.objects.all().db]
+        with transaction.atomic():
+            self.reads.append(Resource.objects.all().db)
+        if request.method == 'POST':
+            Resource.objects.create(title='Notes', description='d', category='article')
+            self.reads.append(Resource.objects.all().db)
+        return HttpResponse()
+
+    def _request(self, method='get', user=True, cookies=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}'} if user else {}
+        request = getattr(self.factory, method)('/api/resources/', **headers)
+        request.COOKIES.update(cookies or {})
+        return self.middleware(request)
+
+    def test_safe_reads_use_the_replica_outside_transactions(self):
+        response = self._request()
+        self.assertEqual(self.reads, ['replica', 'default'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_write_pins_the_request_and_later_reads(self):
+        response = self._request('post')
+        self.assertEqual(self.reads, ['default', 'default', 'default'])
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        # The token's user is pinned through the cache, even without the cookie
+        self._request()
+        self.assertEqual(self.reads[0], 'default')
+        # Anonymous clients are pinned by the cookie
+        self._request(user=False, cookies={STICKY_COOKIE: '1'})
+        self.assertEqual(self.reads[0], 'default')
+        cache.clear()
+        self._request()
+        self.assertEqual(self.reads[0], 'replica')
+
+    def test_outside_requests_use_the_primary(self):
+        self.assertEqual(Resource.objects.all().db, 'default')
@@ -0,0 +1,143 @@
+"""
+Trending resources from daily download/view rollups.
+
+Download and view events are counted in a per-process buffer and written as
+one batched upsert into ResourceDailyStat (``ON CONFLICT ... DO UPDATE`` adding
+to the existing counters), so recording an event costs no query. The buffer
+is written after a response (``request_finished``, on the request's own
+thread and connection) once it holds ``TRENDING_FLUSH_SIZE`` entries or its
+oldest event is ``TRENDING_FLUSH_INTERVAL`` seconds old. A worker that goes
+quiet keeps its buffer until its next request; gunicorn's ``worker_exit``
+hook writes it when the worker is recycled or stopped.
+
+``refresh_trending()`` runs as a recurring background job and stores an
+exponentially decayed score per resource in TrendingResource, so the trending
+endpoint is a single indexed read instead of an aggregation over raw events.
+"""
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, connections, router, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Resource, ResourceDailyStat, TrendingResource
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = defaultdict(lambda: [0, 0])  # (resource_id, day) -> [downloads, views]
+_oldest = None  # time.monotonic() of the first event in the buffer
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _record(resource_id, downloads=0, views=0):
+    global _oldest
+    day = timezone.localdate()
+    with _lock:
+        if not _pending:
+            _oldest = time.monotonic()
+        counts = _pending[(resource_id, day)]
+        counts[0] += downloads
+        counts[1] += views
+
+
+def record_download(resource_id):
+    _record(resource_id, downloads=1)
+
+
+def record_view(resource_id):
+    _record(resource_id, views=1)
+
+
+def flush_events():
+    """Write buffered counters to ResourceDailyStat in one batched upsert"""
+    global _oldest
+    with _lock:
+        rows = [(rid, day, d, v) for (rid, day), (d, v) in _pending.items()]
+        _pending.clear()
+        _oldest = None
+    if not rows:
+        return 0
+
+    # Drop events for resources deleted since they were buffered
+    existing = set(
+        Resource.objects.filter(id__in={row[0] for row in rows}).values_list('id', flat=True)
+    )
+    rows = [row for row in rows if row[0] in existing]
+    if not rows:
+        return 0
+
+    db = router.db_for_write(ResourceDailyStat)
+    connection = connections[db]
+    table = connection.ops.quote_name(ResourceDailyStat._meta.db_table)
+    sql = (
+        f'INSERT INTO {table} (resource_id, day, downloads, views) VALUES (%s, %s, %s, %s) '
+        f'ON CONFLICT (resource_id, day) DO UPDATE SET '
+        f'downloads = {table}.downloads + EXCLUDED.downloads, '
+        f'views = {table}.views + EXCLUDED.views'
+    )
+    params = [(rid, connection.ops.adapt_datefield_value(day), d, v) for rid, day, d, v in rows]
+    with transaction.atomic(using=db), connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+    return len(rows)
+
+
+@receiver(request_finished)
+def _flush_when_due(sender, **kwargs):
+    oldest = _oldest
+    if oldest is None:
+        return
+    if (len(_pending) < _setting('TRENDING_FLUSH_SIZE', 100)
+            and time.monotonic() - oldest < _setting('TRENDING_FLUSH_INTERVAL', 30)):
+        return
+    try:
+        flush_events()
+    except DatabaseError:
+        logger.exception('Could not flush buffered resource stats')
+
+
+def decayed_scores(today=None):
+    """
+    Score per resource: sum over days of (downloads + TRENDING_VIEW_WEIGHT * views),
+    each day weighted by 2 ** (-age / TRENDING_HALF_LIFE_DAYS).
+    """
+    today = today or timezone.localdate()
+    half_life = _setting('TRENDING_HALF_LIFE_DAYS', 7)
+    view_weight = _setting('TRENDING_VIEW_WEIGHT', 0.1)
+    window = _setting('TRENDING_WINDOW_DAYS', 60)
+    decay = math.log(2) / half_life
+
+    scores = defaultdict(float)
+    stats = ResourceDailyStat.objects.filter(
+        day__gt=today - timedelta(days=window),
+        resource__is_active=True,
+    ).values_list('resource_id', 'day', 'downloads', 'views')
+    for resource_id, day, downloads, views in stats.iterator(chunk_size=2000):
+        age = (today - day).days
+        scores[resource_id] += (downloads + view_weight * views) * math.exp(-decay * age)
+    return scores
+
+
+def refresh_trending():
+    """Recompute TrendingResource from the rollups; returns the number of rows"""
+    now = timezone.now()
+    rows = [
+        TrendingResource(resource_id=resource_id, score=score, refreshed_at=now)
+        for resource_id, score in decayed_scores().items()
+        if score > 0
+    ]
+    with transaction.atomic(using=router.db_for_write(TrendingResource)):
+        TrendingResource.objects.all().delete()
+        TrendingResource.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
@@ -0,0 +1,324 @@
+"""
+Chunked, resumable uploads for Resource.file and Class.syllabus.
+
+A large file is sent as a series of short requests instead of one multipart
+POST, so no request ties up a worker for the whole transfer and a dropped
+connection only costs the chunk in flight:
+
+1. ``POST /api/uploads/`` with target, object id, filename, total size and
+   the SHA-256 of the whole file opens an upload session.
+2. ``PUT /api/uploads/<id>/`` sends the next chunk as the raw request body
+   with ``Content-Range: bytes <start>-<end>/<size>`` (and optionally
+   ``X-Chunk-SHA256``). ``start`` must equal the bytes received so far.
+3. After a disconnect, ``GET /api/uploads/<id>/`` returns that offset and
+   the client carries on from there.
+4. ``POST /api/uploads/<id>/finalize/`` hands the upload to a background
+   job, which reassembles the chunks, verifies the checksum and saves the
+   file into the target field through its storage.
+
+Chunks are streamed to the staging backend in small pieces, so neither the
+web worker nor the job ever holds a whole chunk or file in memory. The
+offset only advances through a conditional UPDATE, so of two requests
+racing for the same range exactly one is accepted. ``LocalStagingBackend``
+keeps chunks as part files under ``CHUNKED_UPLOAD_DIR``, which the web
+process writes and the job worker reads, so both must mount the same
+directory. If the worker finds no chunks for an upload it logs an error
+naming the directory and fails the upload instead of guessing. The backend
+is also the stand-in used in tests; a backend with native multipart support
+only needs to implement the same methods.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.text import get_valid_filename
+
+from .models import ChunkedUpload, Class, Resource
+
+TARGETS = {
+    'resource.file': (Resource, 'file'),
+    'class.syllabus': (Class, 'syllabus'),
+}
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+READ_SIZE = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class UploadError(Exception):
+    """A request the upload session cannot accept; ``status_code`` is the HTTP status"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StagingMissing(UploadError):
+    """The staged chunks of a fully received upload are not where the finalizer looks"""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _expiry():
+    return timezone.now() + timedelta(seconds=_setting('CHUNKED_UPLOAD_EXPIRY', 24 * 3600))
+
+
+class LocalStagingBackend:
+    """
+    Chunks as ``<location>/<upload id>/<offset>.part`` files, concatenated in
+    offset order when the upload is finalized
+    """
+
+    def __init__(self, location):
+        self.location = location
+
+    def _dir(self, upload):
+        return os.path.join(self.location, str(upload.pk))
+
+    def stage(self, upload, offset, pieces):
+        """
+        Write one chunk next to the accepted ones without making it visible.
+        Returns ``(token, length, sha256 hex digest)``.
+        """
+        directory = self._dir(upload)
+        os.makedirs(directory, exist_ok=True)
+        token = os.path.join(directory, f'{offset:015d}.{uuid.uuid4().hex}.tmp')
+        digest, length = hashlib.sha256(), 0
+        try:
+            with open(token, 'wb') as f:
+                for piece in pieces:
+                    f.write(piece)
+                    digest.update(piece)
+                    length += len(piece)
+        except BaseException:
+            self.discard(token)
+            raise
+        return token, length, digest.hexdigest()
+
+    def commit(self, upload, offset, token):
+        os.replace(token, os.path.join(self._dir(upload), f'{offset:015d}.part'))
+
+    def discard(self, token):
+        try:
+            os.remove(token)
+        except FileNotFoundError:
+            pass
+
+    def assemble(self, upload):
+        """Concatenate the parts into one file; returns ``(path, sha256 hex digest)``"""
+        directory = self._dir(upload)
+        if not os.path.isdir(directory):
+            raise StagingMissing(f'No staged chunks in {directory}')
+        parts = sorted(name for name in os.listdir(directory) if name.endswith('.part'))
+        path = os.path.join(directory, 'assembled')
+        digest, position = hashlib.sha256(), 0
+        with open(path, 'wb') as out:
+            for name in parts:
+                if int(name.split('.')[0]) != position:
+                    raise UploadError(f'Missing data at byte {position}')
+                with open(os.path.join(directory, name), 'rb') as part:
+                    while piece := part.read(READ_SIZE):
+                        out.write(piece)
+                        digest.update(piece)
+                        position += len(piece)
+        if position != upload.size:
+            raise UploadError(f'Received {position} of {upload.size} bytes')
+        return path, digest.hexdigest()
+
+    def delete(self, upload):
+        shutil.rmtree(self._dir(upload), ignore_errors=True)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = _setting('CHUNKED_UPLOADS', {})
+                backend = import_string(config.get('BACKEND', 'core.uploads.LocalStagingBackend'))
+                _backend = backend(**config.get('OPTIONS', {}))
+    return _backend
+
+
+def start_upload(user, target, object_id, filename, size, checksum):
+    """Validate the declared file and open an upload session"""
+    if target not in TARGETS:
+        raise UploadError(f"target must be one of {', '.join(TARGETS)}")
+    model, _ = TARGETS[target]
+    try:
+        object_id, size = int(object_id), int(size)
+    except (TypeError, ValueError):
+        raise UploadError('object_id and size must be integers')
+    if not model.objects.filter(pk=object_id).exists():
+        raise UploadError(f'{model._meta.verbose_name} {object_id} not found', 404)
+
+    max_size = _setting('CHUNKED_UPLOAD_MAX_SIZE', 2 * 1024 ** 3)
+    if not 0 < size <= max_size:
+        raise UploadError(f'size must be between 1 and {max_size} bytes', 413 if size > 0 else 400)
+    checksum = (checksum or '').lower()
+    if not SHA256_RE.match(checksum):
+        raise UploadError('checksum must be the hex SHA-256 of the file')
+    try:
+        filename = get_valid_filename(os.path.basename(filename or ''))
+    except SuspiciousFileOperation:
+        raise UploadError('filename is not valid')
+
+    return ChunkedUpload.objects.create(
+        user=user, target=target, object_id=object_id, filename=filename,
+        size=size, checksum=checksum, expires_at=_expiry(),
+    )
+
+
+def _read(stream, length):
+    remaining = length
+    while remaining:
+        piece = stream.read(min(READ_SIZE, remaining))
+        if not piece:
+            break
+        remaining -= len(piece)
+        yield piece
+
+
+def receive_chunk(upload, content_range, stream, chunk_sha256=None):
+    """
+    Stage one chunk from ``stream`` and advance the offset. Returns the new
+    offset; raises UploadError (409 when ``start`` isn't the current offset,
+    so the client can resume from the offset it gets back).
+    """
+    if upload.status != 'uploading':
+        raise UploadError(f'Upload is {upload.status}', 409)
+    match = CONTENT_RANGE_RE.match(content_range or '')
+    if not match:
+        raise UploadError('Content-Range: bytes <start>-<end>/<size> is required')
+    start, end, total = (int(g) for g in match.groups())
+    length = end - start + 1
+    if total != upload.size or length < 1 or end >= upload.size:
+        raise UploadError('Content-Range does not match the declared size', 416)
+    if length > _setting('CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 16 * 1024 * 1024):
+        raise UploadError('Chunk is too large', 413)
+    if start != upload.offset:
+        raise UploadError(f'Expected a chunk starting at byte {upload.offset}', 409)
+
+    backend = get_backend()
+    token, received, digest = backend.stage(upload, start, _read(stream, length))
+    if received != length:
+        backend.discard(token)
+        raise UploadError(f'Chunk ended after {received} of {length} bytes')
+    if chunk_sha256 and chunk_sha256.lower() != digest:
+        backend.discard(token)
+        raise UploadError('Chunk checksum mismatch')
+
+    # Only the request that moves the offset from ``start`` keeps its chunk
+    accepted = ChunkedUpload.objects.filter(pk=upload.pk, status='uploading', offset=start).update(
+        offset=F('offset') + length, expires_at=_expiry(), updated_at=timezone.now(),
+    )
+    if not accepted:
+        backend.discard(token)
+        upload.refresh_from_db(fields=['offset', 'status'])
+        raise UploadError(f'Expected a chunk starting at byte {upload.offset}', 409)
+    backend.commit(upload, start, token)
+    upload.offset = start + length
+    return upload.offset
+
+
+def request_finalize(upload):
+    """Hand a fully received upload to the background job"""
+    from .jobs import enqueue
+
+    if upload.offset != upload.size:
+        raise UploadError(f'Received {upload.offset} of {upload.size} bytes', 409)
+    if not ChunkedUpload.objects.filter(pk=upload.pk, status='uploading').update(
+        status='processing', updated_at=timezone.now(),
+    ):
+        upload.refresh_from_db(fields=['status'])
+        raise UploadError(f'Upload is {upload.status}', 409)
+    upload.status = 'processing'
+    enqueue('core.tasks.finalize_upload', args=[str(upload.pk)])
+
+
+def _fail(upload, message):
+    upload.status, upload.error = 'failed', message
+    upload.save(update_fields=['status', 'error', 'updated_at'])
+    get_backend().delete(upload)
+
+
+def finalize(upload):
+    """Reassemble, verify and store the file (run by the background job)"""
+    backend = get_backend()
+    model, field = TARGETS[upload.target]
+    try:
+        path, digest = backend.assemble(upload)
+    except StagingMissing as e:
+        logger.error(
+            'Chunked upload %s: %s. The job worker must share the staging location '
+            '(CHUNKED_UPLOAD_DIR) with the web service.', upload.pk, e,
+        )
+        return _fail(upload, 'Uploaded chunks are missing on the server; upload the file again')
+    except (UploadError, FileNotFoundError) as e:
+        return _fail(upload, str(e))
+    if digest != upload.checksum:
+        return _fail(upload, 'Checksum mismatch')
+    instance = model.objects.filter(pk=upload.object_id).first()
+    if instance is None:
+        return _fail(upload, f'{model._meta.verbose_name} {upload.object_id} no longer exists')
+
+    # Storage errors propagate so the job is retried
+    with open(path, 'rb') as f:
+        getattr(instance, field).save(upload.filename, File(f), save=False)
+    instance.save(update_fields=[field, 'updated_at'])
+    upload.status, upload.error = 'complete', ''
+    upload.save(update_fields=['status', 'error', 'updated_at'])
+    backend.delete(upload)
+
+
+def abort(upload):
+    if upload.status == 'processing':
+        raise UploadError('Upload is being processed', 409)
+    get_backend().delete(upload)
+    upload.delete()
+
+
+def purge_expired():
+    """Discard staged data of uploads past their expiry; returns how many"""
+    # A processing upload belongs to its finalize job, however long that waits in the queue
+    expired = ChunkedUpload.objects.filter(expires_at__lt=timezone.now()).exclude(status='processing')
+    backend = get_backend()
+    count = 0
+    for upload in expired.iterator():
+        backend.delete(upload)
+        upload.delete()
+        count += 1
+    return count
+
+
+def describe(upload):
+    return {
+        'id': str(upload.pk),
+        'target': upload.target,
+        'object_id': upload.object_id,
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.offset,
+        'status': upload.status,
+        'error': upload.error,
+        'chunk_size': _setting('CHUNKED_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024),
+        'expires_at': upload.expires_at.isoformat(),
+    }
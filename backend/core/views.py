@@ -1,33 +1,53 @@
-from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, permission_classes
+from django.db.models import F
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from rest_framework import renderers, viewsets, status
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from .models import SiteSettings, Sponsor, SocialLink, Class, Resource
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from . import events
+from .autocomplete import suggest
+from .cdn import SurrogateKeyMixin, ids_in, surrogate_keys, tag_response
+from .downloads import claim_download, counts_as_download, file_response
+from .enrollment import ClassFullError, enroll, unenroll
+from .ical import build_feed, feed_etag, feed_token, user_id_from_token
+from .models import (
+    SiteSettings, Sponsor, SocialLink, Class, Resource, TrendingResource, RelatedResource, ChunkedUpload
+)
+from .singleflight import HIT, MISS, STATUS_HEADER, cached_payload
+from .snapshots import home_payload
+from .trending import record_download, record_view
+from . import uploads
 from .serializers import (
     SiteSettingsSerializer, SponsorSerializer, SocialLinkSerializer,
     ClassSerializer, ResourceSerializer
 )
 
 
-class SiteSettingsViewSet(viewsets.ReadOnlyModelViewSet):
+class SiteSettingsViewSet(SurrogateKeyMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for site settings"""
     queryset = SiteSettings.objects.all()
     serializer_class = SiteSettingsSerializer
     permission_classes = [AllowAny]
+    cdn_policy = 'site_settings'
 
 
-class SponsorViewSet(viewsets.ReadOnlyModelViewSet):
+class SponsorViewSet(SurrogateKeyMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for sponsors"""
     queryset = Sponsor.objects.filter(is_active=True)
     serializer_class = SponsorSerializer
     permission_classes = [AllowAny]
+    cdn_policy = 'sponsors'
 
 
-class SocialLinkViewSet(viewsets.ReadOnlyModelViewSet):
+class SocialLinkViewSet(SurrogateKeyMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only view for social links"""
     queryset = SocialLink.objects.filter(is_active=True)
     serializer_class = SocialLinkSerializer
     permission_classes = [AllowAny]
+    cdn_policy = 'social_links'
 
 
 class ClassViewSet(viewsets.ReadOnlyModelViewSet):
@@ -43,27 +63,27 @@ class ResourceViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ResourceSerializer
     permission_classes = [IsAuthenticated]
 
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        record_view(response.data['id'])
+        return response
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def home_page_data(request):
     """
-    Single endpoint to get all home page data
-    """
-    # Get site settings (should be only one)
-    site_settings = SiteSettings.objects.first()
-    
-    # Get active sponsors
-    sponsors = Sponsor.objects.filter(is_active=True)
-    
-    # Get active social links
-    social_links = SocialLink.objects.filter(is_active=True)
-    
-    return Response({
-        'site_settings': SiteSettingsSerializer(site_settings).data if site_settings else None,
-        'sponsors': SponsorSerializer(sponsors, many=True).data,
-        'social_links': SocialLinkSerializer(social_links, many=True).data,
-    })
+    Single endpoint to get all home page data.
+    The same payload is published as a static snapshot (see core.snapshots).
+    """
+    payload, state = cached_payload('home', home_payload)
+    keys = [
+        *surrogate_keys(SiteSettings, ids_in(payload['site_settings'])),
+        *surrogate_keys(Sponsor, ids_in(payload['sponsors'])),
+        *surrogate_keys(SocialLink, ids_in(payload['social_links'])),
+    ]
+    response = Response(payload, headers={STATUS_HEADER: state})
+    return tag_response(response, 'home', keys, fresh=state in (HIT, MISS))
 
 
 @api_view(['GET'])
@@ -72,16 +92,29 @@ def member_portal_data(request):
     """
     Single endpoint to get all member portal data
     """
-    # Get active classes
-    classes = Class.objects.filter(is_active=True)
-    
-    # Get active resources
-    resources = Resource.objects.filter(is_active=True)
-    
-    return Response({
-        'classes': ClassSerializer(classes, many=True).data,
-        'resources': ResourceSerializer(resources, many=True).data,
-    })
+    payload, state = cached_payload('member_portal', member_portal_payload)
+    payload = {**payload, 'classes': [with_current_status(data) for data in payload['classes']]}
+    return Response(payload, headers={STATUS_HEADER: state})
+
+
+def member_portal_payload():
+    return {
+        'classes': ClassSerializer(Class.objects.filter(is_active=True), many=True).data,
+        'resources': ResourceSerializer(Resource.objects.filter(is_active=True), many=True).data,
+    }
+
+
+def with_current_status(data):
+    """
+    A serialized class with the fields that follow from the clock recomputed
+    now, since the cached payload may be older than a start or end time
+    """
+    klass = Class(
+        status=data['status'], is_active=data['is_active'],
+        start_date=parse_datetime(data['start_date']),
+        end_date=parse_datetime(data['end_date']) if data['end_date'] else None,
+    )
+    return {**data, 'status_display': klass.computed_status_display, 'is_joinable': klass.is_joinable}
 
 
 @api_view(['POST'])
@@ -94,6 +127,7 @@ def increment_download(request, resource_id):
         resource = Resource.objects.get(id=resource_id, is_active=True)
         resource.download_count += 1
         resource.save(update_fields=['download_count'])
+        record_download(resource.id)
         return Response({
             'success': True,
             'download_count': resource.download_count
@@ -104,3 +138,313 @@ def increment_download(request, resource_id):
             'error': 'Resource not found'
         }, status=status.HTTP_404_NOT_FOUND)
 
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_resource_file(request, resource_id):
+    """
+    Stream a resource's file and count the download in the same request.
+    Supports HTTP Range so interrupted downloads can resume. Only a full
+    response or a range from byte 0 counts, once per user within
+    RESOURCE_DOWNLOAD_COUNT_WINDOW; resumes are not counted again.
+    """
+    resource = Resource.objects.filter(id=resource_id, is_active=True).only('id', 'file').first()
+    if resource is None or not resource.file:
+        return Response({
+            'success': False,
+            'error': 'Resource file not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    range_header = request.META.get('HTTP_RANGE')
+    response = file_response(resource.file, range_header, request)
+
+    if counts_as_download(range_header, response) and claim_download(request.user.pk, resource.id):
+        Resource.objects.filter(id=resource.id).update(download_count=F('download_count') + 1)
+        record_download(resource.id)
+
+    return response
+
+
+@api_view(['GET', 'POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def class_enrollment(request, class_id):
+    """
+    GET: current user's enrollment status for a class
+    POST: enroll (or join the waitlist when the class is full)
+    DELETE: unenroll; the freed seat goes to the first waitlisted member
+    """
+    try:
+        klass = Class.objects.get(id=class_id, is_active=True)
+    except Class.DoesNotExist:
+        return Response({
+            'success': False,
+            'error': 'Class not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'POST':
+        if klass.status == 'archived':
+            return Response({
+                'success': False,
+                'error': 'Class is archived'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            enrollment = enroll(klass, request.user)
+        except ClassFullError:
+            return Response({
+                'success': False,
+                'error': 'Class is full'
+            }, status=status.HTTP_409_CONFLICT)
+        response_status = status.HTTP_201_CREATED
+    elif request.method == 'DELETE':
+        unenroll(klass, request.user)
+        enrollment = None
+        response_status = status.HTTP_200_OK
+    else:
+        enrollment = klass.enrollments.filter(user=request.user).first()
+        response_status = status.HTTP_200_OK
+
+    klass.refresh_from_db(fields=['enrolled_count', 'max_participants'])
+    return Response({
+        'success': True,
+        'enrollment_status': enrollment.status if enrollment else None,
+        'enrolled_count': klass.enrolled_count,
+        'max_participants': klass.max_participants,
+        'is_full': klass.is_full,
+    }, status=response_status)
+
+
+class ICalendarRenderer(renderers.BaseRenderer):
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data.encode(self.charset) if isinstance(data, str) else b''
+
+
+def _calendar_response(request, user_id=None):
+    etag = feed_etag(user_id)
+    not_modified = get_conditional_response(request, etag=f'"{etag}"')
+    if not_modified is not None:
+        return not_modified
+
+    response = Response(build_feed(user_id, etag))
+    response['ETag'] = f'"{etag}"'
+    response['Cache-Control'] = 'private, max-age=300'
+    response['Content-Disposition'] = 'inline; filename="tars-classes.ics"'
+    return response
+
+
+def _calendar_user_id(request):
+    """Logged-in user (JWT), or the user identified by a subscription token"""
+    if request.user.is_authenticated:
+        return request.user.pk
+    token = request.query_params.get('token')
+    return user_id_from_token(token) if token else None
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([ICalendarRenderer])
+def class_calendar(request):
+    """
+    iCalendar feed of all active classes.
+    Calendar apps cannot send a JWT, so a subscription token is also accepted.
+    """
+    if _calendar_user_id(request) is None:
+        return HttpResponse('Authentication required', status=401, content_type='text/plain')
+    return _calendar_response(request)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([ICalendarRenderer])
+def my_class_calendar(request):
+    """iCalendar feed of the classes the user is enrolled in"""
+    user_id = _calendar_user_id(request)
+    if user_id is None:
+        return HttpResponse('Authentication required', status=401, content_type='text/plain')
+    return _calendar_response(request, user_id)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def calendar_subscription(request):
+    """
+    Subscription URLs for calendar apps, signed for the current user; they
+    stop working when the password changes or after ICAL_TOKEN_MAX_AGE
+    """
+    token = feed_token(request.user)
+    return Response({
+        'classes': request.build_absolute_uri(reverse('class_calendar')) + f'?token={token}',
+        'my_classes': request.build_absolute_uri(reverse('my_class_calendar')) + f'?token={token}',
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def trending_resources(request):
+    """
+    Resources ranked by time-decayed downloads and views.
+    Scores are precomputed by the refresh-trending background job.
+    """
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+
+    trending = list(
+        TrendingResource.objects
+        .filter(resource__is_active=True)
+        .select_related('resource')
+        .order_by('-score')[:limit]
+    )
+    resources = ResourceSerializer(
+        [entry.resource for entry in trending], many=True, context={'request': request}
+    ).data
+    for data, entry in zip(resources, trending):
+        data['trending_score'] = round(entry.score, 3)
+
+    return Response({'resources': resources})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def related_resources(request, resource_id):
+    """
+    Resources similar to this one, from the precomputed neighbour table
+    """
+    neighbours = list(
+        RelatedResource.objects
+        .filter(resource_id=resource_id, related__is_active=True)
+        .select_related('related')
+        .order_by('rank')
+    )
+    resources = ResourceSerializer(
+        [entry.related for entry in neighbours], many=True, context={'request': request}
+    ).data
+    for data, entry in zip(resources, neighbours):
+        data['similarity'] = round(entry.score, 3)
+
+    return Response({'resources': resources})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def autocomplete(request):
+    """
+    Search-box suggestions (class/resource titles, instructors, authors)
+    matching ?q= as a word prefix, most popular first. Served from an
+    in-memory index, see core.autocomplete.
+    """
+    try:
+        limit = int(request.query_params.get('limit', 10))
+    except ValueError:
+        limit = 10
+
+    return Response({'suggestions': suggest(request.query_params.get('q', ''), limit)})
+
+
+def _upload_error(error):
+    return Response({'success': False, 'error': str(error)}, status=error.status_code)
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def start_chunked_upload(request):
+    """
+    Open a resumable upload for a resource file or class syllabus.
+    Body: target ('resource.file' / 'class.syllabus'), object_id, filename,
+    size (bytes) and checksum (hex SHA-256 of the whole file).
+    """
+    data = request.data
+    try:
+        upload = uploads.start_upload(
+            request.user, data.get('target'), data.get('object_id'),
+            data.get('filename'), data.get('size'), data.get('checksum'),
+        )
+    except uploads.UploadError as e:
+        return _upload_error(e)
+    return Response(uploads.describe(upload), status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAdminUser])
+def chunked_upload(request, upload_id):
+    """
+    GET: upload state; ``offset`` is where to resume after a disconnect
+    PUT: next chunk as the raw body with Content-Range (optional X-Chunk-SHA256)
+    DELETE: abort and discard received chunks
+    """
+    upload = ChunkedUpload.objects.filter(pk=upload_id, user=request.user).first()
+    if upload is None:
+        return Response({
+            'success': False,
+            'error': 'Upload not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        if request.method == 'PUT':
+            stream = request.stream
+            if stream is None:
+                raise uploads.UploadError('Chunk body is empty')
+            uploads.receive_chunk(
+                upload, request.headers.get('Content-Range'), stream, request.headers.get('X-Chunk-SHA256'),
+            )
+        elif request.method == 'DELETE':
+            uploads.abort(upload)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+    except uploads.UploadError as e:
+        response = _upload_error(e)
+        response.data['offset'] = upload.offset
+        return response
+    return Response(uploads.describe(upload))
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def finalize_chunked_upload(request, upload_id):
+    """
+    Queue reassembly and checksum verification; poll the upload until its
+    status is complete or failed
+    """
+    upload = ChunkedUpload.objects.filter(pk=upload_id, user=request.user).first()
+    if upload is None:
+        return Response({
+            'success': False,
+            'error': 'Upload not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    try:
+        uploads.request_finalize(upload)
+    except uploads.UploadError as e:
+        return _upload_error(e)
+    return Response(uploads.describe(upload), status=status.HTTP_202_ACCEPTED)
+
+
+async def live_events(request):
+    """
+    Server-Sent Events stream of class status transitions, seat changes and
+    content updates. EventSource cannot send headers, so the JWT access
+    token is passed as ?token= and checked like the Authorization header
+    (the user must still exist and be active). Only served through
+    tars.asgi (an ASGI server): under WSGI every open stream would hold a
+    worker thread.
+    """
+    from asgiref.sync import sync_to_async
+    from django.core.handlers.asgi import ASGIRequest
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    authentication = JWTAuthentication()
+    try:
+        token = authentication.get_validated_token(request.GET.get('token', ''))
+        await sync_to_async(authentication.get_user)(token)
+    except AuthenticationFailed:
+        return HttpResponse('Authentication required', status=401, content_type='text/plain')
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse('Live events need the ASGI server', status=503, content_type='text/plain')
+
+    response = StreamingHttpResponse(events.stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
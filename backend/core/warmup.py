@@ -0,0 +1,93 @@
+"""
+Worker warm-up: build the state Django and DRF otherwise create lazily on
+the first request, so that request doesn't pay for it.
+
+Runs from tars.wsgi / tars.asgi when ``WARMUP_ON_START`` is set. With a
+preloading server that happens once in the master and is shared
+copy-on-write by the workers. Database connections opened here are
+closed again so they are never inherited across a fork.
+"""
+import logging
+import time
+
+from django.db import DatabaseError, connections
+from django.urls import Resolver404, get_resolver, resolve
+
+from .dbpool import close_pools
+
+logger = logging.getLogger(__name__)
+
+WARM_PATHS = ['/api/health/', '/api/home/', '/api/portal/', '/api/classes/', '/api/resources/']
+
+
+def _urls():
+    resolver = get_resolver()
+    resolver.reverse_dict  # builds the reverse lookup tables
+    for path in WARM_PATHS:
+        try:
+            resolve(path)
+        except Resolver404:
+            pass
+
+
+def _rest_framework():
+    from rest_framework.settings import api_settings
+
+    # Each of these imports its classes on first access (simplejwt included)
+    for name in ['DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES',
+                 'DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES',
+                 'DEFAULT_PAGINATION_CLASS', 'DEFAULT_CONTENT_NEGOTIATION_CLASS']:
+        getattr(api_settings, name)
+
+
+def _serializers():
+    from . import serializers
+
+    for serializer_class in [
+        serializers.SiteSettingsSerializer, serializers.SponsorSerializer,
+        serializers.SocialLinkSerializer, serializers.ClassSerializer,
+        serializers.ResourceSerializer,
+    ]:
+        # Introspects the model and fills its _meta caches
+        serializer_class().fields
+
+
+def _caches():
+    from django.core.cache import caches
+
+    from .singleflight import cached_payload
+    from .snapshots import home_payload
+
+    caches['default'].get('warmup')
+    try:
+        cached_payload('home', home_payload)
+    except DatabaseError:
+        logger.warning('Database unavailable during warm-up; home payload not primed')
+
+
+def _autocomplete():
+    from .autocomplete import get_index
+
+    try:
+        get_index()
+    except DatabaseError:
+        logger.warning('Database unavailable during warm-up; autocomplete index not built')
+
+
+def warm_up():
+    """Prime lazily built state; returns seconds spent per step"""
+    timings = {}
+    for name, step in [('urls', _urls), ('rest_framework', _rest_framework),
+                       ('serializers', _serializers), ('caches', _caches),
+                       ('autocomplete', _autocomplete)]:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('Warm-up step %s failed', name)
+        timings[name] = time.perf_counter() - start
+    connections.close_all()
+    # A pool's worker threads don't survive fork; each process opens its own
+    close_pools()
+    logger.info('Warm-up done: %s', ', '.join(f'{k} {v * 1000:.0f}ms' for k, v in timings.items()))
+    return timings
@@ -0,0 +1,118 @@
+"""
+Gunicorn configuration (loaded automatically from the working directory, or
+with ``gunicorn -c gunicorn.conf.py``).
+
+    gunicorn                    # tars.wsgi, gthread workers
+    GUNICORN_ASGI=1 gunicorn    # tars.asgi, uvicorn workers (live events over SSE)
+
+Workers are sized from the CPUs and memory actually available to the
+container (cgroup limits first, then the host). WEB_CONCURRENCY and
+GUNICORN_THREADS override the computed values.
+"""
+import multiprocessing
+import os
+
+
+def _env_bool(name, default=False):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """CPU quota from cgroup v2/v1, else the scheduler affinity mask"""
+    quota = _read('/sys/fs/cgroup/cpu.max')
+    if quota and not quota.startswith('max'):
+        limit, period = quota.split()
+        return max(1.0, int(limit) / int(period))
+    limit, period = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us'), _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if limit and period and int(limit) > 0:
+        return max(1.0, int(limit) / int(period))
+    try:
+        return float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return float(multiprocessing.cpu_count())
+
+
+def available_memory_mb():
+    """Memory limit from cgroup v2/v1, else physical memory"""
+    physical = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 2 ** 20
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        limit = _read(path)
+        if limit and limit.isdigit():
+            return min(physical, int(limit) // 2 ** 20)
+    return physical
+
+
+def auto_workers(cpus, memory_mb):
+    # (2 x CPU) + 1, capped by how many workers fit in memory after
+    # leaving room for the master process
+    per_worker = int(os.environ.get('GUNICORN_WORKER_MEMORY_MB', 150))
+    reserved = int(os.environ.get('GUNICORN_RESERVED_MEMORY_MB', 100))
+    by_cpu = int(2 * cpus) + 1
+    by_memory = (memory_mb - reserved) // per_worker
+    return max(1, min(by_cpu, by_memory))
+
+
+asgi = _env_bool('GUNICORN_ASGI')
+cpus, memory_mb = available_cpus(), available_memory_mb()
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+workers = int(os.environ.get('WEB_CONCURRENCY') or auto_workers(cpus, memory_mb))
+
+if asgi:
+    wsgi_app = 'tars.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'tars.wsgi:application'
+    # Threads cover requests blocked on the database/Cloudinary without
+    # paying for another process
+    threads = int(os.environ.get('GUNICORN_THREADS', 4 if cpus < 2 else 2))
+    worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Import Django and run the warm-up once in the master; workers share the
+# loaded code copy-on-write. Incompatible with code reloading.
+reload = _env_bool('GUNICORN_RELOAD')
+preload_app = not reload
+
+# Recycle workers to bound slow leaks; the jitter keeps them from
+# restarting at the same moment
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Heartbeat files on tmpfs so a slow disk can't make workers look hung
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '*')
+
+
+def on_starting(server):
+    server.log.info(
+        'Sizing: %.1f CPUs, %d MB -> %d %s workers%s',
+        cpus, memory_mb, workers, worker_class,
+        f' x {threads} threads' if not asgi else '',
+    )
+
+
+def worker_exit(server, worker):
+    # Counters buffered by core.trending would otherwise be lost on recycle
+    try:
+        from core.trending import flush_events
+
+        flush_events()
+    except Exception:
+        server.log.exception('Could not flush buffered resource stats')
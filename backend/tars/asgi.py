@@ -3,14 +3,24 @@ ASGI config for tars project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live events stream (/api/events/, core.events) is an async view; serve
+through this module (e.g. ``uvicorn tars.asgi:application``) so idle
+Server-Sent Events connections do not each hold a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tars.settings")
 
 application = get_asgi_application()
+
+if settings.WARMUP_ON_START:
+    from core.warmup import warm_up
+
+    warm_up()
@@ -0,0 +1,52 @@
+"""
+System checks that see the BrowserMiddleware chain.
+
+Django's admin dependency check (admin.E408-E410) and the CSRF / clickjacking
+deployment checks (security.W003 / W002) look for their middleware in
+MIDDLEWARE only. With those classes moved to BROWSER_MIDDLEWARE
+(tars.middleware) they would fail on a correct configuration, and silencing
+them would also hide a real omission. ``install()`` swaps them for the same
+checks run against the effective chain: MIDDLEWARE with BrowserMiddleware
+expanded in place into BROWSER_MIDDLEWARE. A class missing from both still
+reports under its usual id.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.admin.checks import check_dependencies
+from django.core.checks.registry import registry
+from django.core.checks.security.base import check_xframe_options_middleware
+from django.core.checks.security.csrf import check_csrf_middleware
+
+BROWSER_MIDDLEWARE_PATH = 'tars.middleware.BrowserMiddleware'
+
+
+def effective_middleware():
+    """MIDDLEWARE as requests outside LEAN_MIDDLEWARE_PREFIXES run it"""
+    middleware = []
+    for path in settings.MIDDLEWARE:
+        if path == BROWSER_MIDDLEWARE_PATH:
+            middleware.extend(getattr(settings, 'BROWSER_MIDDLEWARE', []))
+        else:
+            middleware.append(path)
+    return middleware
+
+
+def _against_effective_chain(check):
+    @wraps(check)
+    def wrapped(app_configs=None, **kwargs):
+        # Imported here so serving processes, which never run checks, skip django.test
+        from django.test.utils import override_settings
+
+        with override_settings(MIDDLEWARE=effective_middleware()):
+            return check(app_configs=app_configs, **kwargs)
+    return wrapped
+
+
+def install():
+    """Replace Django's MIDDLEWARE-only checks; call once the admin app is ready"""
+    for check in (check_dependencies, check_csrf_middleware, check_xframe_options_middleware):
+        for checks, deploy in ((registry.registered_checks, False), (registry.deployment_checks, True)):
+            if check in checks:
+                checks.discard(check)
+                registry.register(_against_effective_chain(check), *check.tags, deploy=deploy)
@@ -0,0 +1,109 @@
+"""
+Primary/replica database routing with read-your-writes stickiness.
+
+``ReplicaRoutingMiddleware`` decides per request whether reads may go to the
+``replica`` alias: only safe methods qualify, and only when the user has not
+written anything within ``REPLICA_STICKY_SECONDS`` (tracked in the cache by
+JWT user id, plus a short-lived cookie for clients that are not logged in
+yet, e.g. right after registering). Any write during a request pins the rest
+of that request to the primary and starts the sticky window, and reads inside
+a transaction on the primary stay there so they see its own writes.
+
+Outside a request (workers, management commands) everything uses the
+primary. Both pieces are inert unless ``DATABASES['replica']`` is configured.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+STICKY_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_routing = ContextVar('db_routing', default=None)
+
+
+class _RequestRouting:
+    __slots__ = ('use_replica', 'wrote')
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+class PrimaryReplicaRouter:
+    """Send reads to the replica only when the current request allows it"""
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if (state is not None and state.use_replica and not state.wrote
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is populated by replication, never migrated directly
+        return db == DEFAULT_DB_ALIAS
+
+
+def _sticky_key(user_id):
+    return f'db:sticky:{user_id}'
+
+
+def _token_user_id(request):
+    """User id from a valid JWT access token, without touching the database"""
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    parts = header.split()
+    if len(parts) != 2 or parts[0] not in settings.SIMPLE_JWT['AUTH_HEADER_TYPES']:
+        return None
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    try:
+        return AccessToken(parts[1])[settings.SIMPLE_JWT['USER_ID_CLAIM']]
+    except (TokenError, KeyError):
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        if REPLICA_DB_ALIAS not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user_id = _token_user_id(request)
+        use_replica = (
+            request.method in SAFE_METHODS
+            and STICKY_COOKIE not in request.COOKIES
+            and not (user_id and cache.get(_sticky_key(user_id)))
+        )
+
+        state = _RequestRouting(use_replica)
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        if state.wrote:
+            window = settings.REPLICA_STICKY_SECONDS
+            if user_id:
+                cache.set(_sticky_key(user_id), True, window)
+            response.set_cookie(STICKY_COOKIE, '1', max_age=window, httponly=True, samesite='Lax')
+        return response
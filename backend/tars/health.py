@@ -0,0 +1,86 @@
+"""
+Health probes.
+
+Liveness only says the process can serve a request; it never touches the
+database, so a database outage doesn't get healthy workers restarted.
+
+Readiness checks the database: ``SELECT 1`` round-trip latency and whether
+migrations are applied.
+Results are cached per process for ``HEALTH_CHECK_TTL`` seconds (migration
+status for ``HEALTH_MIGRATIONS_TTL``), so frequent platform probes cost at
+most one query per worker per TTL. Only one thread runs the check at a time;
+others reuse the previous result meanwhile. A worker is not ready when the
+database is unreachable, slower than ``HEALTH_DB_LATENCY_THRESHOLD_MS``, or
+has unapplied migrations. The probe only reports that status publicly; the
+check's details are served to staff by ``db_metrics`` with the pool state.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.executor import MigrationExecutor
+
+_lock = threading.Lock()
+_result = None
+_checked_at = 0.0
+_migrations = None
+_migrations_checked_at = 0.0
+
+
+def _pending_migrations(connection):
+    global _migrations, _migrations_checked_at
+    if _migrations is None or time.monotonic() - _migrations_checked_at > settings.HEALTH_MIGRATIONS_TTL:
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        _migrations = [f'{migration.app_label}.{migration.name}' for migration, _ in plan]
+        _migrations_checked_at = time.monotonic()
+    return _migrations
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    connection = connections[alias]
+    threshold = settings.HEALTH_DB_LATENCY_THRESHOLD_MS
+    result = {'checked_at': time.time()}
+    try:
+        start = time.perf_counter()
+        connection.ensure_connection()
+        connected = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        done = time.perf_counter()
+        pending = _pending_migrations(connection)
+    except DatabaseError as e:
+        result.update(status='down', error=str(e))
+        return result
+
+    latency = (done - start) * 1000
+    result.update(
+        status='ok',
+        latency_ms=round(latency, 2),
+        connect_ms=round((connected - start) * 1000, 2),
+        query_ms=round((done - connected) * 1000, 2),
+        latency_threshold_ms=threshold,
+        pending_migrations=pending,
+    )
+    if latency > threshold:
+        result['status'] = 'slow'
+    elif pending:
+        result['status'] = 'migrations_pending'
+    return result
+
+
+def readiness():
+    """Cached database check; ``ready`` is False when degraded"""
+    global _result, _checked_at
+    fresh = _result is not None and time.monotonic() - _checked_at < settings.HEALTH_CHECK_TTL
+    if not fresh and _lock.acquire(blocking=_result is None):
+        try:
+            if _result is None or time.monotonic() - _checked_at >= settings.HEALTH_CHECK_TTL:
+                _result = check_database()
+                _checked_at = time.monotonic()
+        finally:
+            _lock.release()
+    database = dict(_result, age_seconds=round(time.monotonic() - _checked_at, 2))
+    return {'ready': database['status'] == 'ok', 'database': database}
@@ -0,0 +1,78 @@
+"""
+Per-path middleware chains.
+
+The API is JWT-authenticated JSON, so sessions, CSRF, ``request.user`` from
+the session, messages and X-Frame-Options do nothing for ``/api/`` requests
+but still cost a few hooks and lazy objects on each one. ``BrowserMiddleware``
+sits in ``MIDDLEWARE`` where those used to be. It builds the
+``BROWSER_MIDDLEWARE`` classes into a chain of its own, the way Django builds
+``MIDDLEWARE``:
+
+* a request under ``LEAN_MIDDLEWARE_PREFIXES`` skips that chain and goes
+  straight to the rest of ``MIDDLEWARE``;
+* any other request (the admin, the root page) runs the chain, including its
+  ``process_view`` / ``process_exception`` / ``process_template_response``
+  hooks, exactly as if the classes were listed in ``MIDDLEWARE`` themselves.
+"""
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+class BrowserMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lean_prefixes = tuple(getattr(settings, 'LEAN_MIDDLEWARE_PREFIXES', ()))
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        handler = get_response
+        for middleware_path in reversed(getattr(settings, 'BROWSER_MIDDLEWARE', [])):
+            try:
+                middleware = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            # Same hook order as BaseHandler.load_middleware()
+            if hasattr(middleware, 'process_view'):
+                self._view_middleware.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                self._template_response_middleware.append(middleware.process_template_response)
+            if hasattr(middleware, 'process_exception'):
+                self._exception_middleware.append(middleware.process_exception)
+            handler = convert_exception_to_response(middleware)
+        self.browser_chain = handler
+
+    def is_lean(self, request):
+        return request.path_info.startswith(self.lean_prefixes)
+
+    def __call__(self, request):
+        if self.is_lean(request):
+            return self.get_response(request)
+        return self.browser_chain(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_lean(request):
+            return None
+        for process_view in self._view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_exception(self, request, exception):
+        if self.is_lean(request):
+            return None
+        for process_exception in self._exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        if self.is_lean(request):
+            return response
+        for process_template_response in self._template_response_middleware:
+            response = process_template_response(request, response)
+        return response
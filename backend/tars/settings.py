@@ -12,15 +12,20 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from decouple import config
+import json
 import os
-from dotenv import load_dotenv
+import tempfile
 from urllib.parse import urlparse, parse_qsl
 
-load_dotenv()
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Only local checkouts have a .env; deployed instances get real environment
+# variables, so skip importing python-dotenv there
+if (BASE_DIR / '.env').is_file():
+    from dotenv import load_dotenv
+    load_dotenv(BASE_DIR / '.env')
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -51,8 +56,10 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    # Management commands only. The storage backend (and the cloudinary SDK
+    # it pulls in) is imported lazily on first media access; the "cloudinary"
+    # app is left out because its models module would import the SDK at startup.
     "cloudinary_storage",
-    "cloudinary",
     "rest_framework",
     "rest_framework_simplejwt",
     "corsheaders",
@@ -62,14 +69,28 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    # Static files and snapshots are answered before anything else runs
+    "core.snapshots.SnapshotWhiteNoiseMiddleware",
     "django.middleware.common.CommonMiddleware",
+    # Runs BROWSER_MIDDLEWARE, except for LEAN_MIDDLEWARE_PREFIXES (see tars.middleware)
+    "tars.middleware.BrowserMiddleware",
+    "core.profiling.ProfileRequestMiddleware",
+    "core.slowqueries.SlowQueryMiddleware",
+    "tars.db_router.ReplicaRoutingMiddleware",
+]
+
+# Only the admin and other browser pages use sessions and CSRF; API requests
+# authenticate with JWT and skip these
+BROWSER_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
+LEAN_MIDDLEWARE_PREFIXES = ["/api/"]
+# The admin and security middleware checks run against MIDDLEWARE with
+# BROWSER_MIDDLEWARE expanded in place (tars.checks)
 
 
 STORAGES = {
@@ -119,19 +140,95 @@ WSGI_APPLICATION = "tars.wsgi.application"
 
 
 # Replace the DATABASES section of your settings.py with this
-tmpPostgres = urlparse(os.getenv("DATABASE_URL"))
+def database_from_url(url):
+    """Django DATABASES entry from a postgresql:// or sqlite:///path URL"""
+    parsed = urlparse(url)
+    if parsed.scheme == 'sqlite':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': parsed.path[1:] if parsed.path.startswith('//') else parsed.path.lstrip('/'),
+        }
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': parsed.path.replace('/', ''),
+        'USER': parsed.username,
+        'PASSWORD': parsed.password,
+        'HOST': parsed.hostname,
+        'PORT': parsed.port or 5432,
+        'OPTIONS': dict(parse_qsl(parsed.query)),
+    }
+
+
+# Connection reuse. With DB_POOL_MAX_SIZE > 0 every worker process keeps a
+# psycopg connection pool; otherwise each thread keeps its connection for
+# DB_CONN_MAX_AGE seconds, checked for health before reuse. Set DB_PGBOUNCER
+# when connecting through pgbouncer in transaction mode. Metrics: core.dbpool.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=0, cast=int)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=1, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10.0, cast=float)  # seconds to wait for a free connection
+DB_PGBOUNCER = config('DB_PGBOUNCER', default=False, cast=bool)
+
+
+def connection_reuse(database):
+    """Apply the pooling / persistent connection settings to a DATABASES entry"""
+    if database['ENGINE'] != 'django.db.backends.postgresql':
+        return database
+    database['CONN_HEALTH_CHECKS'] = True
+    if DB_POOL_MAX_SIZE:
+        database['CONN_MAX_AGE'] = 0  # the pool owns connection lifetime
+        database['OPTIONS']['pool'] = {
+            'min_size': min(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+            'max_idle': 300,
+            'max_lifetime': 1800,
+        }
+    else:
+        database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    if DB_PGBOUNCER:
+        # Transaction pooling can hand each transaction a different server
+        # connection, so nothing may outlive one: no named cursors. Django
+        # already disables psycopg 3's prepared statements by default.
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return database
+
 
 DATABASES = {
+    'default': connection_reuse(database_from_url(os.getenv("DATABASE_URL"))),
+}
+
+# Optional read replica. Safe (GET/HEAD) requests read from it unless the
+# user wrote something within the last REPLICA_STICKY_SECONDS (tars.db_router).
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = connection_reuse(database_from_url(DATABASE_REPLICA_URL))
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['tars.db_router.PrimaryReplicaRouter']
+
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+
+# Health probes (tars.health): /api/health/live/ never touches the database;
+# /api/health/ready/ fails above this round-trip latency
+HEALTH_CHECK_TTL = config('HEALTH_CHECK_TTL', default=5, cast=float)
+HEALTH_MIGRATIONS_TTL = 300
+HEALTH_DB_LATENCY_THRESHOLD_MS = config('HEALTH_DB_LATENCY_THRESHOLD_MS', default=500, cast=float)
+
+
+# Cache shared by all worker processes on the host (tars.sqlite_cache)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': tmpPostgres.path.replace('/', ''),
-        'USER': tmpPostgres.username,
-        'PASSWORD': tmpPostgres.password,
-        'HOST': tmpPostgres.hostname,
-        'PORT': 5432,
-        'OPTIONS': dict(parse_qsl(tmpPostgres.query)),
-    }
+        'BACKEND': 'tars.sqlite_cache.SQLiteCache',
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(tempfile.gettempdir(), 'tars-cache.sqlite3')),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int),
+        },
+    },
 }
+# Tests run against a LocMemCache instead (tars.test_runner)
+TEST_RUNNER = 'tars.test_runner.TestRunner'
 
 
 # Password validation
@@ -182,6 +279,138 @@ CLOUDINARY_STORAGE = {
     'API_SECRET': os.environ.get('CLOUDINARY_API_SECRET'),
 }
 
+# Number of resolved media URLs kept in the per-process LRU (see core.media)
+MEDIA_URL_CACHE_SIZE = config('MEDIA_URL_CACHE_SIZE', default=4096, cast=int)
+
+
+# Staff-only request profiling (core.profiling): send X-Profile: 1 or ?profile=1
+PROFILER_INTERVAL = config('PROFILER_INTERVAL', default=0.005, cast=float)  # seconds between samples
+
+# Slow-query log (core.slowqueries); 0 turns it off
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=200, cast=float)
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = config('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', default=0.1, cast=float)
+SLOW_QUERY_EXPLAIN_INTERVAL = 600  # seconds between EXPLAINs of the same fingerprint
+SLOW_QUERY_BUFFER_SIZE = 200  # per process; further slow queries are dropped until a flush
+
+
+# Outgoing email. Printed to the console until EMAIL_HOST is configured.
+EMAIL_HOST = config('EMAIL_HOST', default='')
+EMAIL_BACKEND = config(
+    'EMAIL_BACKEND',
+    default='django.core.mail.backends.smtp.EmailBackend' if EMAIL_HOST
+    else 'django.core.mail.backends.console.EmailBackend',
+)
+EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='TARS Club <noreply@localhost>')
+
+
+# Chunked, resumable uploads (core.uploads). The web service stages chunks in
+# CHUNKED_UPLOAD_DIR and the job worker reassembles them from there, so set it
+# to a directory both mount; the temp-dir default only works when they run on
+# one host. Uploads whose chunks the worker can't find fail with an error log.
+CHUNKED_UPLOADS = {
+    'BACKEND': 'core.uploads.LocalStagingBackend',
+    'OPTIONS': {
+        'location': config('CHUNKED_UPLOAD_DIR', default=os.path.join(tempfile.gettempdir(), 'tars-uploads')),
+    },
+}
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # suggested to clients
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_SIZE = config('CHUNKED_UPLOAD_MAX_SIZE', default=2 * 1024 ** 3, cast=int)
+CHUNKED_UPLOAD_EXPIRY = 24 * 3600  # seconds after the last chunk
+
+
+# Resource file downloads (core.downloads)
+RESOURCE_FILE_CHUNK_SIZE = 64 * 1024
+RESOURCE_DOWNLOAD_COUNT_WINDOW = 30 * 60  # repeat fetches by the same user count once
+# '' streams through Django, 'nginx' hands off via X-Accel-Redirect, 'apache' via X-Sendfile
+RESOURCE_FILE_SENDFILE = config('RESOURCE_FILE_SENDFILE', default='')
+# Internal nginx location that maps to the media storage
+RESOURCE_FILE_ACCEL_PREFIX = config('RESOURCE_FILE_ACCEL_PREFIX', default='/protected/')
+
+# Admin changelists switch to planner row estimates above this many rows (core.changelist)
+ADMIN_APPROX_COUNT_THRESHOLD = config('ADMIN_APPROX_COUNT_THRESHOLD', default=10000, cast=int)
+
+# Single-flight caching of /api/home/ and /api/portal/ payloads (core.singleflight)
+ENDPOINT_CACHE_TIMEOUT = config('ENDPOINT_CACHE_TIMEOUT', default=60, cast=int)
+ENDPOINT_CACHE_STALE_TIMEOUT = 600  # seconds past expiry a stale payload may be served while refreshing
+ENDPOINT_CACHE_STALE_WHILE_REVALIDATE = config('ENDPOINT_CACHE_STALE_WHILE_REVALIDATE', default=True, cast=bool)
+ENDPOINT_CACHE_LOCK_TIMEOUT = 10
+ENDPOINT_CACHE_EARLY_REFRESH_BETA = 1.0  # >1 favours earlier refreshes, 0 disables them
+
+# CDN caching of public endpoints (core.cdn). Browsers get max-age, the CDN
+# s-maxage; model saves purge by surrogate key so long CDN TTLs are safe.
+CDN_CACHE_POLICIES = {
+    'home': {'max_age': 60, 's_maxage': 3600, 'stale_while_revalidate': 86400, 'stale_if_error': 86400},
+    'site_settings': {'max_age': 300, 's_maxage': 3600, 'stale_while_revalidate': 86400, 'stale_if_error': 86400},
+    'sponsors': {'max_age': 300, 's_maxage': 3600, 'stale_while_revalidate': 86400, 'stale_if_error': 86400},
+    'social_links': {'max_age': 300, 's_maxage': 3600, 'stale_while_revalidate': 86400, 'stale_if_error': 86400},
+}
+# 'core.cdn.FastlyPurger' (SERVICE_ID, API_TOKEN) or 'core.cdn.CloudflarePurger' (ZONE_ID, API_TOKEN)
+CDN_PURGER = {
+    'BACKEND': config('CDN_PURGER', default='core.cdn.NullPurger'),
+    'OPTIONS': config('CDN_PURGER_OPTIONS', default='{}', cast=json.loads),
+}
+
+# Prime URL resolver, DRF settings, serializers and caches when a worker
+# loads the WSGI/ASGI application (core.warmup)
+WARMUP_ON_START = config('WARMUP_ON_START', default=True, cast=bool)
+
+# Live events over SSE (core.events), served only under ASGI. The
+# in-process backend reaches clients of one process only: use it with a
+# single web worker.
+EVENTS_BACKEND = config('EVENTS_BACKEND', default=(
+    'core.events.PostgresNotifyBackend'
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql'
+    else 'core.events.InProcessBackend'
+))
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_QUEUE_SIZE = 100  # per client; oldest events are dropped for slow clients
+
+# Background jobs (core.jobs, run with `python manage.py run_worker`)
+JOB_WORKER_CONCURRENCY = config('JOB_WORKER_CONCURRENCY', default=2, cast=int)
+JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=2.0, cast=float)
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 10  # seconds, doubled on every attempt
+JOB_RETRY_BACKOFF_MAX = 3600
+JOB_LOCK_TIMEOUT = 600  # running jobs older than this are assumed orphaned
+
+JOB_SCHEDULE = {
+    'purge-expired-sessions': {'task': 'core.tasks.purge_expired_sessions', 'every': 24 * 3600},
+    'purge-finished-jobs': {'task': 'core.tasks.purge_finished_jobs', 'every': 24 * 3600},
+    'refresh-trending': {'task': 'core.tasks.refresh_trending', 'every': 15 * 60},
+    'rebuild-related-resources': {'task': 'core.tasks.rebuild_related_resources', 'every': 24 * 3600},
+    'purge-expired-uploads': {'task': 'core.tasks.purge_expired_uploads', 'every': 3600},
+    'send-class-reminders': {'task': 'core.tasks.send_class_reminders', 'every': 60},
+    'purge-slow-queries': {'task': 'core.tasks.purge_slow_queries', 'every': 24 * 3600},
+}
+
+# Class reminder emails (core.reminders): kind -> seconds before start_date
+CLASS_REMINDER_WINDOWS = {'day': 24 * 3600, 'hour': 3600, 'start': 0}
+CLASS_REMINDER_START_GRACE = 15 * 60  # still send "start" this long after a class began
+CLASS_REMINDER_BATCH_SIZE = 200  # messages per send_messages() call
+
+# Calendar subscription URLs (core.ical); changing the password revokes them
+ICAL_TOKEN_MAX_AGE = config('ICAL_TOKEN_MAX_AGE', default=365 * 24 * 3600, cast=int)
+
+# Neighbours stored per resource for /api/resources/<id>/related/ (core.related)
+RELATED_RESOURCES_K = 10
+
+# Search-box suggestions for /api/autocomplete/ (core.autocomplete)
+AUTOCOMPLETE_VERSION_CHECK = 1  # seconds between checks for changes made by other workers
+AUTOCOMPLETE_MAX_AGE = 15 * 60  # full rebuild to pick up download/enrollment counts
+
+# Trending resources (core.trending)
+TRENDING_HALF_LIFE_DAYS = 7
+TRENDING_VIEW_WEIGHT = 0.1  # a view counts as a tenth of a download
+TRENDING_WINDOW_DAYS = 60
+TRENDING_FLUSH_SIZE = 100  # buffered (resource, day) pairs written after the response
+TRENDING_FLUSH_INTERVAL = 30  # age (s) of the oldest buffered event that forces a write after a response
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
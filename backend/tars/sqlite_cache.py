@@ -0,0 +1,222 @@
+"""
+Cache backend shared by every worker process on a host, backed by one SQLite
+file in WAL mode with memory-mapped reads.
+
+    CACHES = {'default': {
+        'BACKEND': 'tars.sqlite_cache.SQLiteCache',
+        'LOCATION': '/var/tmp/tars-cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }}
+
+Unlike LocMemCache, a set or delete in one gunicorn worker is seen by all the
+others, and unlike DatabaseCache it costs no round trip to PostgreSQL.
+
+* integers are stored as SQLite integers, so ``incr``/``decr`` are a single
+  atomic ``UPDATE ... RETURNING``; everything else is pickled;
+* expiry is checked on read, and expired rows are removed when culling;
+* size is bounded by ``MAX_ENTRIES``: once exceeded, expired rows and then the
+  least recently used ``1/CULL_FREQUENCY`` of rows are deleted. Counting the
+  rows is a scan, so it only happens every ``CULL_EVERY`` writes per process
+  and the table can briefly run over by that many rows per worker. Access
+  times are only written back when older than ``LRU_RESOLUTION`` seconds so
+  hot reads don't turn into writes;
+* versioned keys come from Django's ``make_key``/``incr_version``.
+
+Connections are per thread and reopened after a fork (gunicorn ``--preload``).
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+"""
+
+
+def _encode(value):
+    if type(value) is int and -(2 ** 63) <= value < 2 ** 63:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(value):
+    return value if isinstance(value, int) else pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._mmap_size = int(options.get('MMAP_SIZE', 64 * 1024 * 1024))
+        self._lru_resolution = float(options.get('LRU_RESOLUTION', 10))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._cull_every = max(int(options.get('CULL_EVERY', 100)), 1)
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute(f'PRAGMA mmap_size={self._mmap_size}')
+            db.executescript(SCHEMA)
+            local.db, local.pid = db, os.getpid()
+        return local.db
+
+    def _expiry(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._db.execute(
+            'INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+            'accessed = excluded.accessed WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (key, _encode(value), self._expiry(timeout), now, now),
+        )
+        if cursor.rowcount:
+            self._wrote()
+        return cursor.rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        row = self._db.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            return default
+        if now - row[2] > self._lru_resolution:
+            self._db.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return _decode(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._db.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+            (key, _encode(value), self._expiry(timeout), time.time()),
+        )
+        self._wrote()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ?, accessed = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._expiry(timeout), now, key, now),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._db.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        try:
+            row = self._db.execute(
+                "UPDATE cache SET value = value + ? WHERE key = ? AND typeof(value) = 'integer' "
+                'AND (expires IS NULL OR expires > ?) RETURNING value',
+                (delta, key, time.time()),
+            ).fetchone()
+        except sqlite3.OperationalError as e:
+            # SQLite raises on 64-bit overflow instead of wrapping
+            raise ValueError(f"Cannot increment key '{key}': {e}")
+        if row is None:
+            raise ValueError(f"Key '{key}' not found or not an integer")
+        return row[0]
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not key_map:
+            return {}
+        now = time.time()
+        placeholders = ','.join('?' * len(key_map))
+        rows = self._db.execute(
+            f'SELECT key, value, accessed FROM cache WHERE key IN ({placeholders}) '
+            'AND (expires IS NULL OR expires > ?)',
+            (*key_map, now),
+        ).fetchall()
+        stale = [(now, key) for key, _, accessed in rows if now - accessed > self._lru_resolution]
+        if stale:
+            self._db.executemany('UPDATE cache SET accessed = ? WHERE key = ?', stale)
+        return {key_map[key]: _decode(value) for key, value, _ in rows}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires, now = self._expiry(timeout), time.time()
+        rows = [
+            (self.make_and_validate_key(key, version=version), _encode(value), expires, now)
+            for key, value in data.items()
+        ]
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)', rows,
+            )
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        self._wrote(len(rows))
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self._db.execute(f"DELETE FROM cache WHERE key IN ({','.join('?' * len(keys))})", keys)
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def _wrote(self, rows=1):
+        with self._writes_lock:
+            self._writes += rows
+            if self._writes < self._cull_every:
+                return
+            self._writes = 0
+        self._cull()
+
+    def _cull(self):
+        db = self._db
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        count -= db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),)).rowcount
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute('DELETE FROM cache')
+            return
+        db.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count // self._cull_frequency,),
+        )
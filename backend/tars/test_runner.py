@@ -0,0 +1,22 @@
+"""
+Test runner that keeps tests off the shared on-disk cache.
+
+The default SQLiteCache file lives in the system temp directory and outlives
+the run, so cached payloads, counters and locks would leak between runs and
+between concurrent runs. Every test run uses a fresh LocMemCache instead.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_override = override_settings(CACHES=TEST_CACHES)
+        self._cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_override.disable()
+        super().teardown_test_environment(**kwargs)
@@ -26,7 +26,10 @@ from rest_framework_simplejwt.views import TokenRefreshView
 from core.views import (
     SiteSettingsViewSet, SponsorViewSet, SocialLinkViewSet,
     ClassViewSet, ResourceViewSet, home_page_data, member_portal_data,
-    increment_download
+    increment_download, download_resource_file, class_enrollment,
+    class_calendar, my_class_calendar, calendar_subscription, trending_resources,
+    related_resources, live_events, autocomplete, start_chunked_upload, chunked_upload,
+    finalize_chunked_upload
 )
 
 # Create router for viewsets
@@ -51,7 +54,13 @@ urlpatterns = [
     
     # Health & Info
     path("api/health/", views.health_check, name="health_check"),
+    path("api/health/live/", views.liveness, name="liveness"),
+    path("api/health/ready/", views.readiness_check, name="readiness"),
     path("api/info/", views.api_info, name="api_info"),
+    path("api/metrics/db/", views.db_metrics, name="db_metrics"),
+    
+    # Live class status / seat / content events (Server-Sent Events)
+    path("api/events/", live_events, name="live_events"),
     
     # Home page data
     path("api/home/", home_page_data, name="home_page_data"),
@@ -62,6 +71,31 @@ urlpatterns = [
     # Increment download count
     path("api/resources/<int:resource_id>/download/", increment_download, name="increment_download"),
     
+    # Search-box suggestions
+    path("api/autocomplete/", autocomplete, name="autocomplete"),
+    
+    # Trending resources
+    path("api/resources/trending/", trending_resources, name="trending_resources"),
+    
+    # Related resources
+    path("api/resources/<int:resource_id>/related/", related_resources, name="related_resources"),
+    
+    # Stream resource file (counts the download, supports Range requests)
+    path("api/resources/<int:resource_id>/file/", download_resource_file, name="download_resource_file"),
+    
+    # Chunked, resumable uploads of resource files and syllabi (staff)
+    path("api/uploads/", start_chunked_upload, name="start_chunked_upload"),
+    path("api/uploads/<uuid:upload_id>/", chunked_upload, name="chunked_upload"),
+    path("api/uploads/<uuid:upload_id>/finalize/", finalize_chunked_upload, name="finalize_chunked_upload"),
+    
+    # Enroll in / leave a class
+    path("api/classes/<int:class_id>/enroll/", class_enrollment, name="class_enrollment"),
+    
+    # Class calendars (iCalendar feeds)
+    path("api/classes/calendar.ics", class_calendar, name="class_calendar"),
+    path("api/classes/my-calendar.ics", my_class_calendar, name="my_class_calendar"),
+    path("api/classes/calendar/subscribe/", calendar_subscription, name="calendar_subscription"),
+    
     # API router (includes site-settings, sponsors, social-links, classes, resources)
     path("api/", include(router.urls)),
     
@@ -1,8 +1,10 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
-from django.db import connection
 from django.utils import timezone
+from core.dbpool import pool_stats
+from .health import readiness
 
 
 @api_view(['GET'])
@@ -15,6 +17,8 @@ def root(request):
         'version': '1.0.0',
         'endpoints': {
             'health': '/api/health/',
+            'liveness': '/api/health/live/',
+            'readiness': '/api/health/ready/',
             'info': '/api/info/',
             'home': '/api/home/',
             'admin': '/admin/',
@@ -38,29 +42,53 @@ def health_check(request):
     """
     Health check endpoint that verifies:
     - API is running
-    - Database connection is working
+    - Database connection is working (cached, see tars.health)
     - Returns current timestamp
     """
+    database = readiness()['database']
     health_status = {
         'status': 'healthy',
         'timestamp': timezone.now().isoformat(),
         'service': 'TARS Backend API',
-        'database': 'disconnected'
+        'database': 'connected',
+        'database_latency_ms': database.get('latency_ms'),
     }
-    
-    # Check database connection
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-            health_status['database'] = 'connected'
-    except Exception as e:
+    if database['status'] == 'down':
         health_status['status'] = 'unhealthy'
-        health_status['database'] = f'error: {str(e)}'
+        health_status['database'] = f"error: {database['error']}"
         return Response(health_status, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-    
+
     return Response(health_status, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@authentication_classes([])
+def liveness(request):
+    """
+    Liveness probe: the process is up and serving. Never touches the database.
+    """
+    return Response({'status': 'alive', 'timestamp': timezone.now().isoformat()})
+
+
+@api_view(['GET'])
+@authentication_classes([])
+def readiness_check(request):
+    """
+    Readiness probe: 503 while the database is down, slower than
+    HEALTH_DB_LATENCY_THRESHOLD_MS or has unapplied migrations.
+    Only the status is public; the details are in db_metrics.
+    """
+    result = readiness()
+    return Response(
+        {
+            'status': 'ready' if result['ready'] else 'not ready',
+            'database': result['database']['status'],
+            'timestamp': timezone.now().isoformat(),
+        },
+        status=status.HTTP_200_OK if result['ready'] else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
 @api_view(['GET'])
 def api_info(request):
     """
@@ -75,3 +103,14 @@ def api_info(request):
             'info': '/api/info/'
         }
     })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def db_metrics(request):
+    """
+    Connection pool / persistent connection figures and the last readiness
+    check (latency, pending migrations, errors) for the worker serving this
+    request (staff only)
+    """
+    return Response(dict(pool_stats(), readiness=readiness()['database']))